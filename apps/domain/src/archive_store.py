@@ -0,0 +1,78 @@
+"""Export the object store of a node to an archive, or restore one.
+
+Example:
+    python archive_store.py export --file=store.tar.gz
+    python archive_store.py import --file=store.tar.gz
+
+The archive holds the stored objects, their metadata and permissions, and the
+datasets. Uses the same database settings as the node (DATABASE_URL or
+--start_local_db).
+"""
+
+# stdlib
+import argparse
+import os
+
+# third party
+from app import create_app
+from main.core.database import db
+from main.core.database.store_archive import export_archive
+from main.core.database.store_archive import import_archive
+from main.core.node import get_node
+
+parser = argparse.ArgumentParser(
+    description="Export or restore the object store of a PyGrid node."
+)
+
+parser.add_argument(
+    "command",
+    type=str,
+    choices=["export", "import"],
+    help="Write the store to an archive (export) or restore an archive (import).",
+)
+
+parser.add_argument(
+    "--file",
+    type=str,
+    help="Archive path, e.g. --file=store.tar.gz.",
+    required=True,
+)
+
+parser.add_argument(
+    "--batch_size",
+    type=int,
+    help="Number of objects per archive member (export). Default is 100.",
+    default=100,
+)
+
+parser.add_argument(
+    "--name",
+    type=str,
+    help="Grid node name. Default is os.environ.get('GRID_NODE_NAME','OpenMined').",
+    default=os.environ.get("GRID_NODE_NAME", "OpenMined"),
+)
+
+parser.add_argument(
+    "--start_local_db",
+    dest="start_local_db",
+    action="store_true",
+    help="If this flag is used a SQLAlchemy DB URI is generated to use a local db.",
+)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    app = create_app(args)
+    store = get_node().disk_store
+    if args.command == "export":
+        with open(args.file, "wb") as f:
+            size = export_archive(db, store, f, batch_size=args.batch_size)
+        print(f"Exported {len(store)} objects to {args.file} ({size} bytes).")
+    else:
+        with open(args.file, "rb") as f:
+            report = import_archive(db, store, f)
+        print(
+            f"Imported {report['objects']} objects ({report['bytes']} bytes) "
+            f"and {report['dataset']} datasets from {args.file}."
+        )
+    store.close()
@@ -0,0 +1,55 @@
+"""Remove the duplicate rows that keep unique keys from being created.
+
+Tables created by older versions may hold several rows for a value of a
+column that is now a unique key (e.g. the metadata of an object). The node
+doesn't delete them at startup, it logs them and runs without the key. This
+keeps the most recent row of each value, deletes the others, and creates the
+missing keys, in the main database and the store shards (STORE_SHARDS).
+
+Example:
+    python deduplicate_rows.py
+
+Uses the same database settings as the node (DATABASE_URL or --start_local_db).
+"""
+
+# stdlib
+import argparse
+import os
+
+# third party
+from app import create_app
+from main.core.database import db
+from main.core.database.schema import upgrade_schema
+from main.core.database.store_sharded import SHARD_TABLES
+from main.core.database.store_sharded import get_shard_binds
+
+parser = argparse.ArgumentParser(
+    description="Remove duplicate rows blocking the unique keys of PyGrid tables."
+)
+
+parser.add_argument(
+    "--name",
+    type=str,
+    help="Grid node name. Default is os.environ.get('GRID_NODE_NAME','OpenMined').",
+    default=os.environ.get("GRID_NODE_NAME", "OpenMined"),
+)
+
+parser.add_argument(
+    "--start_local_db",
+    dest="start_local_db",
+    action="store_true",
+    help="If this flag is used a SQLAlchemy DB URI is generated to use a local db.",
+)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    app = create_app(args)
+    statements = upgrade_schema(db.engine, deduplicate=True)
+    for bind in get_shard_binds():
+        engine = db.get_engine(bind=bind)
+        statements += upgrade_schema(engine, tables=SHARD_TABLES, deduplicate=True)
+
+    for statement in statements:
+        print(statement)
+    print(f"Executed {len(statements)} statements.")
@@ -16,9 +16,13 @@ class BaseModel(db.Model, AllFeaturesMixin):
 
 # grid relative
 from .bin_storage.bin_obj import BinObject
+from .bin_storage.bin_obj import Blob
 from .bin_storage.bin_obj import ObjectMetadata
+from .bin_storage.bin_obj import ObjectPermission
+from .bin_storage.bin_obj import ObjectTag
 from .bin_storage.json_obj import JsonObject
 from .bin_storage.metadata import StorageMetadata
+from .dataset.catalog import CatalogState
 from .dataset.datasetgroup import DatasetGroup
 from .groups.groups import Group
 from .groups.usergroup import UserGroup
@@ -66,7 +70,12 @@ def set_database_config(app, test_config=None, verbose=False):
             if test_config.get("SQLALCHEMY_TRACK_MODIFICATIONS")
             else False
         )
+    # grid relative
+    from .store_sharded import get_shard_binds
+
     app.config["SQLALCHEMY_BINDS"] = {"bin_store": "sqlite:////tmp/binstore.db"}
+    # Object store shards, see STORE_SHARDS
+    app.config["SQLALCHEMY_BINDS"].update(get_shard_binds())
     app.config["VERBOSE"] = verbose
     db.init_app(app)
 
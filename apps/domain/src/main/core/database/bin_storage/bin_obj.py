@@ -1,4 +1,12 @@
+# stdlib
+from typing import Iterable
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
 # third party
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from syft import deserialize
 from syft import serialize
 from syft.proto.lib.pandas.frame_pb2 import PandasDataFrame as PandasDataFrame_PB
@@ -7,40 +15,265 @@ from syft.proto.lib.torch.tensor_pb2 import TensorProto as TensorProto_PB
 # grid relative
 from .. import BaseModel
 from .. import db
+from .blob_backend import BlobBackend
+from .blob_backend import Buffer
+from .blob_backend import delete_blobs
+from .blob_backend import get_blob_backend
+from .blob_backend import released
+from .columnar import PARQUET_CODEC
+from .columnar import decode_parquet
+from .columnar import encode_parquet
+from .columnar import is_parquet_encodable
+from .compression import compress_payload
+from .compression import decompress
+from .dedup import content_hash
+from .dedup import is_dedup_enabled
+from .tensor_codec import PROTOBUF_CODEC
+from .tensor_codec import RAW_CODEC
+from .tensor_codec import decode_raw
+from .tensor_codec import encode_raw
+from .tensor_codec import is_raw_encodable
 
 bin_to_proto = {
     TensorProto_PB.__name__: TensorProto_PB,
     PandasDataFrame_PB.__name__: PandasDataFrame_PB,
 }
 
+# Session.info key of the payloads to be deleted when the session commits
+PENDING_BLOB_DELETES = "pending_blob_deletes"
+
+
+def delete_blobs_on_commit(
+    session: Session, refs: Iterable[Tuple[Optional[str], Optional[str]]]
+) -> None:
+    """Delete (backend name, blob reference) payloads once the rows pointing
+    to them are gone for good. A rollback keeps them."""
+    session.info.setdefault(PENDING_BLOB_DELETES, []).extend(refs)
+
+
+@event.listens_for(Session, "after_commit")
+def _delete_pending_blobs(session: Session) -> None:
+    delete_blobs(session.info.pop(PENDING_BLOB_DELETES, []))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending_blobs(session: Session) -> None:
+    session.info.pop(PENDING_BLOB_DELETES, None)
+
+
+class StoredBytes(NamedTuple):
+    """Payload as it is stored: possibly compressed, with its logical size."""
+
+    data: bytes
+    compression: Optional[str]
+    size: int
+
+
+class StoredPayload:
+    """Columns and accessors of a serialized payload, stored inline or
+    through a blob backend, possibly compressed."""
+
+    binary = db.Column(db.LargeBinary(3072))
+    # Payloads are inline (binary) unless a blob backend holds them (blob_ref)
+    backend = db.Column(db.String(64))
+    blob_ref = db.Column(db.String(256))
+    # Logical (serialized) and stored (possibly compressed) payload bytes
+    size = db.Column(db.BigInteger())
+    stored_size = db.Column(db.BigInteger())
+    # Compression codec of the stored payload, NULL if it isn't compressed
+    compression = db.Column(db.String(64))
+
+    @property
+    def payload(self) -> Buffer:
+        if self.compression is None:
+            return self.stored_payload
+        with released(self.stored_payload) as stored:
+            return decompress(stored, self.compression)
+
+    @property
+    def stored_payload(self) -> Buffer:
+        """Payload bytes as stored, without decompressing them."""
+        if self.blob_ref is None:
+            return self.binary
+        return get_blob_backend(self.backend).read(self.blob_ref)
+
+    @payload.setter
+    def payload(self, data: bytes) -> None:
+        self.store_payload(data)
+
+    def store_payload(self, data: bytes, backend: Optional[BlobBackend] = None) -> None:
+        """Write the serialized payload through a blob backend.
+
+        Args:
+            data: Serialized object.
+            backend: Destination backend, the configured one by default.
+        """
+        stored, compression = compress_payload(data)
+        self.store_compressed(StoredBytes(stored, compression, len(data)), backend)
+
+    def store_compressed(
+        self, stored: StoredBytes, backend: Optional[BlobBackend] = None
+    ) -> None:
+        """Write a payload that is already in its stored form, e.g. copied
+        from another node, without compressing it again."""
+        if backend is None:
+            backend = get_blob_backend()
+
+        self.compression = stored.compression
+        self.blob_ref = backend.write(stored.data)
+        self.backend = backend.name
+        self.binary = stored.data if self.blob_ref is None else None
+        self.size = stored.size
+        self.stored_size = len(stored.data)
+
+    @property
+    def payload_size(self) -> int:
+        if self.size is not None:
+            return self.size
+        return len(self.binary or b"")
+
 
-class BinObject(BaseModel):
+class Blob(StoredPayload, BaseModel):
+    """Payload shared by every BinObject with the same content.
+
+    Columns:
+        hash (String, Primary Key): BLAKE2b digest of the serialized payload.
+        refcount (BigInteger): Number of BinObjects pointing to the payload.
+            The blob is deleted when it drops to 0.
+    """
+
+    __tablename__ = "blob"
+
+    hash = db.Column(db.String(128), primary_key=True)
+    refcount = db.Column(db.BigInteger(), nullable=False, default=0)
+
+
+class BinObject(StoredPayload, BaseModel):
     __tablename__ = "bin_object"
 
     id = db.Column(db.String(3072), primary_key=True)
-    binary = db.Column(db.LargeBinary(3072))
     protobuf_name = db.Column(db.String(3072))
+    # Payload encoding: "protobuf" (NULL on older rows), "raw" or "parquet"
+    codec = db.Column(db.String(64))
+    # Deduplicated payloads live in the blob table, only `size` is kept here
+    content_hash = db.Column(db.String(128), db.ForeignKey("blob.hash"), index=True)
+    blob = db.relationship(Blob, lazy="joined")
+    # Payload of a deduplicated object that isn't stored yet
+    pending_payload: Optional[bytes] = None
+
+    @property
+    def payload(self) -> Buffer:
+        if self.content_hash is not None:
+            if self.pending_payload is not None:
+                return self.pending_payload
+            return self.blob.payload
+        return StoredPayload.payload.fget(self)
+
+    @payload.setter
+    def payload(self, data: bytes) -> None:
+        self.store_payload(data)
+
+    def store_payload(self, data: bytes, backend: Optional[BlobBackend] = None) -> None:
+        """Write the serialized payload through a blob backend, or only
+        record its content hash when deduplication is enabled. The store then
+        points the object to the shared blob, writing it if it is new.
+
+        Args:
+            data: Serialized object.
+            backend: Destination backend, the configured one by default. An
+                explicit backend always writes a private copy.
+        """
+        if backend is None and is_dedup_enabled():
+            self.content_hash = content_hash(data)
+            self.pending_payload = data
+            self.binary = self.backend = self.blob_ref = None
+            self.compression = self.stored_size = None
+            self.size = len(data)
+            return
+
+        self.content_hash = None
+        self.pending_payload = None
+        StoredPayload.store_payload(self, data, backend=backend)
 
     @property
     def object(self):
+        if self.codec == RAW_CODEC:
+            return decode_raw(self.payload)
+        if self.codec == PARQUET_CODEC:
+            with released(self.payload) as payload:
+                return decode_parquet(payload)
+
         _proto_struct = bin_to_proto[self.protobuf_name]()
-        _proto_struct.ParseFromString(self.binary)
+        with released(self.payload) as payload:
+            _proto_struct.ParseFromString(payload)
         _obj = deserialize(blob=_proto_struct)
         return _obj
 
     @object.setter
     def object(self, value):
+        # Plain tensors skip protobuf: their buffer is stored as is
+        if is_raw_encodable(value):
+            self.codec = RAW_CODEC
+            self.protobuf_name = None
+            self.payload = encode_raw(value)
+            return
+        # DataFrames are stored as Parquet tables when columnar storage is on,
+        # so their columns can be read on their own
+        if is_parquet_encodable(value):
+            self.codec = PARQUET_CODEC
+            self.protobuf_name = None
+            self.payload = encode_parquet(value)
+            return
+
         serialized_value = serialize(value)
-        self.binary = serialized_value.SerializeToString()
+        self.codec = PROTOBUF_CODEC
         self.protobuf_name = serialized_value.__class__.__name__
+        self.payload = serialized_value.SerializeToString()
 
 
 class ObjectMetadata(BaseModel):
     __tablename__ = "obj_metadata"
 
     id = db.Column(db.Integer(), primary_key=True, autoincrement=True)
-    obj = db.Column(db.Integer, db.ForeignKey("bin_object.id"))
+    obj = db.Column(db.Integer, db.ForeignKey("bin_object.id"), unique=True)
     tags = db.Column(db.JSON())
     description = db.Column(db.String())
-    read_permissions = db.Column(db.JSON())
+    # Legacy permissions, moved to the object_permission table when read
+    read_permissions = db.Column(db.JSON(none_as_null=True))
     search_permissions = db.Column(db.JSON())
+    # Fully qualified type of the stored data, e.g. "torch.Tensor"
+    obj_type = db.Column(db.String(256), index=True)
+
+
+class ObjectTag(BaseModel):
+    """Inverted index of object tags, one row per (object, tag) pair."""
+
+    __tablename__ = "object_tag"
+
+    id = db.Column(db.Integer(), primary_key=True, autoincrement=True)
+    obj = db.Column(db.String(3072), db.ForeignKey("bin_object.id"), index=True)
+    tag = db.Column(db.String(3072), index=True)
+
+
+class ObjectPermission(BaseModel):
+    """Permissions of verify keys over stored objects, one row per
+    (object, verify key, kind) triple.
+
+    Columns:
+        obj (String, Foreign Key): Object ID.
+        verify_key (String): Hex encoded verify key.
+        kind (String): Permission kind, "read" or "search".
+        request_id (String): Request that granted the permission, if any.
+    """
+
+    __tablename__ = "object_permission"
+    __table_args__ = (
+        db.UniqueConstraint("obj", "verify_key", "kind", name="uq_object_permission"),
+    )
+
+    id = db.Column(db.Integer(), primary_key=True, autoincrement=True)
+    # (obj, verify_key, kind) lookups use the unique constraint index
+    obj = db.Column(db.String(3072), db.ForeignKey("bin_object.id"))
+    verify_key = db.Column(db.String(256), index=True)
+    kind = db.Column(db.String(16))
+    request_id = db.Column(db.String(256))
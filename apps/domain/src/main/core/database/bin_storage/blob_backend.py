@@ -0,0 +1,206 @@
+# stdlib
+from contextlib import contextmanager
+import mmap
+import os
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+from typing import Union
+import uuid
+
+# Name of the backend used for new objects: "database" (default) or "filesystem"
+BLOB_BACKEND = "BLOB_BACKEND"
+# Root directory of the filesystem backend, required to use it: payloads must
+# land on persistent storage, not in a temporary directory
+BLOB_STORAGE_PATH = "BLOB_STORAGE_PATH"
+
+# Payload files smaller than this are read into memory instead of mapped
+MMAP_MIN_SIZE = 1 << 20
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+@contextmanager
+def released(payload: Buffer) -> Iterator[Buffer]:
+    """Use a payload that is decoded into a copy, then unmap it if it was read
+    through a memory map. A mapping the decoded object still points to
+    (exported buffer) is left open, it is closed when the object goes away.
+    """
+    try:
+        yield payload
+    finally:
+        if isinstance(payload, mmap.mmap):
+            try:
+                payload.close()
+            except BufferError:
+                pass
+
+
+def fsync_dir(path: str) -> None:
+    """Persist the entries of a directory (created, renamed files)."""
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class BlobBackend:
+    """Storage of BinObject payloads.
+
+    A backend writes a serialized payload and returns a reference to it. The
+    reference is what gets persisted in the `bin_object` table, next to the
+    backend name, so rows written by different backends can coexist.
+    """
+
+    name = ""
+
+    def write(self, data: bytes) -> Optional[str]:
+        raise NotImplementedError
+
+    def read(self, ref: Optional[str]) -> Buffer:
+        raise NotImplementedError
+
+    def delete(self, ref: Optional[str]) -> None:
+        raise NotImplementedError
+
+
+class DatabaseBlobBackend(BlobBackend):
+    """Keeps payloads inline, in the `BinObject.binary` column.
+
+    Reads and writes are handled by BinObject itself, this class only exists
+    so the inline storage can be selected like any other backend.
+    """
+
+    name = "database"
+
+    def write(self, data: bytes) -> Optional[str]:
+        return None
+
+    def read(self, ref: Optional[str]) -> Buffer:
+        raise ValueError("Inline payloads are read from BinObject.binary")
+
+    def delete(self, ref: Optional[str]) -> None:
+        pass
+
+
+class FileSystemBlobBackend(BlobBackend):
+    """Stores each payload in its own file under a root directory.
+
+    Large payloads are read through a private (copy-on-write) memory map, so
+    deserializers that accept buffers work straight on the page cache instead
+    of on a copy, and writes to the mapping never reach the file. Decoders
+    that copy the payload anyway close the mapping when they are done (see
+    `released`). Payloads under MMAP_MIN_SIZE are read into a bytearray,
+    which is writable as well.
+
+    Files are synced to disk, and renamed into place, before their reference
+    is returned: a committed row never points to a missing or partial file.
+
+    Args:
+        root: Directory where payload files are written.
+    """
+
+    name = "filesystem"
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def path(self, ref: str) -> str:
+        # Spread files over 256 sub directories to keep them small
+        return os.path.join(self.root, ref[:2], ref)
+
+    def write(self, data: bytes) -> Optional[str]:
+        ref = uuid.uuid4().hex
+        path = self.path(ref)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+            fsync_dir(self.root)
+
+        # Readers never see a partially written file
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        fsync_dir(directory)
+        return ref
+
+    def read(self, ref: Optional[str]) -> Buffer:
+        with open(self.path(ref), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < MMAP_MIN_SIZE:
+                # Empty files can't be mapped, small ones aren't worth it
+                data = bytearray(size)
+                f.readinto(data)
+                return data
+            # The mapping keeps its own handle, it outlives the file object
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    def delete(self, ref: Optional[str]) -> None:
+        try:
+            os.remove(self.path(ref))
+        except FileNotFoundError:
+            pass
+
+    def refs(self) -> Iterable[str]:
+        """Iterate over the references of every payload file."""
+        if not os.path.isdir(self.root):
+            return
+        for subdir in os.listdir(self.root):
+            subdir_path = os.path.join(self.root, subdir)
+            if not os.path.isdir(subdir_path):
+                continue
+            for name in os.listdir(subdir_path):
+                if not name.endswith(".tmp"):
+                    yield name
+
+
+_backends: Dict[str, BlobBackend] = {}
+
+
+def get_blob_backend(name: Optional[str] = None) -> BlobBackend:
+    """Return the backend registered under `name`.
+
+    Args:
+        name: Backend name. Rows written before backends existed have no
+            backend name and are stored inline. If `name` is None, the backend
+            configured by the BLOB_BACKEND environment variable is returned.
+    Returns:
+        backend: BlobBackend instance.
+    Raises:
+        ValueError: If there's no backend with this name.
+        ValueError: If the filesystem backend is requested and
+            BLOB_STORAGE_PATH isn't set.
+    """
+    if name is None:
+        name = os.getenv(BLOB_BACKEND, DatabaseBlobBackend.name)
+
+    if name not in _backends:
+        if name == DatabaseBlobBackend.name:
+            _backends[name] = DatabaseBlobBackend()
+        elif name == FileSystemBlobBackend.name:
+            root = os.getenv(BLOB_STORAGE_PATH, None)
+            if not root:
+                raise ValueError(
+                    f"{BLOB_STORAGE_PATH} must be set to use the {name} blob backend"
+                )
+            _backends[name] = FileSystemBlobBackend(root=root)
+        else:
+            raise ValueError(f"Unknown blob backend: {name}")
+
+    return _backends[name]
+
+
+def delete_blobs(refs: Iterable[Tuple[Optional[str], Optional[str]]]) -> None:
+    """Delete payloads given as (backend name, blob reference) pairs. Inline
+    payloads have no reference and go away with their rows."""
+    for backend, ref in refs:
+        if ref is not None:
+            get_blob_backend(backend).delete(ref)
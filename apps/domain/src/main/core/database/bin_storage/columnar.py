@@ -0,0 +1,139 @@
+# stdlib
+import os
+from typing import Any
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+# third party
+from pandas import DataFrame
+
+try:
+    # third party
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+
+# grid relative
+from .blob_backend import Buffer
+
+PARQUET_CODEC = "parquet"
+
+# Storage of dataset files: "tensor" (default, one float tensor per file) or
+# "columnar" (one Parquet table per file, with column names and dtypes)
+DATASET_STORAGE = "DATASET_STORAGE"
+COLUMNAR_STORAGE = "columnar"
+# Rows per Parquet row group, the unit of row range reads
+PARQUET_ROW_GROUP_SIZE = "PARQUET_ROW_GROUP_SIZE"
+
+DEFAULT_ROW_GROUP_SIZE = 64 * 1024
+
+# Columns pyarrow adds to store a DataFrame index that isn't a plain range
+INDEX_COLUMN_PREFIX = "__index_level_"
+
+
+def is_columnar_enabled() -> bool:
+    if os.getenv(DATASET_STORAGE, "") != COLUMNAR_STORAGE:
+        return False
+    if pa is None:
+        raise ImportError(
+            "Columnar dataset storage requires the pyarrow package (columnar extra)"
+        )
+    return True
+
+
+def is_parquet_encodable(value: Any) -> bool:
+    """Whether `value` is a DataFrame to be stored as a Parquet table."""
+    return type(value) is DataFrame and is_columnar_enabled()
+
+
+def encode_parquet(df: DataFrame) -> bytes:
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    row_group_size = int(os.getenv(PARQUET_ROW_GROUP_SIZE, DEFAULT_ROW_GROUP_SIZE))
+    pq.write_table(table, sink, row_group_size=row_group_size)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_parquet(
+    payload: Buffer,
+    columns: Optional[Sequence[str]] = None,
+    rows: Optional[Tuple[int, int]] = None,
+) -> DataFrame:
+    """Read a Parquet table, or only some of its columns and rows.
+
+    Only the requested columns are decoded, and only from the row groups that
+    overlap the requested rows.
+
+    Args:
+        payload: Parquet file.
+        columns: Names of the columns to read, all of them by default.
+        rows: (start, stop) range of rows to read, all of them by default.
+    Returns:
+        df: DataFrame of the selected rows and columns.
+    """
+    parquet_file = pq.ParquetFile(pa.BufferReader(pa.py_buffer(payload)))
+    columns = list(columns) if columns is not None else None
+    if rows is None:
+        return parquet_file.read(columns=columns).to_pandas()
+
+    start, stop, _ = slice(*rows).indices(parquet_file.metadata.num_rows)
+    stop = max(start, stop)
+    groups = []
+    first_row = None
+    offset = 0
+    for i in range(parquet_file.num_row_groups):
+        num_rows = parquet_file.metadata.row_group(i).num_rows
+        if offset < stop and offset + num_rows > start:
+            groups.append(i)
+            if first_row is None:
+                first_row = offset
+        offset += num_rows
+
+    if not groups:
+        table = parquet_file.schema_arrow.empty_table()
+        return (table if columns is None else table.select(columns)).to_pandas()
+
+    table = parquet_file.read_row_groups(groups, columns=columns)
+    df = table.slice(start - first_row, stop - start).to_pandas()
+    # Rows keep their position in the whole table
+    df.index = range(start, start + len(df))
+    return df
+
+
+def parquet_columns(payload: Buffer) -> List[dict]:
+    """Names, dtypes and null counts of the columns of a Parquet table, read
+    from its footer only."""
+    parquet_file = pq.ParquetFile(pa.BufferReader(pa.py_buffer(payload)))
+    metadata = parquet_file.metadata
+    columns = []
+    for i, field in enumerate(parquet_file.schema_arrow):
+        if field.name.startswith(INDEX_COLUMN_PREFIX):
+            continue
+        null_count = 0
+        for group in range(metadata.num_row_groups):
+            statistics = metadata.row_group(group).column(i).statistics
+            if statistics is not None and statistics.has_null_count:
+                null_count += statistics.null_count
+        columns.append(
+            {"name": field.name, "dtype": str(field.type), "null_count": null_count}
+        )
+    return columns
+
+
+def slice_table(
+    df: DataFrame,
+    columns: Optional[Sequence[str]] = None,
+    rows: Optional[Tuple[int, int]] = None,
+) -> DataFrame:
+    """Select columns and a range of rows of a DataFrame that is already in
+    memory, as `decode_parquet` does from a stored table."""
+    if type(df) is not DataFrame:
+        raise TypeError(f"{type(df).__name__} object is not a table")
+    if columns is not None:
+        df = df[list(columns)]
+    if rows is not None:
+        df = df.iloc[rows[0] : rows[1]]
+    return df
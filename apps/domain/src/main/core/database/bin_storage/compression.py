@@ -0,0 +1,129 @@
+# stdlib
+import os
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+# third party
+from sqlalchemy import func
+
+try:
+    # third party
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    # third party
+    import lz4.frame
+except ImportError:  # pragma: no cover
+    lz4 = None
+
+ZSTD = "zstd"
+LZ4 = "lz4"
+
+# Codec of new payloads: "zstd", "lz4" or unset (no compression)
+BLOB_COMPRESSION = "BLOB_COMPRESSION"
+# Codec level, zstd: 1-22 (default 3), lz4: 0-16 (default 0)
+BLOB_COMPRESSION_LEVEL = "BLOB_COMPRESSION_LEVEL"
+# Payloads smaller than this (in bytes) are stored as is
+BLOB_COMPRESSION_THRESHOLD = "BLOB_COMPRESSION_THRESHOLD"
+
+DEFAULT_LEVELS = {ZSTD: 3, LZ4: 0}
+DEFAULT_THRESHOLD = 64 * 1024
+
+
+def compress(data: bytes, codec: str, level: Optional[int] = None) -> bytes:
+    if level is None:
+        level = DEFAULT_LEVELS[codec]
+
+    if codec == ZSTD:
+        if zstandard is None:
+            raise ImportError(
+                "zstd compression requires the zstandard package (compression extra)"
+            )
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    elif codec == LZ4:
+        if lz4 is None:
+            raise ImportError(
+                "lz4 compression requires the lz4 package (compression extra)"
+            )
+        return lz4.frame.compress(data, compression_level=level)
+
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+def decompress(data: bytes, codec: Optional[str]) -> bytes:
+    if codec is None:
+        return data
+
+    if codec == ZSTD:
+        if zstandard is None:
+            raise ImportError(
+                "zstd compression requires the zstandard package (compression extra)"
+            )
+        return zstandard.ZstdDecompressor().decompress(data)
+    elif codec == LZ4:
+        if lz4 is None:
+            raise ImportError(
+                "lz4 compression requires the lz4 package (compression extra)"
+            )
+        return lz4.frame.decompress(data)
+
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+def compress_payload(data: bytes) -> Tuple[bytes, Optional[str]]:
+    """Compress a payload with the configured codec.
+
+    Small payloads, and payloads that don't get smaller, are left as they are.
+
+    Args:
+        data: Payload to be stored.
+    Returns:
+        stored: Bytes to be stored.
+        codec: Codec used to compress them, None if they are not compressed.
+    """
+    codec = os.getenv(BLOB_COMPRESSION, None)
+    threshold = int(os.getenv(BLOB_COMPRESSION_THRESHOLD, DEFAULT_THRESHOLD))
+    if not codec or len(data) < threshold:
+        return data, None
+
+    level = os.getenv(BLOB_COMPRESSION_LEVEL, None)
+    compressed = compress(data, codec, level=int(level) if level else None)
+    if len(compressed) >= len(data):
+        return data, None
+
+    return compressed, codec
+
+
+def compression_stats(session, model) -> Dict[str, Dict[str, int]]:
+    """Stored vs logical bytes of a blob table, per compression codec.
+
+    Args:
+        session: Database session.
+        model: Model with `compression`, `size` (logical bytes) and
+            `stored_size` columns.
+    Returns:
+        stats: {codec: {"objects", "logical_bytes", "stored_bytes"}}, with
+            uncompressed rows under "none".
+    """
+    rows = (
+        session.query(
+            model.compression,
+            func.count(),
+            func.sum(model.size),
+            func.sum(func.coalesce(model.stored_size, model.size)),
+        )
+        .group_by(model.compression)
+        .all()
+    )
+    return {
+        codec
+        or "none": {
+            "objects": count,
+            "logical_bytes": int(logical or 0),
+            "stored_bytes": int(stored or 0),
+        }
+        for codec, count, logical, stored in rows
+    }
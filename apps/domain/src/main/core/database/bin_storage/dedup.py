@@ -0,0 +1,16 @@
+# stdlib
+import hashlib
+import os
+
+# Store identical payloads once, keyed by their content hash ("true") or
+# give every object its own copy (default)
+BLOB_DEDUP = "BLOB_DEDUP"
+
+
+def is_dedup_enabled() -> bool:
+    return os.getenv(BLOB_DEDUP, "").lower() in ("1", "true")
+
+
+def content_hash(data: bytes) -> str:
+    """BLAKE2b digest of a serialized payload."""
+    return hashlib.blake2b(data, digest_size=32).hexdigest()
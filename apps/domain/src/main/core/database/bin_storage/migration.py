@@ -0,0 +1,63 @@
+# stdlib
+from typing import Dict
+
+# third party
+from sqlalchemy import func
+from sqlalchemy import true
+
+# grid relative
+from .bin_obj import BinObject
+from .bin_obj import Blob
+from .bin_obj import delete_blobs_on_commit
+from .blob_backend import DatabaseBlobBackend
+from .blob_backend import get_blob_backend
+from .blob_backend import released
+
+
+def migrate_blobs(db, target: str, batch_size: int = 100) -> Dict[str, int]:
+    """Move every BinObject payload, and every shared (deduplicated) payload,
+    to the `target` blob backend.
+
+    Rows are moved in batches, one transaction per batch, so the migration can
+    be interrupted and restarted. Old payloads are only deleted after the
+    batch that references the new ones is committed.
+
+    Args:
+        db: Flask-SQLAlchemy database instance.
+        target: Name of the destination backend ("database" or "filesystem").
+        batch_size: Number of rows moved per transaction.
+    Returns:
+        result: Number of objects and bytes moved.
+    """
+    backend = get_blob_backend(target)
+    result = {"objects": 0, "bytes": 0}
+
+    # Deduplicated objects have no payload of their own, their blob is moved
+    private = BinObject.content_hash.is_(None)
+    for model, condition in ((BinObject, private), (Blob, true())):
+        # Rows written before blob backends existed are inline
+        row_backend = func.coalesce(model.backend, DatabaseBlobBackend.name)
+
+        while True:
+            rows = (
+                db.session.query(model)
+                .filter(condition, row_backend != backend.name)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            old_refs = []
+            for row in rows:
+                with released(row.payload) as payload:
+                    data = bytes(payload)
+                old_refs.append((row.backend, row.blob_ref))
+                row.store_payload(data, backend=backend)
+                result["objects"] += 1
+                result["bytes"] += len(data)
+
+            delete_blobs_on_commit(db.session(), old_refs)
+            db.session.commit()
+
+    return result
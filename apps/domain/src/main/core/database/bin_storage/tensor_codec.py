@@ -0,0 +1,163 @@
+# stdlib
+import json
+import os
+import struct
+from typing import Any
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+# third party
+import numpy as np
+import torch as th
+
+# grid relative
+from .blob_backend import Buffer
+
+PROTOBUF_CODEC = "protobuf"
+RAW_CODEC = "raw"
+
+# Codec of new plain tensors / arrays: "raw" (default) or "protobuf"
+TENSOR_CODEC = "TENSOR_CODEC"
+
+# Raw layout: <header length: uint32 LE><JSON header, space padded><buffer>
+# The buffer starts at a multiple of DATA_ALIGNMENT so every dtype can be
+# viewed in place.
+HEADER_LENGTH = struct.Struct("<I")
+DATA_ALIGNMENT = 64
+
+TORCH_DTYPES = {
+    th.bool: "bool",
+    th.uint8: "uint8",
+    th.int8: "int8",
+    th.int16: "int16",
+    th.int32: "int32",
+    th.int64: "int64",
+    th.float16: "float16",
+    th.float32: "float32",
+    th.float64: "float64",
+    th.complex64: "complex64",
+    th.complex128: "complex128",
+}
+
+
+def is_raw_encodable(value: Any) -> bool:
+    """Whether `value` is a plain CPU tensor or numpy array that the raw codec
+    can store without losing information. Subclasses (e.g. nn.Parameter),
+    sparse tensors, tensors with a gradient (the raw layout has no room for
+    it) and object arrays keep going through protobuf."""
+    if os.getenv(TENSOR_CODEC, RAW_CODEC) != RAW_CODEC:
+        return False
+
+    if type(value) is th.Tensor:
+        return (
+            value.layout == th.strided
+            and value.device.type == "cpu"
+            and value.dtype in TORCH_DTYPES
+            and value.grad is None
+        )
+
+    if type(value) is np.ndarray:
+        return not value.dtype.hasobject and value.dtype.fields is None
+
+    return False
+
+
+def encode_raw(value: Union[th.Tensor, np.ndarray]) -> bytes:
+    """Serialize a plain tensor / array as a small header followed by its raw
+    contiguous buffer."""
+    if isinstance(value, th.Tensor):
+        header = {"type": "torch", "requires_grad": value.requires_grad}
+        array = value.detach().contiguous().numpy()
+    else:
+        header = {"type": "numpy"}
+        # np.ascontiguousarray would turn 0-d arrays into 1-d ones
+        array = value if value.flags.c_contiguous else value.copy(order="C")
+
+    # Strides are in bytes, as numpy reports them
+    header["strides"] = list(array.strides)
+    header["dtype"] = array.dtype.str
+    header["shape"] = list(array.shape)
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    padding = -(HEADER_LENGTH.size + len(header_bytes)) % DATA_ALIGNMENT
+    header_bytes += b" " * padding
+
+    # A flat byte view of the array, joined without intermediate copies
+    data = memoryview(array.reshape(-1).view(np.uint8))
+    return b"".join([HEADER_LENGTH.pack(len(header_bytes)), header_bytes, data])
+
+
+def decode_raw(
+    payload: Buffer, rows: Optional[Tuple[int, int]] = None
+) -> Union[th.Tensor, np.ndarray]:
+    """Rebuild a tensor / array from the payload buffer, without decoding its
+    elements one by one.
+
+    Writable buffers are used in place, without any copy: only uncompressed
+    payloads of the filesystem backend, read through copy-on-write mappings
+    or into private bytearrays, are. Read-only ones (inline payloads of the
+    database backend, as returned by the driver, and decompressed payloads)
+    are copied once, so in-place operations on the result can't corrupt the
+    buffer they came from.
+
+    Args:
+        payload: Raw encoded tensor / array.
+        rows: (start, stop) range along the first dimension. Only the bytes
+            of these rows are viewed (or copied), all of them by default.
+    """
+    view = memoryview(payload)
+    (header_length,) = HEADER_LENGTH.unpack_from(view, 0)
+    offset = HEADER_LENGTH.size + header_length
+    header = json.loads(bytes(view[HEADER_LENGTH.size : offset]))
+
+    dtype = np.dtype(header["dtype"])
+    shape = tuple(header["shape"])
+    if rows is not None:
+        if not shape:
+            raise ValueError("A 0-d tensor has no rows")
+        # Rows are contiguous in the C ordered buffer
+        start, stop, _ = slice(*rows).indices(shape[0])
+        stop = max(start, stop)
+        row_size = int(np.prod(shape[1:], dtype=np.int64))
+        offset += start * row_size * dtype.itemsize
+        shape = (stop - start,) + shape[1:]
+    count = int(np.prod(shape, dtype=np.int64))
+
+    if count == 0:
+        array = np.empty(shape, dtype=dtype)
+    else:
+        if view.readonly:
+            view = memoryview(bytearray(view[offset : offset + count * dtype.itemsize]))
+            offset = 0
+        array = np.frombuffer(view, dtype=dtype, count=count, offset=offset)
+        array = array.reshape(shape)
+
+    if header["type"] == "torch":
+        tensor = th.from_numpy(array)
+        if header.get("requires_grad", False):
+            tensor.requires_grad_(True)
+        return tensor
+
+    return array
+
+
+def slice_array(
+    value: Union[th.Tensor, np.ndarray],
+    rows: Optional[Tuple[int, int]] = None,
+    columns: Optional[Sequence[int]] = None,
+) -> Union[th.Tensor, np.ndarray]:
+    """Select a range of rows (first dimension) and some columns (second
+    dimension) of a tensor / array.
+
+    Raises:
+        ValueError: If columns are selected from a 1-D tensor.
+    """
+    if rows is not None:
+        value = value[rows[0] : rows[1]]
+    if columns is not None:
+        if len(value.shape) < 2:
+            raise ValueError("Columns can't be selected from a 1-D tensor")
+        value = value[:, list(columns)]
+    return value
@@ -0,0 +1,85 @@
+# stdlib
+import hashlib
+from typing import Tuple
+import uuid
+
+# grid relative
+from .. import BaseModel
+from .. import db
+
+# Primary key of the single row of the dataset_catalog table
+CATALOG_ID = 1
+
+
+class CatalogState(BaseModel):
+    """Version of the dataset catalog, shared by every worker of the node.
+
+    Columns:
+        id (Integer, Primary Key): Always CATALOG_ID.
+        epoch (String): Random tag of the row, set when it is created, so tags
+            issued against a previous database never match.
+        version (BigInteger): Bumped by every change of the dataset tables.
+    """
+
+    __tablename__ = "dataset_catalog"
+
+    id = db.Column(db.Integer(), primary_key=True)
+    epoch = db.Column(db.String(32))
+    version = db.Column(db.BigInteger(), nullable=False, default=0)
+
+
+class CatalogVersion:
+    """Version of the dataset catalog, bumped by every change of the dataset
+    tables. Listings are tagged with it, so a client holding an unchanged
+    listing is answered with a primary key lookup instead of a catalog query.
+
+    The version is kept in the database, in the transaction of the change it
+    tracks: every worker process sees it move as soon as the change is
+    committed, and a rolled back change leaves it alone.
+    """
+
+    @property
+    def version(self) -> int:
+        return self._state()[1]
+
+    def bump(self, commit: bool = False) -> None:
+        """Increment the version in the current session. Call it before the
+        change is committed, so both land in the same transaction.
+
+        Args:
+            commit: Commit the session, for changes that were committed
+                already.
+        """
+        updated = (
+            db.session.query(CatalogState)
+            .filter_by(id=CATALOG_ID)
+            .update({"version": CatalogState.version + 1}, synchronize_session=False)
+        )
+        if not updated:
+            db.session.add(
+                CatalogState(id=CATALOG_ID, epoch=uuid.uuid4().hex[:12], version=1)
+            )
+        if commit:
+            db.session.commit()
+
+    def etag(self, *args) -> str:
+        """Entity tag of a listing at the current version.
+
+        Args:
+            args: Parameters of the listing (page, filters...), listings with
+                other parameters get other tags.
+        """
+        epoch, version = self._state()
+        digest = hashlib.blake2b(repr(args).encode(), digest_size=8).hexdigest()
+        return f"{epoch}-{version}-{digest}"
+
+    def _state(self) -> Tuple[str, int]:
+        state = (
+            db.session.query(CatalogState.epoch, CatalogState.version)
+            .filter_by(id=CATALOG_ID)
+            .first()
+        )
+        return (state[0], state[1]) if state is not None else ("", 0)
+
+
+catalog_version = CatalogVersion()
@@ -35,3 +35,68 @@ class BinObjDataset(BaseModel):
     dataset = db.Column(db.String(256), db.ForeignKey("dataset.id"))
     dtype = db.Column(db.String(256))
     shape = db.Column(db.String(256))
+
+
+class DatasetColumn(BaseModel):
+    """Columns of the dataset files, recorded at ingestion so their names,
+    types and summary statistics are known without reading the data.
+
+    Columns:
+        obj (String, Foreign Key): Object holding the dataset file.
+        position (Integer): Index of the column in the file.
+        name (String): Column name, its index if the file has no header.
+        dtype (String): Stored type of the column values.
+        null_count (BigInteger): Number of missing values.
+        count (BigInteger): Number of values.
+        min, max, mean, std (Float): Statistics of the values of a numeric
+            column, NULL otherwise.
+        histogram (JSON): Bin edges and counts of the values of a numeric
+            column, if histograms are enabled.
+    """
+
+    __tablename__ = "dataset_column"
+
+    id = db.Column(db.Integer(), primary_key=True, autoincrement=True)
+    obj = db.Column(db.String(256), db.ForeignKey("bin_object.id"), index=True)
+    position = db.Column(db.Integer())
+    name = db.Column(db.String(256))
+    dtype = db.Column(db.String(64))
+    null_count = db.Column(db.BigInteger())
+    count = db.Column(db.BigInteger())
+    min = db.Column(db.Float())
+    max = db.Column(db.Float())
+    mean = db.Column(db.Float())
+    std = db.Column(db.Float())
+    histogram = db.Column(db.JSON())
+
+
+class DatasetUploadJob(BaseModel):
+    """State of a dataset upload ingested in the background, readable by
+    every process of the node.
+
+    Columns:
+        id (String, Primary Key): Job id.
+        user_id (Integer): Uploader.
+        status (String): pending, running, completed or failed.
+        bytes_total (BigInteger): Size of the uploaded archive.
+        bytes_processed (BigInteger): Bytes of the archive read so far.
+        members_done, members_failed (Integer): Files parsed, or not.
+        created_at, started_at, finished_at (Float): Unix timestamps.
+        result (JSON): Metadata of the stored dataset.
+        error (String): Why the upload failed.
+    """
+
+    __tablename__ = "dataset_upload_job"
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer())
+    status = db.Column(db.String(16))
+    bytes_total = db.Column(db.BigInteger())
+    bytes_processed = db.Column(db.BigInteger())
+    members_done = db.Column(db.Integer())
+    members_failed = db.Column(db.Integer())
+    created_at = db.Column(db.Float())
+    started_at = db.Column(db.Float())
+    finished_at = db.Column(db.Float(), index=True)
+    result = db.Column(db.JSON())
+    error = db.Column(db.String())
@@ -0,0 +1,101 @@
+# stdlib
+from collections import OrderedDict
+from threading import RLock
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# third party
+from syft.core.store.storeable_object import StorableObject
+
+
+class ObjectCache:
+    """In-process LRU cache of deserialized StorableObjects.
+
+    The cache is bounded by a byte budget rather than by a number of entries.
+    Each entry is accounted with the size of its serialized payload, which is
+    a cheap and stable estimate of the memory held by the deserialized object.
+
+    Args:
+        max_bytes: Byte budget. Least recently used entries are evicted when
+            the cached objects exceed it.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[StorableObject, int]]" = OrderedDict()
+        self._lock = RLock()
+
+    def get(self, key: str) -> Optional[StorableObject]:
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(
+        self, key: str, obj: StorableObject, size: int
+    ) -> List[Tuple[str, StorableObject]]:
+        """Cache an object, evicting least recently used entries to make room.
+
+        Returns:
+            evicted: (key, object) pairs that didn't fit in the budget, i.e.
+                the evicted entries, or the new one if it is larger than the
+                whole budget.
+        """
+        with self._lock:
+            self.invalidate(key)
+
+            # Objects larger than the whole budget would just flush the cache
+            if size > self.max_bytes:
+                return [(key, obj)]
+
+            self._entries[key] = (obj, size)
+            self.current_bytes += size
+
+            evicted = []
+            while self.current_bytes > self.max_bytes:
+                evicted_key, (evicted_obj, evicted_size) = self._entries.popitem(
+                    last=False
+                )
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+                evicted.append((evicted_key, evicted_obj))
+            return evicted
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
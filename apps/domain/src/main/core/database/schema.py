@@ -0,0 +1,138 @@
+# stdlib
+import logging
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+# third party
+from sqlalchemy import Table
+from sqlalchemy import inspect
+from sqlalchemy import text
+
+# Whether a (database URL, table, column) is a primary or unique key
+_unique_keys: Dict[Tuple[str, str, str], bool] = {}
+
+
+def _unique_columns(inspector, table_name: str) -> Set[Tuple[str, ...]]:
+    """Column sets of the primary key, unique constraints and unique indexes
+    of a table."""
+    unique = {tuple(inspector.get_pk_constraint(table_name)["constrained_columns"])}
+    unique.update(
+        tuple(constraint["column_names"])
+        for constraint in inspector.get_unique_constraints(table_name)
+    )
+    unique.update(
+        tuple(index["column_names"])
+        for index in inspector.get_indexes(table_name)
+        if index["unique"]
+    )
+    return unique
+
+
+def has_unique_key(bind, table_name: str, column: str) -> bool:
+    """Whether a column is a primary or unique key of a table in the database,
+    which ON CONFLICT and INSERT OR REPLACE statements rely on. Checked once
+    per database."""
+    key = (str(bind.engine.url), table_name, column)
+    if key not in _unique_keys:
+        _unique_keys[key] = (column,) in _unique_columns(inspect(bind), table_name)
+    return _unique_keys[key]
+
+
+def upgrade_schema(
+    engine, tables: Optional[Iterable[Table]] = None, deduplicate: bool = False
+) -> List[str]:
+    """Bring tables created by older versions up to date with their models.
+
+    `create_all` creates missing tables but never alters existing ones. This
+    adds their missing columns (nullable, rows written before them hold
+    NULL), indexes and single column unique keys. A unique key isn't created
+    while the column holds duplicate values: they are logged, and the table
+    keeps working without the key until they are removed explicitly (see
+    deduplicate_rows.py). Tables that don't exist yet are left to
+    `create_all`.
+
+    Args:
+        engine: Engine of the database.
+        tables: Tables to upgrade, the ones of the main database by default.
+        deduplicate: Delete duplicate values of new unique keys, keeping the
+            most recent row, instead of skipping the keys.
+    Returns:
+        statements: DDL and cleanup statements executed.
+    """
+    if tables is None:
+        # grid relative
+        from . import db
+
+        tables = [
+            table
+            for table in db.Model.metadata.sorted_tables
+            if table.info.get("bind_key", None) is None
+        ]
+
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+    statements = []
+    with engine.begin() as conn:
+        for table in tables:
+            if table.name not in existing:
+                continue
+            name = preparer.format_table(table)
+
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    statements.append(
+                        f"ALTER TABLE {name} ADD COLUMN "
+                        f"{preparer.format_column(column)} {column_type}"
+                    )
+                    conn.execute(text(statements[-1]))
+
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(bind=conn)
+                    statements.append(f"CREATE INDEX {index.name}")
+
+            unique = _unique_columns(inspector, table.name)
+            for column in table.columns:
+                if not column.unique or (column.name,) in unique:
+                    continue
+                # Models with unique columns have a single column primary key
+                (primary_key,) = table.primary_key.columns
+                key = preparer.format_column(column)
+                pk = preparer.format_column(primary_key)
+                duplicates = (
+                    f"FROM {name} WHERE {key} IS NOT NULL AND {pk} NOT IN "
+                    f"(SELECT MAX({pk}) FROM {name} WHERE {key} IS NOT NULL "
+                    f"GROUP BY {key})"
+                )
+                if deduplicate:
+                    statements.append(f"DELETE {duplicates}")
+                    conn.execute(text(statements[-1]))
+                else:
+                    count = conn.execute(text(f"SELECT COUNT(*) {duplicates}"))
+                    count = count.scalar()
+                    if count:
+                        logging.warning(
+                            f"Schema upgrade: {table.name}.{column.name} has "
+                            f"{count} duplicate rows, its unique key isn't "
+                            "created. Run deduplicate_rows.py to remove them "
+                            "(older rows of each value are deleted)."
+                        )
+                        continue
+                statements.append(
+                    f"CREATE UNIQUE INDEX uq_{table.name}_{column.name} "
+                    f"ON {name} ({key})"
+                )
+                conn.execute(text(statements[-1]))
+
+    for statement in statements:
+        logging.info(f"Schema upgrade: {statement}")
+    _unique_keys.clear()
+    return statements
@@ -0,0 +1,254 @@
+# stdlib
+import io
+import json
+import tarfile
+from typing import BinaryIO
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+# grid relative
+from .bin_storage.bin_obj import StoredBytes
+from .bin_storage.json_obj import JsonObject
+from .bin_storage.metadata import get_metadata
+from .dataset.catalog import catalog_version
+from .dataset.datasetgroup import BinObjDataset
+from .dataset.datasetgroup import Dataset
+from .dataset.datasetgroup import DatasetColumn
+from .dataset.datasetgroup import DatasetGroup
+from .store_disk import BATCH_SIZE
+from .store_disk import chunks
+from .store_disk import row_to_dict
+from .store_disk import upsert
+
+# Archive layout, a gzip compressed tar written and read in stream mode:
+#   archive.json                 format version
+#   objects/000000.json          records of a batch of objects
+#   objects/000000.bin           payloads of the same batch, concatenated
+#   tables/<table>/000000.json   rows of the dataset tables
+ARCHIVE_FORMAT = 1
+ARCHIVE_HEADER = "archive.json"
+
+# Dataset tables, in import order
+ARCHIVE_TABLES = [Dataset, JsonObject, BinObjDataset, DatasetGroup, DatasetColumn]
+
+# Relations are replaced by object on import, their auto incremented ids are
+# not kept
+RELATION_KEYS = {
+    BinObjDataset: "obj",
+    DatasetGroup: "bin_object",
+    DatasetColumn: "obj",
+}
+
+DEFAULT_BATCH_SIZE = 100
+
+
+class _StreamBuffer:
+    """Write-only file object whose content is drained after each member."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _add_member(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def iter_archive(db, store, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[bytes]:
+    """Stream the object store and the dataset tables as a tar.gz archive.
+
+    Objects are read in batches, in their stored form (payloads aren't
+    deserialized or decompressed), so memory use is bounded by one batch
+    whatever the size of the store. A payload shared by several objects is
+    written once.
+
+    Args:
+        db: Flask-SQLAlchemy database instance (dataset tables).
+        store: DiskObjectStore, TieredObjectStore or ShardedObjectStore.
+        batch_size: Number of objects, or table rows, per archive member.
+    Returns:
+        chunks: Consecutive chunks of the archive.
+    """
+    buffer = _StreamBuffer()
+    with tarfile.open(fileobj=buffer, mode="w|gz") as tar:
+        header = {"format": ARCHIVE_FORMAT}
+        _add_member(tar, ARCHIVE_HEADER, json.dumps(header).encode())
+
+        exported_blobs = set()
+        n = 0
+        for shard in getattr(store, "shards", [store]):
+            after = None
+            while True:
+                records = shard.dump(
+                    after=after, limit=batch_size, exported_blobs=exported_blobs
+                )
+                if not records:
+                    break
+                after = records[-1][0]["id"]
+
+                rows = []
+                payloads = []
+                offset = 0
+                for record, payload in records:
+                    location = None
+                    if payload is not None:
+                        location = {
+                            "offset": offset,
+                            "length": len(payload.data),
+                            "compression": payload.compression,
+                            "size": payload.size,
+                        }
+                        payloads.append(payload.data)
+                        offset += len(payload.data)
+                    rows.append(dict(record, payload=location))
+
+                _add_member(tar, f"objects/{n:06d}.json", json.dumps(rows).encode())
+                _add_member(tar, f"objects/{n:06d}.bin", b"".join(payloads))
+                n += 1
+                yield buffer.drain()
+
+            if shard.db is not db:
+                shard.db.session.remove()
+
+        for model in ARCHIVE_TABLES:
+            for i, rows in enumerate(_table_pages(db, model, batch_size)):
+                name = f"tables/{model.__tablename__}/{i:06d}.json"
+                _add_member(tar, name, json.dumps(rows).encode())
+                yield buffer.drain()
+
+    yield buffer.drain()
+
+
+def export_archive(
+    db, store, fileobj: BinaryIO, batch_size: int = DEFAULT_BATCH_SIZE
+) -> int:
+    """Write the archive of `iter_archive` to a file object and return its
+    size in bytes."""
+    size = 0
+    for chunk in iter_archive(db, store, batch_size=batch_size):
+        fileobj.write(chunk)
+        size += len(chunk)
+    return size
+
+
+def _table_pages(db, model, batch_size: int) -> Iterator[List[dict]]:
+    key = model.__mapper__.primary_key[0]
+    last = None
+    while True:
+        query = db.session.query(model).order_by(key).limit(batch_size)
+        if last is not None:
+            query = query.filter(key > last)
+        rows = query.all()
+        if not rows:
+            return
+        last = getattr(rows[-1], key.key)
+        yield [row_to_dict(row) for row in rows]
+
+
+def import_archive(db, store, fileobj: BinaryIO) -> Dict[str, int]:
+    """Restore an archive written by `iter_archive`, reading it as a stream.
+
+    Objects are bulk written one archive member at a time (one transaction
+    per batch), replacing the objects and datasets stored under the same ids.
+
+    Args:
+        db: Flask-SQLAlchemy database instance (dataset tables).
+        store: Object store of the node.
+        fileobj: Readable file object of the archive, it isn't seeked.
+    Returns:
+        report: Number of objects, payload bytes and rows of every dataset
+            table restored.
+    Raises:
+        ValueError: If the archive is invalid or has an unsupported format.
+    """
+    tables = {model.__tablename__: model for model in ARCHIVE_TABLES}
+    report = dict.fromkeys(["objects", "bytes", *tables], 0)
+
+    records: Optional[List[dict]] = None
+    with tarfile.open(fileobj=fileobj, mode="r|gz") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            data = tar.extractfile(member).read()
+            name = member.name
+
+            if name == ARCHIVE_HEADER:
+                if json.loads(data).get("format") != ARCHIVE_FORMAT:
+                    raise ValueError("Unsupported archive format")
+            elif name.startswith("objects/") and name.endswith(".json"):
+                records = json.loads(data)
+            elif name.startswith("objects/") and name.endswith(".bin"):
+                if records is None:
+                    raise ValueError(f"Archive member {name} has no records")
+                store.load(_with_payloads(records, data))
+                report["objects"] += len(records)
+                report["bytes"] += len(data)
+                records = None
+            elif name.startswith("tables/") and name.split("/")[1] in tables:
+                model = tables[name.split("/")[1]]
+                report[model.__tablename__] += _load_table(db, model, json.loads(data))
+                catalog_version.bump(commit=True)
+            else:
+                raise ValueError(f"Unknown archive member: {name}")
+
+    return report
+
+
+def _with_payloads(records: List[dict], data: bytes) -> List[tuple]:
+    batch = []
+    for record in records:
+        location = record.pop("payload")
+        payload = None
+        if location is not None:
+            start = location["offset"]
+            payload = StoredBytes(
+                data[start : start + location["length"]],
+                location["compression"],
+                location["size"],
+            )
+        batch.append((record, payload))
+    return batch
+
+
+def _load_table(db, model, rows: List[dict]) -> int:
+    if not rows:
+        return 0
+
+    if model in RELATION_KEYS:
+        column = getattr(model, RELATION_KEYS[model])
+        keys = [row[RELATION_KEYS[model]] for row in rows]
+        for batch in chunks(keys):
+            db.session.query(model).filter(column.in_(batch)).delete(
+                synchronize_session=False
+            )
+        for row in rows:
+            row.pop("id", None)
+        # Keep every statement under SQLite's bound parameters limit
+        for batch in chunks(rows, size=max(1, BATCH_SIZE // len(rows[0]))):
+            db.session.execute(model.__table__.insert().values(batch))
+    else:
+        key = model.__mapper__.primary_key[0]
+        if model is JsonObject:
+            # Datasets counter of the node
+            ids = [row[key.name] for row in rows]
+            existing = sum(
+                db.session.query(key).filter(key.in_(batch)).count()
+                for batch in chunks(ids)
+            )
+            get_metadata(db).length += len(rows) - existing
+        upsert(db.session, model, rows, key=key.name)
+
+    db.session.commit()
+    return len(rows)
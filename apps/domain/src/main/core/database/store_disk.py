@@ -1,15 +1,32 @@
 # stdlib
+from collections import Counter
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict
 from typing import Iterable
+from typing import Iterator
 from typing import KeysView
+from typing import List
 from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+from typing import Union
 from typing import ValuesView
 
 # third party
 from flask import current_app as app
+from flask import has_app_context
 from nacl.encoding import HexEncoder
 from nacl.signing import VerifyKey
+import numpy as np
+from pandas import DataFrame
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects import sqlite
 import syft
 from syft.core.common.group import VERIFYALL
+from syft.core.common.group import VerifyAll
 from syft.core.common.uid import UID
 from syft.core.store import ObjectStore
 from syft.core.store.storeable_object import StorableObject
@@ -17,10 +34,37 @@ from torch import Tensor
 
 # grid relative
 from .bin_storage.bin_obj import BinObject
+from .bin_storage.bin_obj import Blob
 from .bin_storage.bin_obj import ObjectMetadata
+from .bin_storage.bin_obj import ObjectPermission
+from .bin_storage.bin_obj import ObjectTag
+from .bin_storage.bin_obj import StoredBytes
+from .bin_storage.bin_obj import StoredPayload
+from .bin_storage.bin_obj import delete_blobs_on_commit
+from .bin_storage.blob_backend import released
+from .bin_storage.columnar import PARQUET_CODEC
+from .bin_storage.columnar import decode_parquet
+from .bin_storage.columnar import slice_table
+from .bin_storage.compression import compression_stats
+from .bin_storage.tensor_codec import RAW_CODEC
+from .bin_storage.tensor_codec import decode_raw
+from .bin_storage.tensor_codec import slice_array
+from .object_cache import ObjectCache
+from .schema import has_unique_key
+from .write_behind import DELETED
+from .write_behind import WriteBehindQueue
 
 ENCODING = "UTF-8"
 
+READ_PERMISSION = "read"
+SEARCH_PERMISSION = "search"
+# Stored search permission of every verify key (VERIFYALL)
+ALL_VERIFY_KEYS = "*"
+
+# Upper bound of bound parameters used by a single IN (...) clause.
+# SQLite refuses statements with more than 999 variables.
+BATCH_SIZE = 500
+
 
 def create_storable(
     _id: UID, data: Tensor, description: str, tags: Iterable[str]
@@ -36,15 +80,159 @@ def storable_to_dict(storable_obj: StorableObject) -> dict:
     _dict["description"] = storable_obj.description
     # Serialize nacl Verify Keys Structure
     _dict["read_permissions"] = {
-        key.encode(encoder=HexEncoder).decode("utf-8"): None
-        for key in storable_obj.read_permissions.keys()
+        verify_key_to_hex(key): value if isinstance(value, str) else None
+        for key, value in storable_obj.read_permissions.items()
+    }
+    _dict["search_permissions"] = {
+        ALL_VERIFY_KEYS if isinstance(key, VerifyAll) else verify_key_to_hex(key): None
+        for key in (storable_obj.search_permissions or {})
     }
     return _dict
 
 
+def verify_key_to_hex(verify_key: Union[VerifyKey, str]) -> str:
+    if isinstance(verify_key, str):
+        return verify_key
+    return verify_key.encode(encoder=HexEncoder).decode("utf-8")
+
+
+def can_search(obj: StorableObject, verify_key: Union[VerifyKey, str]) -> bool:
+    """Whether a verify key is in the search permissions of an object."""
+    verify_key = verify_key_to_hex(verify_key)
+    return any(
+        isinstance(key, VerifyAll) or verify_key_to_hex(key) == verify_key
+        for key in obj.search_permissions or {}
+    )
+
+
+@lru_cache(maxsize=4096)
+def hex_to_verify_key(verify_key: str) -> VerifyKey:
+    # Keys are shared by many objects, each one is decoded once
+    return VerifyKey(verify_key.encode("utf-8"), encoder=HexEncoder)
+
+
+def get_type_name(obj_type: type) -> str:
+    return f"{obj_type.__module__}.{obj_type.__qualname__}"
+
+
+def get_subtypes(obj_type: type) -> Set[type]:
+    """Return `obj_type` and all its (loaded) subclasses."""
+    types = {obj_type}
+    for subtype in obj_type.__subclasses__():
+        types |= get_subtypes(subtype)
+    return types
+
+
+def row_to_dict(row) -> dict:
+    """Column values of a (not yet persisted) model instance."""
+    return {column.name: getattr(row, column.key) for column in row.__table__.columns}
+
+
+def stored_bytes(row: StoredPayload) -> StoredBytes:
+    """Payload of a row in its stored (possibly compressed) form."""
+    with released(row.stored_payload or b"") as payload:
+        return StoredBytes(bytes(payload), row.compression, row.payload_size)
+
+
+def slice_object(
+    data: object,
+    rows: Optional[Tuple[int, int]] = None,
+    columns: Optional[Sequence[Union[str, int]]] = None,
+) -> Union[DataFrame, Tensor, np.ndarray]:
+    """Select rows and columns of a table or tensor that is already in
+    memory."""
+    if isinstance(data, (Tensor, np.ndarray)):
+        return slice_array(data, rows, columns)
+    return slice_table(data, columns, rows)
+
+
+def chunks(items: List, size: int = BATCH_SIZE) -> Iterable[List]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def upsert(session, model: type, rows: List[dict], key: str) -> None:
+    """Insert rows, replacing the ones with the same `key` column value (ON
+    CONFLICT on PostgreSQL, INSERT OR REPLACE on SQLite).
+
+    Both need a unique key, which tables created by older versions may lack
+    until `upgrade_schema` adds it (or while their duplicate rows aren't
+    removed, see deduplicate_rows.py): rows are then replaced by deleting
+    them first.
+    """
+    if not rows:
+        return
+
+    table = model.__table__
+    bind = session.get_bind(mapper=model.__mapper__)
+    dialect = bind.dialect.name
+    if not has_unique_key(bind, table.name, key):
+        dialect = None
+    # Keep every statement under SQLite's bound parameters limit
+    rows_per_statement = max(1, BATCH_SIZE // len(rows[0]))
+
+    for batch in chunks(rows, size=rows_per_statement):
+        if dialect == "postgresql":
+            stmt = postgresql.insert(table).values(batch)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[key],
+                set_={name: stmt.excluded[name] for name in batch[0] if name != key},
+            )
+        elif dialect == "sqlite":
+            stmt = table.insert().prefix_with("OR REPLACE").values(batch)
+        else:
+            session.query(model).filter(
+                getattr(model, key).in_([row[key] for row in batch])
+            ).delete(synchronize_session=False)
+            stmt = table.insert().values(batch)
+
+        session.execute(stmt)
+
+
 class DiskObjectStore(ObjectStore):
-    def __init__(self, db):
+    """Object store backed by the node database.
+
+    Args:
+        db: Flask-SQLAlchemy database instance.
+        cache_size: Byte budget of an optional in-process LRU cache of
+            deserialized objects. The cache is disabled when it is 0. Cached
+            objects are shared between readers, so changes must be written
+            back through the store to be persisted.
+        page_size: Number of rows fetched per round trip when iterating over
+            the store.
+        write_behind: Maximum number of pending writes of an optional
+            write-behind queue. When it is enabled (> 0), `__setitem__` and
+            `delete` return as soon as the write is queued, and a background
+            thread commits queued writes in batches. Writes are applied in
+            order and pending ones are visible to readers.
+        flush_batch: Number of queued writes committed per transaction.
+        flush_interval: Maximum time (in seconds) a write stays queued.
+    """
+
+    def __init__(
+        self,
+        db,
+        cache_size: int = 0,
+        page_size: int = 100,
+        write_behind: int = 0,
+        flush_batch: int = 100,
+        flush_interval: float = 0.05,
+    ):
         self.db = db
+        self.page_size = page_size
+        self._tag_index_checked = False
+        self._permissions_checked = False
+        self.cache = ObjectCache(max_bytes=cache_size) if cache_size > 0 else None
+        self.write_queue = (
+            WriteBehindQueue(
+                self._write_batch,
+                max_pending=write_behind,
+                flush_batch=flush_batch,
+                flush_interval=flush_interval,
+            )
+            if write_behind > 0
+            else None
+        )
 
     def get_object(self, key: UID) -> Optional[StorableObject]:
         try:
@@ -53,36 +241,175 @@ class DiskObjectStore(ObjectStore):
             return None
 
     def get_objects_of_type(self, obj_type: type) -> Iterable[StorableObject]:
-        return [obj for obj in self.values() if isinstance(obj.data, obj_type)]
+        """Return the stored objects whose data is an instance of `obj_type`.
+        Only the rows whose recorded type matches are deserialized."""
+        self.flush()
+        self._backfill_types()
+        type_names = [get_type_name(t) for t in get_subtypes(obj_type)]
+        rows = (
+            self.db.session.query(BinObject, ObjectMetadata)
+            .join(ObjectMetadata, ObjectMetadata.obj == BinObject.id)
+            .filter(ObjectMetadata.obj_type.in_(type_names))
+            .all()
+        )
+        return self._to_storables(rows)
+
+    def get_metadata_of_type(
+        self, obj_type: type, offset: int = 0, limit: Optional[int] = None
+    ) -> List[ObjectMetadata]:
+        """Return the metadata (id, tags, description...) of the objects whose
+        data is an instance of `obj_type`, without deserializing any of them.
+
+        Args:
+            obj_type: Type of the stored data.
+            offset: Number of matching objects to skip.
+            limit: Maximum number of objects returned, all of them by default.
+        """
+        self.flush()
+        self._backfill_types()
+        type_names = [get_type_name(t) for t in get_subtypes(obj_type)]
+        return (
+            self.db.session.query(ObjectMetadata)
+            .filter(ObjectMetadata.obj_type.in_(type_names))
+            .order_by(ObjectMetadata.obj)
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+
+    def _backfill_types(self) -> None:
+        # Objects stored before types were recorded are deserialized once, a
+        # page at a time: only one page of payloads is held in memory
+        last_id = 0
+        while True:
+            rows = (
+                self.db.session.query(BinObject, ObjectMetadata)
+                .join(ObjectMetadata, ObjectMetadata.obj == BinObject.id)
+                .filter(ObjectMetadata.obj_type.is_(None), ObjectMetadata.id > last_id)
+                .order_by(ObjectMetadata.id)
+                .limit(self.page_size)
+                .all()
+            )
+            if not rows:
+                return
+            last_id = rows[-1][1].id
+
+            for bin_obj, obj_metadata in rows:
+                obj_metadata.obj_type = get_type_name(type(bin_obj.object))
+            self.db.session.commit()
 
     def __sizeof__(self) -> int:
-        return self.values().__sizeof__()
+        self.flush()
+        # Stored payload bytes, computed by the database
+        size = self.db.session.query(
+            func.sum(func.coalesce(BinObject.size, func.length(BinObject.binary)))
+        ).scalar()
+        return int(size or 0)
 
     def __str__(self) -> str:
-        return str(self.values())
+        return f"<{type(self).__name__}: {len(self)} objects>"
 
     def __len__(self) -> int:
+        self.flush()
         return self.db.session.query(ObjectMetadata).count()
 
     def keys(self) -> KeysView[UID]:
-        keys = self.db.session.query(BinObject.id).all()
-        keys = [UID.from_string(k[0]) for k in keys]
-        return keys
+        return list(self.iter_keys())
 
     def values(self) -> ValuesView[StorableObject]:
-        obj_keys = self.keys()
-        values = []
-        for key in obj_keys:
-            values.append(self.__getitem__(key))
-        return values
+        return list(self.iter_values())
+
+    def iter_keys(self, page_size: Optional[int] = None) -> Iterator[UID]:
+        """Lazily iterate over the stored keys, fetching `page_size` rows
+        (the store's page size by default) per round trip."""
+        self.flush()
+        query = self.db.session.query(BinObject.id).order_by(BinObject.id)
+        for (_id,) in query.yield_per(page_size or self.page_size):
+            yield UID.from_string(_id)
+
+    def iter_items(
+        self, page_size: Optional[int] = None
+    ) -> Iterator[Tuple[UID, StorableObject]]:
+        """Lazily iterate over (key, object) pairs.
+
+        Rows are streamed through a server side cursor where the database
+        supports it, so only one page of objects is held in memory at a time.
+        """
+        self.flush()
+        query = (
+            self.db.session.query(BinObject, ObjectMetadata)
+            .join(ObjectMetadata, ObjectMetadata.obj == BinObject.id)
+            .order_by(BinObject.id)
+        )
+        page_size = page_size or self.page_size
+        page = []
+        for row in query.yield_per(page_size):
+            page.append(row)
+            if len(page) == page_size:
+                yield from self._stream_page(page)
+                page = []
+        yield from self._stream_page(page)
+
+    def _stream_page(
+        self, rows: List[Tuple[BinObject, ObjectMetadata]]
+    ) -> Iterator[Tuple[UID, StorableObject]]:
+        for obj, (bin_obj, obj_metadata) in zip(self._to_storables(rows), rows):
+            # Streamed rows shouldn't pile up in the session identity map
+            self.db.session.expunge(bin_obj)
+            self.db.session.expunge(obj_metadata)
+            yield obj.id, obj
+
+    def iter_values(self, page_size: Optional[int] = None) -> Iterator[StorableObject]:
+        for _, obj in self.iter_items(page_size=page_size):
+            yield obj
+
+    def keys_page(self, offset: int = 0, limit: Optional[int] = None) -> List[UID]:
+        """Return one page of keys, in a stable order."""
+        self.flush()
+        query = (
+            self.db.session.query(BinObject.id)
+            .order_by(BinObject.id)
+            .offset(offset)
+            .limit(limit or self.page_size)
+        )
+        return [UID.from_string(_id) for (_id,) in query.all()]
+
+    def values_page(
+        self, offset: int = 0, limit: Optional[int] = None
+    ) -> List[StorableObject]:
+        """Return one page of objects, in the same order as `keys_page`."""
+        self.flush()
+        query = (
+            self.db.session.query(BinObject, ObjectMetadata)
+            .join(ObjectMetadata, ObjectMetadata.obj == BinObject.id)
+            .order_by(BinObject.id)
+            .offset(offset)
+            .limit(limit or self.page_size)
+        )
+        return self._to_storables(query.all())
 
     def __contains__(self, key: UID) -> bool:
+        pending = self._get_pending(key)
+        if pending is not None:
+            return pending is not DELETED
+
         return (
             self.db.session.query(BinObject).filter_by(id=str(key.value)).first()
             is not None
         )
 
     def __getitem__(self, key: UID) -> StorableObject:
+        pending = self._get_pending(key)
+        if pending is DELETED:
+            raise Exception("Object not found!")
+        if pending is not None:
+            return pending
+
+        if self.cache is not None:
+            obj = self.cache.get(str(key.value))
+            if obj is not None:
+                return obj
+
         bin_obj = self.db.session.query(BinObject).filter_by(id=str(key.value)).first()
         obj_metadata = (
             self.db.session.query(ObjectMetadata).filter_by(obj=str(key.value)).first()
@@ -91,9 +418,894 @@ class DiskObjectStore(ObjectStore):
         if not bin_obj or not obj_metadata:
             raise Exception("Object not found!")
 
+        obj = self._to_storables([(bin_obj, obj_metadata)])[0]
+        self._cache_put(bin_obj, obj)
+        return obj
+
+    def __setitem__(self, key: UID, value: StorableObject) -> None:
+        if self.write_queue is not None:
+            self._write_queue().put(key, value)
+            # Readers get the queued value until it is committed
+            self._invalidate(key)
+        else:
+            self.set_many([(key, value)])
+
+    def delete(self, key: UID) -> None:
+        try:
+            if self.write_queue is not None:
+                self._write_queue().delete(key)
+                self._invalidate(key)
+            else:
+                self.delete_many([key])
+        except Exception as e:
+            print(f"{type(self)} Exception in __delitem__ error {key}. {e}")
+
+    def get_many(self, keys: Iterable[UID]) -> List[StorableObject]:
+        """Fetch several objects using one joined query per batch of keys.
+
+        Args:
+            keys: UIDs of the objects to be fetched.
+        Returns:
+            objects: Stored objects, in the same order as `keys`. Keys that are
+                not in the store are skipped.
+        """
+        keys = list(keys)
+        ids = [str(key.value) for key in keys]
+        found = {}
+        deleted = set()
+        for key in keys:
+            pending = self._get_pending(key)
+            if pending is DELETED:
+                deleted.add(str(key.value))
+            elif pending is not None:
+                found[str(key.value)] = pending
+
+        if self.cache is not None:
+            # Pending writes are more recent than the cached objects
+            for _id in ids:
+                if _id in found or _id in deleted:
+                    continue
+                obj = self.cache.get(_id)
+                if obj is not None:
+                    found[_id] = obj
+
+        missing = [_id for _id in ids if _id not in found and _id not in deleted]
+        for batch in chunks(missing):
+            rows = (
+                self.db.session.query(BinObject, ObjectMetadata)
+                .join(ObjectMetadata, ObjectMetadata.obj == BinObject.id)
+                .filter(BinObject.id.in_(batch))
+                .all()
+            )
+            for obj, (bin_obj, _) in zip(self._to_storables(rows), rows):
+                found[bin_obj.id] = obj
+                self._cache_put(bin_obj, obj)
+
+        return [found[_id] for _id in ids if _id in found]
+
+    def read_slice(
+        self,
+        key: UID,
+        rows: Optional[Tuple[int, int]] = None,
+        columns: Optional[Sequence[Union[str, int]]] = None,
+    ) -> Union[DataFrame, Tensor, np.ndarray]:
+        """Read a range of rows and some columns of a stored table or tensor.
+
+        Only the requested columns of the row groups overlapping `rows` are
+        decoded from a Parquet table, and only the bytes of the requested rows
+        are viewed from a raw tensor (all of them are decompressed first if the
+        payload is compressed). Other objects are deserialized whole, then
+        sliced.
+
+        Args:
+            key: UID of the object.
+            rows: (start, stop) range of rows to read, all of them by default.
+            columns: Names of the columns of a table, or indices along the
+                second dimension of a tensor. All of them by default.
+        Returns:
+            data: Selected rows and columns, of the type of the stored object.
+        Raises:
+            TypeError: If the object is neither a table nor a tensor.
+        """
+        pending = self._get_pending(key)
+        if pending is DELETED:
+            raise Exception("Object not found!")
+        if pending is None and self.cache is not None:
+            pending = self.cache.get(str(key.value))
+        if pending is not None:
+            return slice_object(pending.data, rows, columns)
+
+        bin_obj = self.db.session.query(BinObject).filter_by(id=str(key.value)).first()
+        if bin_obj is None:
+            raise Exception("Object not found!")
+        if bin_obj.codec == PARQUET_CODEC:
+            with released(bin_obj.payload) as payload:
+                return decode_parquet(payload, columns=columns, rows=rows)
+        if bin_obj.codec == RAW_CODEC:
+            return slice_array(decode_raw(bin_obj.payload, rows=rows), columns=columns)
+        return slice_object(bin_obj.object, rows, columns)
+
+    def set_many(
+        self, items: Iterable[Tuple[UID, StorableObject]], commit: bool = True
+    ) -> None:
+        """Write a batch of objects in a single transaction, replacing the
+        ones already stored under the same keys.
+
+        Objects and metadata are upserted (ON CONFLICT on PostgreSQL, INSERT OR
+        REPLACE on SQLite), so overwriting an object doesn't need to look it
+        up and delete it first.
+
+        Args:
+            items: (key, StorableObject) pairs to be stored.
+            commit: If False, the writes are left pending in the current
+                transaction so the caller can commit them together with its
+                own changes.
+        """
+        # Queued writes of the same keys must not land after these ones
+        self._flush_queue()
+        self._set_many(items, commit=commit)
+
+    def _set_many(
+        self, items: Iterable[Tuple[UID, StorableObject]], commit: bool = True
+    ) -> None:
+        # Later duplicates win, as they would with successive __setitem__ calls
+        items = {str(key.value): (key, value) for key, value in items}.values()
+        ids = [str(key.value) for key, _ in items]
+        if self.cache is not None:
+            for _id in ids:
+                self.cache.invalidate(_id)
+
+        bin_rows = []
+        metadata_rows = []
+        permissions = {}
+        new_blobs = {}
+        for key, value in items:
+            bin_obj = BinObject(id=str(key.value), object=value.data)
+            bin_rows.append(row_to_dict(bin_obj))
+            if bin_obj.content_hash is not None:
+                new_blobs[bin_obj.content_hash] = bin_obj.pending_payload
+            metadata_dict = storable_to_dict(value)
+            metadata_rows.append(
+                {
+                    "obj": bin_obj.id,
+                    "tags": metadata_dict["tags"],
+                    "description": metadata_dict["description"],
+                    "read_permissions": None,
+                    "search_permissions": metadata_dict["search_permissions"],
+                    "obj_type": get_type_name(type(value.data)),
+                }
+            )
+            permissions[bin_obj.id] = metadata_dict["read_permissions"]
+
+        self._write_rows(ids, bin_rows, metadata_rows, permissions, new_blobs)
+        if commit:
+            self.db.session.commit()
+
+    def _write_rows(
+        self,
+        ids: List[str],
+        bin_rows: List[dict],
+        metadata_rows: List[dict],
+        permissions: Dict[str, Dict[str, Optional[str]]],
+        new_blobs: Dict[str, Union[bytes, StoredBytes]],
+    ) -> None:
+        # Payloads being replaced go away with the transaction
+        old_hashes = self._release_payloads(ids)
+
+        # Shared payloads are referenced before the objects pointing to them
+        # are written, and released after
+        self._ref_blobs(
+            new_blobs, [row["content_hash"] for row in bin_rows if row["content_hash"]]
+        )
+        self._upsert(BinObject, bin_rows, key="id")
+        self._unref_blobs(old_hashes)
+        self._upsert(ObjectMetadata, metadata_rows, key="obj")
+        self._index_tags({row["obj"]: row["tags"] for row in metadata_rows})
+        self._replace_permissions(permissions)
+
+    def dump(
+        self,
+        after: Optional[str] = None,
+        limit: int = BATCH_SIZE,
+        exported_blobs: Optional[Set[str]] = None,
+    ) -> List[Tuple[dict, Optional[StoredBytes]]]:
+        """Return one page of objects in their stored form, ordered by id, to
+        copy them to another store without deserializing them.
+
+        Args:
+            after: Only return objects whose id follows this one.
+            limit: Maximum number of objects returned.
+            exported_blobs: Content hashes of the shared payloads copied
+                already. Objects pointing to them come without a payload, and
+                the hashes of the returned shared payloads are added to it.
+        Returns:
+            records: (record, payload) pairs, where the record holds the
+                object columns, its metadata and its read permissions.
+        """
+        self.flush()
+        self._backfill_permissions()
+        query = (
+            self.db.session.query(BinObject, ObjectMetadata)
+            .outerjoin(ObjectMetadata, ObjectMetadata.obj == BinObject.id)
+            .order_by(BinObject.id)
+            .limit(limit)
+        )
+        if after is not None:
+            query = query.filter(BinObject.id > after)
+        rows = query.all()
+        permissions = self._load_permissions([bin_obj.id for bin_obj, _ in rows])
+
+        records = []
+        for bin_obj, metadata in rows:
+            record = {
+                "id": bin_obj.id,
+                "protobuf_name": bin_obj.protobuf_name,
+                "codec": bin_obj.codec,
+                "content_hash": bin_obj.content_hash,
+                "size": bin_obj.payload_size,
+                "tags": metadata.tags if metadata else [],
+                "description": metadata.description if metadata else "",
+                "search_permissions": metadata.search_permissions if metadata else {},
+                "obj_type": metadata.obj_type if metadata else None,
+                "read_permissions": permissions.get(bin_obj.id, {}),
+            }
+
+            _hash = bin_obj.content_hash
+            payload = None
+            if _hash is None:
+                payload = stored_bytes(bin_obj)
+            elif exported_blobs is None or _hash not in exported_blobs:
+                payload = stored_bytes(bin_obj.blob)
+                if exported_blobs is not None:
+                    exported_blobs.add(_hash)
+            records.append((record, payload))
+        return records
+
+    def load(
+        self, records: List[Tuple[dict, Optional[StoredBytes]]], commit: bool = True
+    ) -> None:
+        """Write objects returned by `dump`, replacing the ones stored under
+        the same ids. Payloads are written as they are, without compressing
+        them again, through the configured blob backend.
+
+        Args:
+            records: (record, payload) pairs returned by `dump`.
+            commit: If False, the writes are left pending in the session.
+        Raises:
+            ValueError: If an object points to a shared payload that is
+                neither stored nor part of the batch.
+        """
+        self._flush_queue()
+        ids = [record["id"] for record, _ in records]
+        if self.cache is not None:
+            for _id in ids:
+                self.cache.invalidate(_id)
+
+        bin_rows = []
+        metadata_rows = []
+        permissions = {}
+        new_blobs = {}
+        for record, payload in records:
+            bin_obj = BinObject(
+                id=record["id"],
+                protobuf_name=record["protobuf_name"],
+                codec=record["codec"],
+            )
+            if record["content_hash"] is None:
+                bin_obj.store_compressed(payload)
+            else:
+                bin_obj.content_hash = record["content_hash"]
+                bin_obj.size = record["size"]
+                if payload is not None:
+                    new_blobs[bin_obj.content_hash] = payload
+            bin_rows.append(row_to_dict(bin_obj))
+            metadata_rows.append(
+                {
+                    "obj": bin_obj.id,
+                    "tags": record["tags"],
+                    "description": record["description"],
+                    "read_permissions": None,
+                    "search_permissions": record["search_permissions"],
+                    "obj_type": record["obj_type"],
+                }
+            )
+            permissions[bin_obj.id] = record["read_permissions"]
+
+        self._write_rows(ids, bin_rows, metadata_rows, permissions, new_blobs)
+        if commit:
+            self.db.session.commit()
+
+    def read_blob(self, _hash: str) -> Optional[StoredBytes]:
+        """Return a shared payload in its stored form, None if it isn't
+        stored."""
+        blob = self.db.session.query(Blob).get(_hash)
+        return stored_bytes(blob) if blob is not None else None
+
+    def get_metadata(self, key: UID) -> ObjectMetadata:
+        """Return the metadata of an object, without loading the object."""
+        self._flush_key(key)
+        obj_metadata = (
+            self.db.session.query(ObjectMetadata).filter_by(obj=str(key.value)).first()
+        )
+        if obj_metadata is None:
+            raise Exception("Object not found!")
+        return obj_metadata
+
+    def update_metadata(self, key: UID, commit: bool = True, **fields) -> None:
+        """Update metadata columns of an object (tags, description,
+        read_permissions...) without touching its stored payload.
+
+        Args:
+            key: UID of the object.
+            commit: If False, the update is left pending in the session.
+            fields: Columns of the `obj_metadata` table and their new values.
+                `read_permissions` ({verify key: request id}) replaces the
+                object's rows of the permission table.
+        """
+        self._flush_key(key)
+        read_permissions = fields.pop("read_permissions", None)
+        if read_permissions is not None:
+            fields["read_permissions"] = None
+
+        updated = (
+            self.db.session.query(ObjectMetadata)
+            .filter_by(obj=str(key.value))
+            .update(fields, synchronize_session=False)
+        )
+        if not updated:
+            raise Exception("Object not found!")
+
+        if "tags" in fields:
+            self._index_tags({str(key.value): fields["tags"]})
+        if read_permissions is not None:
+            self._replace_permissions(
+                {
+                    str(key.value): {
+                        verify_key_to_hex(verify_key): request_id
+                        for verify_key, request_id in read_permissions.items()
+                    }
+                }
+            )
+
+        if self.cache is not None:
+            self.cache.invalidate(str(key.value))
+
+        if commit:
+            self.db.session.commit()
+
+    def search(
+        self,
+        tags: Iterable[str],
+        match: str = "all",
+        verify_key: Optional[Union[VerifyKey, str]] = None,
+    ) -> List[UID]:
+        """Find objects by tag with a single query on the tag index.
+
+        Args:
+            tags: Tags to look for.
+            match: "all" to return objects having every tag, "any" to return
+                objects having at least one of them.
+            verify_key: Only return the objects this verify key can search
+                (see StorableObject.search_permissions), all of them by
+                default.
+        Returns:
+            keys: UIDs of the matching objects.
+        Raises:
+            ValueError: If `match` is neither "all" nor "any".
+        """
+        self.flush()
+        return self._search(tags, match=match, verify_key=verify_key)
+
+    def _search(
+        self,
+        tags: Iterable[str],
+        match: str = "all",
+        verify_key: Optional[Union[VerifyKey, str]] = None,
+    ) -> List[UID]:
+        tags = set(tags)
+        if match not in ("all", "any"):
+            raise ValueError('match should be either "all" or "any"')
+        if not tags:
+            return []
+
+        self._backfill_tag_index()
+
+        query = self.db.session.query(ObjectTag.obj).filter(ObjectTag.tag.in_(tags))
+        if match == "all":
+            query = query.group_by(ObjectTag.obj).having(
+                func.count(func.distinct(ObjectTag.tag)) == len(tags)
+            )
+        else:
+            query = query.distinct()
+
+        ids = [_id for (_id,) in query.all()]
+        if verify_key is not None:
+            ids = self._searchable(ids, verify_key_to_hex(verify_key))
+        return [UID.from_string(_id) for _id in ids]
+
+    def _searchable(self, ids: List[str], verify_key: str) -> List[str]:
+        searchable = set()
+        for batch in chunks(ids):
+            rows = self.db.session.query(
+                ObjectMetadata.obj, ObjectMetadata.search_permissions
+            ).filter(ObjectMetadata.obj.in_(batch))
+            for _id, permissions in rows:
+                permissions = permissions or {}
+                if ALL_VERIFY_KEYS in permissions or verify_key in permissions:
+                    searchable.add(_id)
+        return [_id for _id in ids if _id in searchable]
+
+    def rebuild_tag_index(self) -> None:
+        """Rebuild the tag index from the tags stored in the metadata table."""
+        self.flush()
+        self.db.session.query(ObjectTag).delete(synchronize_session=False)
+        query = self.db.session.query(ObjectMetadata.obj, ObjectMetadata.tags)
+        rows = []
+        for _id, tags in query.yield_per(self.page_size):
+            rows.extend({"obj": _id, "tag": tag} for tag in set(tags or []))
+        for batch in chunks(rows, size=BATCH_SIZE // 2):
+            self.db.session.execute(ObjectTag.__table__.insert().values(batch))
+        self.db.session.commit()
+
+    def _backfill_tag_index(self) -> None:
+        # Stores written before the index existed have metadata but no tags
+        if self._tag_index_checked:
+            return
+        if (
+            self.db.session.query(ObjectTag.id).first() is None
+            and self.db.session.query(ObjectMetadata.id).first() is not None
+        ):
+            self.rebuild_tag_index()
+        self._tag_index_checked = True
+
+    def _index_tags(self, tags_by_id: Dict[str, Iterable[str]]) -> None:
+        ids = list(tags_by_id.keys())
+        for batch in chunks(ids):
+            self.db.session.query(ObjectTag).filter(ObjectTag.obj.in_(batch)).delete(
+                synchronize_session=False
+            )
+
+        rows = [
+            {"obj": _id, "tag": tag}
+            for _id, tags in tags_by_id.items()
+            for tag in set(tags or [])
+        ]
+        for batch in chunks(rows, size=BATCH_SIZE // 2):
+            self.db.session.execute(ObjectTag.__table__.insert().values(batch))
+
+    def grant_permission(
+        self,
+        key: UID,
+        verify_key: Union[VerifyKey, str],
+        kind: str = READ_PERMISSION,
+        request_id: Optional[str] = None,
+        commit: bool = True,
+    ) -> None:
+        """Give a verify key a permission over an object, without loading or
+        rewriting the object.
+
+        Args:
+            key: UID of the object.
+            verify_key: VerifyKey or hex encoded verify key.
+            kind: Permission kind, "read" or "search".
+            request_id: ID of the request the permission was granted by.
+            commit: If False, the change is left pending in the session.
+        """
+        self._flush_key(key)
+        self._backfill_permissions()
+        _id = str(key.value)
+        if self.db.session.query(BinObject.id).filter_by(id=_id).first() is None:
+            raise Exception("Object not found!")
+
+        self._revoke(_id, verify_key_to_hex(verify_key), kind)
+        self.db.session.add(
+            ObjectPermission(
+                obj=_id,
+                verify_key=verify_key_to_hex(verify_key),
+                kind=kind,
+                request_id=request_id,
+            )
+        )
+        if self.cache is not None:
+            self.cache.invalidate(_id)
+
+        if commit:
+            self.db.session.commit()
+
+    def revoke_permission(
+        self,
+        key: UID,
+        verify_key: Union[VerifyKey, str],
+        kind: str = READ_PERMISSION,
+        commit: bool = True,
+    ) -> None:
+        """Remove a permission granted to a verify key over an object."""
+        self._flush_key(key)
+        self._backfill_permissions()
+        _id = str(key.value)
+        self._revoke(_id, verify_key_to_hex(verify_key), kind)
+        if self.cache is not None:
+            self.cache.invalidate(_id)
+
+        if commit:
+            self.db.session.commit()
+
+    def has_permission(
+        self,
+        key: UID,
+        verify_key: Union[VerifyKey, str],
+        kind: str = READ_PERMISSION,
+    ) -> bool:
+        """Whether a verify key has a permission over an object, with a single
+        indexed lookup."""
+        self._flush_key(key)
+        self._backfill_permissions()
+        return (
+            self.db.session.query(ObjectPermission.id)
+            .filter_by(
+                obj=str(key.value), verify_key=verify_key_to_hex(verify_key), kind=kind
+            )
+            .first()
+            is not None
+        )
+
+    def get_permissions(
+        self, key: UID, kind: str = READ_PERMISSION
+    ) -> Dict[str, Optional[str]]:
+        """Return the {hex verify key: request id} permissions of an object."""
+        self._flush_key(key)
+        self._backfill_permissions()
+        return self._load_permissions([str(key.value)], kind=kind).get(
+            str(key.value), {}
+        )
+
+    def readable_by(
+        self,
+        verify_key: Union[VerifyKey, str],
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> List[UID]:
+        """Return the keys of the objects a verify key can read.
+
+        Args:
+            verify_key: VerifyKey or hex encoded verify key.
+            offset: Number of objects to skip.
+            limit: Maximum number of objects returned, all of them by default.
+        """
+        self.flush()
+        self._backfill_permissions()
+        query = (
+            self.db.session.query(ObjectPermission.obj)
+            .filter_by(verify_key=verify_key_to_hex(verify_key), kind=READ_PERMISSION)
+            .order_by(ObjectPermission.obj)
+            .offset(offset)
+            .limit(limit)
+        )
+        return [UID.from_string(_id) for (_id,) in query.all()]
+
+    def _revoke(self, _id: str, verify_key: str, kind: str) -> None:
+        self.db.session.query(ObjectPermission).filter_by(
+            obj=_id, verify_key=verify_key, kind=kind
+        ).delete(synchronize_session=False)
+
+    def _load_permissions(
+        self, ids: List[str], kind: str = READ_PERMISSION
+    ) -> Dict[str, Dict[str, Optional[str]]]:
+        permissions: Dict[str, Dict[str, Optional[str]]] = {}
+        for batch in chunks(ids):
+            rows = (
+                self.db.session.query(
+                    ObjectPermission.obj,
+                    ObjectPermission.verify_key,
+                    ObjectPermission.request_id,
+                )
+                .filter(ObjectPermission.obj.in_(batch), ObjectPermission.kind == kind)
+                .all()
+            )
+            for _id, verify_key, request_id in rows:
+                permissions.setdefault(_id, {})[verify_key] = request_id
+        return permissions
+
+    def _replace_permissions(
+        self, permissions_by_id: Dict[str, Dict[str, Optional[str]]]
+    ) -> None:
+        ids = list(permissions_by_id.keys())
+        for batch in chunks(ids):
+            self.db.session.query(ObjectPermission).filter(
+                ObjectPermission.obj.in_(batch),
+                ObjectPermission.kind == READ_PERMISSION,
+            ).delete(synchronize_session=False)
+
+        rows = [
+            {
+                "obj": _id,
+                "verify_key": verify_key,
+                "kind": READ_PERMISSION,
+                "request_id": request_id,
+            }
+            for _id, permissions in permissions_by_id.items()
+            for verify_key, request_id in permissions.items()
+        ]
+        for batch in chunks(rows, size=BATCH_SIZE // 4):
+            self.db.session.execute(ObjectPermission.__table__.insert().values(batch))
+
+    def _backfill_permissions(self) -> None:
+        # Objects stored before the permission table existed keep their read
+        # permissions in a JSON column, they are moved to the table once
+        if self._permissions_checked:
+            return
+        rows = (
+            self.db.session.query(ObjectMetadata.obj, ObjectMetadata.read_permissions)
+            .filter(ObjectMetadata.read_permissions.isnot(None))
+            .all()
+        )
+        if rows:
+            self._replace_permissions(
+                {_id: dict(permissions or {}) for _id, permissions in rows}
+            )
+            for batch in chunks([_id for _id, _ in rows]):
+                self.db.session.query(ObjectMetadata).filter(
+                    ObjectMetadata.obj.in_(batch)
+                ).update({"read_permissions": None}, synchronize_session=False)
+            self.db.session.commit()
+        self._permissions_checked = True
+
+    def _upsert(self, model: type, rows: List[dict], key: str) -> None:
+        upsert(self.db.session, model, rows, key)
+
+    def delete_many(self, keys: Iterable[UID], commit: bool = True) -> None:
+        """Delete a batch of objects (and their metadata) in a single
+        transaction. Keys that are not in the store are ignored.
+
+        Args:
+            keys: UIDs of the objects to be deleted.
+            commit: If False, the deletions are left pending in the session.
+        """
+        self._flush_queue()
+        self._delete_many(keys, commit=commit)
+
+    def _delete_many(self, keys: Iterable[UID], commit: bool = True) -> None:
+        ids = [str(key.value) for key in keys]
+        if self.cache is not None:
+            for _id in ids:
+                self.cache.invalidate(_id)
+
+        old_hashes = self._release_payloads(ids)
+        for batch in chunks(ids):
+            self.db.session.query(ObjectTag).filter(ObjectTag.obj.in_(batch)).delete(
+                synchronize_session=False
+            )
+            self.db.session.query(ObjectPermission).filter(
+                ObjectPermission.obj.in_(batch)
+            ).delete(synchronize_session=False)
+            self.db.session.query(ObjectMetadata).filter(
+                ObjectMetadata.obj.in_(batch)
+            ).delete(synchronize_session=False)
+            self.db.session.query(BinObject).filter(BinObject.id.in_(batch)).delete(
+                synchronize_session=False
+            )
+        self._unref_blobs(old_hashes)
+
+        if commit:
+            self.db.session.commit()
+
+    def _release_payloads(self, ids: List[str]) -> List[str]:
+        """Schedule the deletion of the private payloads of a batch of objects
+        and return the content hashes of their shared ones."""
+        hashes = []
+        for batch in chunks(ids):
+            rows = (
+                self.db.session.query(
+                    BinObject.backend, BinObject.blob_ref, BinObject.content_hash
+                )
+                .filter(BinObject.id.in_(batch))
+                .all()
+            )
+            delete_blobs_on_commit(
+                self.db.session(),
+                [(backend, ref) for backend, ref, _ in rows if ref is not None],
+            )
+            hashes.extend(_hash for _, _, _hash in rows if _hash is not None)
+        return hashes
+
+    def _ref_blobs(
+        self, payloads: Dict[str, Union[bytes, StoredBytes]], hashes: List[str]
+    ) -> None:
+        """Add references to shared payloads, writing the new ones.
+
+        Args:
+            payloads: Serialized payloads by content hash, or payloads already
+                in their stored form.
+            hashes: Content hash of every new reference, repeated once per
+                object.
+        Raises:
+            ValueError: If a new payload is missing.
+        """
+        counts = Counter(hashes)
+        existing = self._existing_blobs(list(counts))
+
+        rows = []
+        for _hash, count in counts.items():
+            if _hash not in existing:
+                if _hash not in payloads:
+                    raise ValueError(f"Missing payload of blob {_hash}")
+                blob = Blob(hash=_hash, refcount=count)
+                if isinstance(payloads[_hash], StoredBytes):
+                    blob.store_compressed(payloads[_hash])
+                else:
+                    blob.store_payload(payloads[_hash])
+                rows.append(row_to_dict(blob))
+        self._insert_blobs(rows)
+
+        self._add_refcounts({_hash: counts[_hash] for _hash in existing})
+
+    def _existing_blobs(self, hashes: List[str]) -> Set[str]:
+        existing = set()
+        for batch in chunks(hashes):
+            existing.update(
+                _hash
+                for (_hash,) in self.db.session.query(Blob.hash).filter(
+                    Blob.hash.in_(batch)
+                )
+            )
+        return existing
+
+    def _unref_blobs(self, hashes: List[str]) -> None:
+        # Drop references, shared payloads go away with their last reference
+        counts = Counter(hashes)
+        self._add_refcounts({_hash: -count for _hash, count in counts.items()})
+
+        for batch in chunks(list(counts)):
+            unused = (
+                self.db.session.query(Blob.backend, Blob.blob_ref)
+                .filter(Blob.hash.in_(batch), Blob.refcount <= 0)
+                .all()
+            )
+            if not unused:
+                continue
+            delete_blobs_on_commit(
+                self.db.session(),
+                [(backend, ref) for backend, ref in unused if ref is not None],
+            )
+            self.db.session.query(Blob).filter(
+                Blob.hash.in_(batch), Blob.refcount <= 0
+            ).delete(synchronize_session=False)
+
+    def _add_refcounts(self, deltas: Dict[str, int]) -> None:
+        # One UPDATE per distinct delta, most batches have a single one
+        by_delta = defaultdict(list)
+        for _hash, delta in deltas.items():
+            by_delta[delta].append(_hash)
+        for delta, hashes in by_delta.items():
+            for batch in chunks(hashes):
+                self.db.session.query(Blob).filter(Blob.hash.in_(batch)).update(
+                    {Blob.refcount: Blob.refcount + delta}, synchronize_session=False
+                )
+
+    def _insert_blobs(self, rows: List[dict]) -> None:
+        if not rows:
+            return
+
+        table = Blob.__table__
+        dialect = self.db.session.get_bind(mapper=Blob.__mapper__).dialect.name
+        rows_per_statement = max(1, BATCH_SIZE // len(rows[0]))
+
+        for batch in chunks(rows, size=rows_per_statement):
+            if dialect in ("postgresql", "sqlite"):
+                # A concurrent writer may have stored the same payload: add to
+                # its references, the duplicate payload is left for the GC
+                insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+                stmt = insert(table).values(batch)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["hash"],
+                    set_={"refcount": table.c.refcount + stmt.excluded.refcount},
+                )
+            else:
+                stmt = table.insert().values(batch)
+            self.db.session.execute(stmt)
+
+    def dedup_stats(self) -> Dict[str, int]:
+        """Logical bytes of the deduplicated objects vs bytes of the shared
+        payloads they point to."""
+        objects, logical = (
+            self.db.session.query(func.count(), func.sum(BinObject.size))
+            .filter(BinObject.content_hash.isnot(None))
+            .one()
+        )
+        blobs, stored = self.db.session.query(
+            func.count(), func.sum(func.coalesce(Blob.stored_size, Blob.size))
+        ).one()
+        return {
+            "objects": objects,
+            "logical_bytes": int(logical or 0),
+            "blobs": blobs,
+            "stored_bytes": int(stored or 0),
+        }
+
+    def flush(self) -> None:
+        """Wait until every queued write is committed, or failed and waits for
+        a retry (see WriteBehindQueue). Does nothing when the write-behind
+        queue is disabled."""
+        self._flush_queue()
+
+    def _flush_key(self, key: UID) -> None:
+        # Metadata and permission calls only need this object on disk
+        self.flush()
+
+    def _flush_queue(self) -> None:
+        if self.write_queue is not None:
+            self.write_queue.flush()
+
+    def close(self) -> None:
+        """Commit queued writes and stop the write-behind flusher."""
+        if self.write_queue is not None:
+            self.write_queue.close()
+
+    def write_queue_stats(self) -> Optional[Dict[str, int]]:
+        """Pending/flushed/failed counters of the write-behind queue, if it
+        is enabled."""
+        return self.write_queue.stats() if self.write_queue is not None else None
+
+    def _write_queue(self) -> WriteBehindQueue:
+        # The flusher thread needs the application (and its database
+        # configuration) of the requests that queue the writes
+        if self.write_queue.context is None and has_app_context():
+            self.write_queue.context = app._get_current_object().app_context
+        return self.write_queue
+
+    def _get_pending(self, key: UID) -> Optional[object]:
+        if self.write_queue is None:
+            return None
+        return self.write_queue.get(str(key.value))
+
+    def _write_batch(self, batch: List[Tuple[UID, object]]) -> None:
+        # Runs on the flusher thread: every queued write, in one transaction
+        try:
+            deleted = [key for key, value in batch if value is DELETED]
+            stored = [(key, value) for key, value in batch if value is not DELETED]
+            self._delete_many(deleted, commit=False)
+            self._set_many(stored, commit=False)
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            raise
+
+    def cache_stats(self) -> Optional[Dict[str, int]]:
+        """Hit/miss/eviction counters of the object cache, if it is enabled."""
+        return self.cache.stats() if self.cache is not None else None
+
+    def compression_stats(self) -> Dict[str, Dict[str, int]]:
+        """Stored vs logical payload bytes, per compression codec."""
+        return compression_stats(self.db.session, BinObject)
+
+    def _invalidate(self, key: UID) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(str(key.value))
+
+    def _cache_put(self, bin_obj: BinObject, obj: StorableObject) -> None:
+        if self.cache is not None:
+            self.cache.put(bin_obj.id, obj, size=bin_obj.payload_size)
+
+    def _to_storables(
+        self, rows: List[Tuple[BinObject, ObjectMetadata]]
+    ) -> List[StorableObject]:
+        # Read permissions of the whole batch, in one query per BATCH_SIZE rows
+        permissions = self._load_permissions([bin_obj.id for bin_obj, _ in rows])
+        objs = []
+        for bin_obj, obj_metadata in rows:
+            read_permissions = dict(obj_metadata.read_permissions or {})
+            read_permissions.update(permissions.get(bin_obj.id, {}))
+            objs.append(self._to_storable(bin_obj, obj_metadata, read_permissions))
+        return objs
+
+    @staticmethod
+    def _to_storable(
+        bin_obj: BinObject,
+        obj_metadata: ObjectMetadata,
+        permissions: Dict[str, Optional[str]],
+    ) -> StorableObject:
         read_permissions = {
-            VerifyKey(key.encode("utf-8"), encoder=HexEncoder): value
-            for key, value in obj_metadata.read_permissions.items()
+            hex_to_verify_key(key): value for key, value in permissions.items()
         }
 
         obj = StorableObject(
@@ -102,49 +1314,35 @@ class DiskObjectStore(ObjectStore):
             description=obj_metadata.description,
             tags=obj_metadata.tags,
             read_permissions=read_permissions,
-            search_permissions=syft.lib.python.Dict({VERIFYALL: None}),
+            search_permissions=syft.lib.python.Dict(
+                {
+                    (
+                        VERIFYALL if key == ALL_VERIFY_KEYS else hex_to_verify_key(key)
+                    ): None
+                    for key in (obj_metadata.search_permissions or {})
+                }
+            ),
         )
         return obj
 
-    def __setitem__(self, key: UID, value: StorableObject) -> None:
-        obj = value
-        bin_obj = BinObject(id=str(key.value), object=value.data)
-        metadata_dict = storable_to_dict(value)
-        metadata_obj = ObjectMetadata(
-            obj=bin_obj.id,
-            tags=metadata_dict["tags"],
-            description=metadata_dict["description"],
-            read_permissions=metadata_dict["read_permissions"],
-            search_permissions={},
-        )
-
-        if self.__contains__(key):
-            self.delete(key)
-
-        self.db.session.add(bin_obj)
-        self.db.session.add(metadata_obj)
-        self.db.session.commit()
+    def clear(self) -> None:
+        self.flush()
+        if self.cache is not None:
+            self.cache.clear()
 
-    def delete(self, key: UID) -> None:
-        try:
-            object_to_delete = (
-                self.db.session.query(BinObject).filter_by(id=str(key.value)).first()
+        for model in (BinObject, Blob):
+            blob_refs = (
+                self.db.session.query(model.backend, model.blob_ref)
+                .filter(model.blob_ref.isnot(None))
+                .all()
             )
-            metadata_to_delete = (
-                self.db.session.query(ObjectMetadata)
-                .filter_by(obj=str(key.value))
-                .first()
-            )
-            self.db.session.delete(object_to_delete)
-            self.db.session.delete(metadata_to_delete)
-            self.db.session.commit()
-        except Exception as e:
-            print(f"{type(self)} Exception in __delitem__ error {key}. {e}")
-
-    def clear(self) -> None:
+            delete_blobs_on_commit(self.db.session(), blob_refs)
+        self.db.session.query(ObjectTag).delete()
+        self.db.session.query(ObjectPermission).delete()
         self.db.session.query(BinObject).delete()
+        self.db.session.query(Blob).delete()
         self.db.session.query(ObjectMetadata).delete()
         self.db.session.commit()
 
     def __repr__(self) -> str:
-        return self._objects.__repr__()
+        return self.__str__()
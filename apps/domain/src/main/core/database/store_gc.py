@@ -0,0 +1,373 @@
+# stdlib
+import logging
+import os
+from threading import Thread
+import time
+from typing import Dict
+from typing import List
+from typing import Set
+
+# third party
+from sqlalchemy import text
+from syft.core.common.uid import UID
+
+# grid relative
+from .bin_storage.bin_obj import BinObject
+from .bin_storage.bin_obj import Blob
+from .bin_storage.bin_obj import ObjectMetadata
+from .bin_storage.bin_obj import ObjectPermission
+from .bin_storage.bin_obj import ObjectTag
+from .bin_storage.bin_obj import delete_blobs_on_commit
+from .bin_storage.blob_backend import FileSystemBlobBackend
+from .bin_storage.blob_backend import get_blob_backend
+from .dataset.catalog import catalog_version
+from .dataset.datasetgroup import BinObjDataset
+from .dataset.datasetgroup import Dataset
+from .dataset.datasetgroup import DatasetColumn
+from .dataset.datasetgroup import DatasetGroup
+from .store_disk import BATCH_SIZE
+from .store_disk import chunks
+
+# Seconds between two scheduled collections, 0 to disable them
+STORE_GC_INTERVAL = "STORE_GC_INTERVAL"
+
+# Payload files younger than this (in seconds) may belong to a transaction
+# that isn't committed yet, they are never collected
+DEFAULT_FILE_GRACE_PERIOD = 3600
+
+# Tables of the object store, compacted after a collection
+STORE_TABLES = [
+    BinObject.__tablename__,
+    Blob.__tablename__,
+    ObjectMetadata.__tablename__,
+    ObjectTag.__tablename__,
+    ObjectPermission.__tablename__,
+]
+
+
+def collect_garbage(
+    db,
+    store,
+    batch_size: int = BATCH_SIZE,
+    vacuum: bool = True,
+    file_grace_period: int = DEFAULT_FILE_GRACE_PERIOD,
+    datasets: bool = True,
+) -> Dict[str, int]:
+    """Remove orphaned store and dataset rows, and unreferenced payloads.
+
+    Orphans are deleted in batches, one transaction per batch, so a
+    collection can run next to regular traffic and be interrupted.
+
+    Args:
+        db: Flask-SQLAlchemy database instance (dataset tables).
+        store: DiskObjectStore or ShardedObjectStore of the node.
+        batch_size: Number of rows deleted per transaction.
+        vacuum: Reclaim the space freed by the deleted rows.
+        file_grace_period: Minimum age (in seconds) of an unreferenced
+            payload file for it to be deleted.
+        datasets: Collect dataset rows pointing to objects missing from the
+            store. Must be False when dataset objects live in another store
+            (MEMORY_STORE nodes), every dataset row would look orphaned.
+    Returns:
+        report: Number of rows / files deleted per kind, and bytes reclaimed.
+    """
+    batch_size = min(batch_size, BATCH_SIZE)
+    report = dict.fromkeys(
+        [
+            "metadata",
+            "tags",
+            "permissions",
+            "objects",
+            "blobs",
+            "files",
+            "dataset_members",
+            "dataset_groups",
+            "dataset_columns",
+            "bytes_freed",
+        ],
+        0,
+    )
+
+    # Pending and memory-only writes must be visible to the queries below
+    store.flush()
+
+    shards = getattr(store, "shards", [store])
+    for shard in shards:
+        session = shard.db.session
+        # Rows pointing to objects that are gone
+        for model, kind in (
+            (ObjectMetadata, "metadata"),
+            (ObjectTag, "tags"),
+            (ObjectPermission, "permissions"),
+        ):
+            orphans = (
+                ~session.query(BinObject.id).filter(BinObject.id == model.obj).exists()
+            )
+            report[kind] += _delete_where(session, model, orphans, batch_size)
+
+        # Objects without metadata that no dataset points to
+        report["objects"] += _collect_objects(db, shard, batch_size)
+
+        # Shared payloads nobody points to, whatever their refcount says
+        unreferenced = (
+            ~session.query(BinObject.id)
+            .filter(BinObject.content_hash == Blob.hash)
+            .exists()
+        )
+        report["blobs"] += _collect_blobs(session, unreferenced, batch_size)
+
+    if datasets:
+        _collect_datasets(db, shards, batch_size, report)
+
+    if report["dataset_members"]:
+        catalog_version.bump(commit=True)
+
+    report["files"] += _collect_files(shards, file_grace_period)
+
+    if vacuum:
+        engines = {id(shard.db.session.get_bind()): shard for shard in shards}
+        for shard in engines.values():
+            report["bytes_freed"] += compact(shard.db.session.get_bind())
+
+    for shard in shards:
+        if shard.db is not db:
+            # Shard sessions are thread local, don't keep connections around
+            shard.db.session.remove()
+
+    return report
+
+
+def _collect_datasets(db, shards, batch_size: int, report: Dict[str, int]) -> None:
+    # Dataset rows pointing to objects or datasets that are gone
+    report["dataset_members"] += _collect_dataset_rows(
+        db, shards, BinObjDataset, BinObjDataset.obj, batch_size
+    )
+    report["dataset_groups"] += _collect_dataset_rows(
+        db, shards, DatasetGroup, DatasetGroup.bin_object, batch_size
+    )
+    missing_dataset = (
+        ~db.session.query(Dataset.id)
+        .filter(Dataset.id == BinObjDataset.dataset)
+        .exists()
+    )
+    report["dataset_members"] += _delete_where(
+        db.session, BinObjDataset, missing_dataset, batch_size
+    )
+    report["dataset_columns"] += _collect_dataset_rows(
+        db, shards, DatasetColumn, DatasetColumn.obj, batch_size
+    )
+
+
+def _delete_where(session, model, condition, batch_size: int) -> int:
+    deleted = 0
+    while True:
+        ids = [
+            _id
+            for (_id,) in session.query(model.id).filter(condition).limit(batch_size)
+        ]
+        if not ids:
+            return deleted
+        session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        session.commit()
+        deleted += len(ids)
+
+
+def _collect_objects(db, shard, batch_size: int) -> int:
+    session = shard.db.session
+    no_metadata = (
+        ~session.query(ObjectMetadata.id)
+        .filter(ObjectMetadata.obj == BinObject.id)
+        .exists()
+    )
+
+    deleted = 0
+    last_id = ""
+    while True:
+        ids = [
+            _id
+            for (_id,) in session.query(BinObject.id)
+            .filter(no_metadata, BinObject.id > last_id)
+            .order_by(BinObject.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            return deleted
+        last_id = ids[-1]
+
+        # Dataset members may be stored without metadata by older versions
+        in_datasets = _referenced_by_datasets(db, ids)
+        orphans = [_id for _id in ids if _id not in in_datasets]
+        if orphans:
+            # The store releases private and shared payloads with the rows
+            shard.delete_many([UID.from_string(_id) for _id in orphans])
+            deleted += len(orphans)
+
+
+def _referenced_by_datasets(db, ids: List[str]) -> Set[str]:
+    referenced = set()
+    for column in (BinObjDataset.obj, DatasetGroup.bin_object):
+        referenced.update(
+            _id for (_id,) in db.session.query(column).filter(column.in_(ids))
+        )
+    return referenced
+
+
+def _collect_blobs(session, condition, batch_size: int) -> int:
+    deleted = 0
+    while True:
+        rows = (
+            session.query(Blob.hash, Blob.backend, Blob.blob_ref)
+            .filter(condition)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return deleted
+        delete_blobs_on_commit(
+            session(), [(backend, ref) for _, backend, ref in rows if ref is not None]
+        )
+        session.query(Blob).filter(Blob.hash.in_([row[0] for row in rows])).delete(
+            synchronize_session=False
+        )
+        session.commit()
+        deleted += len(rows)
+
+
+def _collect_dataset_rows(db, shards, model, column, batch_size: int) -> int:
+    deleted = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(model.id, column)
+            .filter(model.id > last_id)
+            .order_by(model.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return deleted
+        last_id = rows[-1][0]
+
+        existing = _existing_objects(shards, [obj for _, obj in rows])
+        dead = [_id for _id, obj in rows if obj is None or obj not in existing]
+        if dead:
+            db.session.query(model).filter(model.id.in_(dead)).delete(
+                synchronize_session=False
+            )
+            db.session.commit()
+            deleted += len(dead)
+
+
+def _existing_objects(shards, ids: List[str]) -> Set[str]:
+    ids = [_id for _id in ids if _id is not None]
+    existing = set()
+    for shard in shards:
+        for batch in chunks(ids):
+            existing.update(
+                _id
+                for (_id,) in shard.db.session.query(BinObject.id).filter(
+                    BinObject.id.in_(batch)
+                )
+            )
+    return existing
+
+
+def _collect_files(shards, grace_period: int) -> int:
+    """Delete filesystem backend files no row points to, e.g. payloads written
+    by transactions that were rolled back or never committed."""
+    try:
+        backend = get_blob_backend(FileSystemBlobBackend.name)
+    except ValueError:
+        # The filesystem backend isn't configured, there are no payload files
+        return 0
+    deadline = time.time() - grace_period
+
+    deleted = 0
+    for batch in chunks(list(backend.refs())):
+        referenced = set()
+        for shard in shards:
+            session = shard.db.session
+            for model in (BinObject, Blob):
+                referenced.update(
+                    ref
+                    for (ref,) in session.query(model.blob_ref).filter(
+                        model.blob_ref.in_(batch)
+                    )
+                )
+        for ref in batch:
+            if ref in referenced:
+                continue
+            try:
+                if os.path.getmtime(backend.path(ref)) > deadline:
+                    continue
+            except FileNotFoundError:
+                continue
+            backend.delete(ref)
+            deleted += 1
+    return deleted
+
+
+def database_size(engine) -> int:
+    """Bytes used by the object store tables (PostgreSQL) or by the whole
+    database file (SQLite)."""
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            page_count = conn.execute(text("PRAGMA page_count")).scalar()
+            page_size = conn.execute(text("PRAGMA page_size")).scalar()
+            return int(page_count * page_size)
+        if engine.dialect.name == "postgresql":
+            size = 0
+            for table in STORE_TABLES:
+                size += conn.execute(
+                    text("SELECT COALESCE(pg_total_relation_size(to_regclass(:t)), 0)"),
+                    {"t": table},
+                ).scalar()
+            return int(size)
+    return 0
+
+
+def compact(engine) -> int:
+    """Reclaim the space of deleted rows and return the number of bytes freed.
+
+    SQLite databases are vacuumed (incrementally when auto_vacuum is set to
+    INCREMENTAL), which shrinks the database file. PostgreSQL store tables are
+    vacuumed and analyzed: their free space becomes reusable by new rows, but
+    isn't returned to the OS without the exclusive lock of VACUUM FULL, so no
+    bytes are reported as freed.
+    """
+    before = database_size(engine)
+
+    # VACUUM can't run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if engine.dialect.name == "sqlite":
+            auto_vacuum = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+            if auto_vacuum == 2:
+                conn.execute(text("PRAGMA incremental_vacuum"))
+            else:
+                conn.execute(text("VACUUM"))
+        elif engine.dialect.name == "postgresql":
+            for table in STORE_TABLES:
+                conn.execute(text(f"VACUUM (ANALYZE) {table}"))
+            return 0
+
+    return max(0, before - database_size(engine))
+
+
+def schedule_garbage_collection(
+    app, db, store, interval: float, datasets: bool = True
+) -> Thread:
+    """Run `collect_garbage` every `interval` seconds, in a daemon thread."""
+
+    def run() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    report = collect_garbage(db, store, datasets=datasets)
+                logging.info(f"Store garbage collection: {report}")
+            except Exception as e:
+                logging.error(f"Store garbage collection failed: {e}")
+
+    thread = Thread(target=run, daemon=True)
+    thread.start()
+    return thread
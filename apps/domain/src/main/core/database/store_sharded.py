@@ -0,0 +1,484 @@
+# stdlib
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import heapq
+import itertools
+import logging
+import os
+from threading import Lock
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import KeysView
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import ValuesView
+
+# third party
+from sqlalchemy import event
+from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm import sessionmaker
+from syft.core.common.uid import UID
+from syft.core.store import ObjectStore
+from syft.core.store.storeable_object import StorableObject
+
+# grid relative
+from .bin_storage.bin_obj import BinObject
+from .bin_storage.bin_obj import Blob
+from .bin_storage.bin_obj import ObjectMetadata
+from .bin_storage.bin_obj import ObjectPermission
+from .bin_storage.bin_obj import ObjectTag
+from .bin_storage.bin_obj import StoredBytes
+from .schema import upgrade_schema
+from .store_disk import DiskObjectStore
+
+# Comma separated database URLs, one per shard of the object store
+STORE_SHARDS = "STORE_SHARDS"
+SHARD_BIND_PREFIX = "store_shard_"
+
+# Phases of the main session commit that calls made with commit=False wait for
+BEFORE_COMMIT = "before_commit"
+AFTER_COMMIT = "after_commit"
+
+# Tables created in every shard database
+SHARD_TABLES = [
+    Blob.__table__,
+    BinObject.__table__,
+    ObjectMetadata.__table__,
+    ObjectTag.__table__,
+    ObjectPermission.__table__,
+]
+
+
+def get_shard_binds() -> Dict[str, str]:
+    """SQLALCHEMY_BINDS entries of the shards configured by STORE_SHARDS."""
+    urls = [url.strip() for url in os.getenv(STORE_SHARDS, "").split(",")]
+    return {
+        f"{SHARD_BIND_PREFIX}{i}": url
+        for i, url in enumerate(url for url in urls if url)
+    }
+
+
+class ShardDatabase:
+    """Stand-in for the Flask-SQLAlchemy instance of a DiskObjectStore, with a
+    session bound to a single shard engine."""
+
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        self.session = scoped_session(sessionmaker(bind=engine))
+
+
+class ShardedObjectStore(ObjectStore):
+    """Object store partitioned across several databases.
+
+    Every object lives in the shard picked by the hash of its UID, and each
+    shard is a DiskObjectStore on its own SQLAlchemy bind, so payload traffic
+    doesn't go through the main database. Batch operations (get_many,
+    set_many, delete_many, search...) run on every involved shard in
+    parallel.
+
+    Each shard commits its own transaction: a batch spanning several shards
+    is not atomic. Writes made with `commit=False` (set_many, load,
+    delete_many, update_metadata, grant_permission, revoke_permission) are
+    held until the main database session commits, so they land with the rows
+    referencing them: new objects, metadata and permissions are written to the shards
+    before the main transaction commits (a shard failure aborts it), deleted
+    objects are removed once it has committed (a shard failure leaves
+    unreferenced objects, never rows pointing to missing ones). They are
+    dropped if the session rolls back, and reads don't see them before the
+    commit.
+
+    Args:
+        db: Flask-SQLAlchemy database instance, with the shard binds
+            configured in SQLALCHEMY_BINDS.
+        binds: Bind keys of the shards, in order. The order must not change
+            once objects are stored.
+        kwargs: DiskObjectStore arguments of every shard.
+    """
+
+    def __init__(self, db, binds: List[str], **kwargs) -> None:
+        if not binds:
+            raise ValueError("A sharded store needs at least one shard")
+
+        self.db = db
+        self.binds = binds
+        self.store_kwargs = kwargs
+        self._shards: Optional[List[DiskObjectStore]] = None
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(binds), thread_name_prefix="store-shard"
+        )
+        # Batches waiting for the main session to commit, in its info dict
+        self._pending_key = f"sharded_store_pending_{id(self)}"
+        event.listen(db.session, "before_commit", self._before_commit)
+        event.listen(db.session, "after_commit", self._after_commit)
+        event.listen(db.session, "after_soft_rollback", self._after_rollback)
+
+    @property
+    def shards(self) -> List[DiskObjectStore]:
+        # Engines need the application configuration, they are created on use
+        with self._lock:
+            if self._shards is None:
+                shards = []
+                for bind in self.binds:
+                    engine = self.db.get_engine(bind=bind)
+                    self.db.Model.metadata.create_all(bind=engine, tables=SHARD_TABLES)
+                    upgrade_schema(engine, tables=SHARD_TABLES)
+                    shards.append(
+                        DiskObjectStore(ShardDatabase(engine), **self.store_kwargs)
+                    )
+                self._shards = shards
+            return self._shards
+
+    def shard_index(self, key: UID) -> int:
+        digest = hashlib.blake2b(key.value.bytes, digest_size=8).digest()
+        return int.from_bytes(digest, "little") % len(self.binds)
+
+    def shard_for(self, key: UID) -> DiskObjectStore:
+        return self.shards[self.shard_index(key)]
+
+    def _group(self, keys: Iterable[UID]) -> Dict[int, List[UID]]:
+        groups: Dict[int, List[UID]] = {}
+        for key in keys:
+            groups.setdefault(self.shard_index(key), []).append(key)
+        return groups
+
+    def _call(self, shard: DiskObjectStore, method: str, *args, **kwargs) -> Any:
+        try:
+            return getattr(shard, method)(*args, **kwargs)
+        finally:
+            # Shard sessions are thread local, don't keep connections around
+            shard.db.session.remove()
+
+    def _map(
+        self, method: str, args: Optional[Dict[int, tuple]] = None, **kwargs
+    ) -> Dict[int, Any]:
+        """Call a method on several shards in parallel.
+
+        Args:
+            method: DiskObjectStore method name.
+            args: Positional arguments by shard index. Every shard is called
+                with no positional arguments by default.
+            kwargs: Keyword arguments of every call.
+        Returns:
+            results: Return values by shard index.
+        """
+        shards = self.shards
+        if args is None:
+            args = {i: () for i in range(len(shards))}
+        if len(args) == 1:
+            ((i, shard_args),) = args.items()
+            return {i: self._call(shards[i], method, *shard_args, **kwargs)}
+
+        futures = {
+            i: self._executor.submit(
+                self._call, shards[i], method, *shard_args, **kwargs
+            )
+            for i, shard_args in args.items()
+        }
+        return {i: future.result() for i, future in futures.items()}
+
+    def _merge_pages(
+        self,
+        method: str,
+        sort_key: Callable,
+        offset: int,
+        limit: Optional[int],
+        *args,
+    ) -> List[Any]:
+        # Every shard returns its first offset + limit items in order, the
+        # global page is cut from their merge
+        shard_limit = None if limit is None else offset + limit
+        pages = self._map(
+            method,
+            {i: args for i in range(len(self.binds))},
+            offset=0,
+            limit=shard_limit,
+        )
+        merged = heapq.merge(*pages.values(), key=sort_key)
+        stop = None if limit is None else offset + limit
+        return list(itertools.islice(merged, offset, stop))
+
+    def get_object(self, key: UID) -> Optional[StorableObject]:
+        try:
+            return self.__getitem__(key)
+        except Exception:
+            return None
+
+    def __getitem__(self, key: UID) -> StorableObject:
+        return self._call(self.shard_for(key), "__getitem__", key)
+
+    def __setitem__(self, key: UID, value: StorableObject) -> None:
+        self._call(self.shard_for(key), "__setitem__", key, value)
+
+    def read_slice(self, key: UID, *args, **kwargs) -> Any:
+        return self._call(self.shard_for(key), "read_slice", key, *args, **kwargs)
+
+    def __contains__(self, key: UID) -> bool:
+        return self._call(self.shard_for(key), "__contains__", key)
+
+    def delete(self, key: UID) -> None:
+        self._call(self.shard_for(key), "delete", key)
+
+    def get_many(self, keys: Iterable[UID]) -> List[StorableObject]:
+        keys = list(keys)
+        groups = self._group(keys)
+        results = self._map("get_many", {i: (group,) for i, group in groups.items()})
+        found = {obj.id.value: obj for objs in results.values() for obj in objs}
+        return [found[key.value] for key in keys if key.value in found]
+
+    def set_many(
+        self, items: Iterable[Tuple[UID, StorableObject]], commit: bool = True
+    ) -> None:
+        groups: Dict[int, List[Tuple[UID, StorableObject]]] = {}
+        for key, value in items:
+            groups.setdefault(self.shard_index(key), []).append((key, value))
+        args = {i: (group,) for i, group in groups.items()}
+        if not commit:
+            self._defer(BEFORE_COMMIT, "set_many", args)
+            return
+        self._map("set_many", args)
+
+    def delete_many(self, keys: Iterable[UID], commit: bool = True) -> None:
+        args = {i: (group,) for i, group in self._group(keys).items()}
+        if not commit:
+            self._defer(AFTER_COMMIT, "delete_many", args)
+            return
+        self._map("delete_many", args)
+
+    def _write(self, method: str, key: UID, commit: bool, *args, **kwargs) -> None:
+        """Call a writing method on the shard of a key, or hold it until the
+        main session commits if `commit` is False."""
+        index = self.shard_index(key)
+        if not commit:
+            self._defer(BEFORE_COMMIT, method, {index: (key,) + args}, **kwargs)
+            return
+        self._call(self.shards[index], method, key, *args, **kwargs)
+
+    def _defer(self, phase: str, method: str, args: Dict[int, tuple], **kwargs) -> None:
+        pending = self.db.session().info.setdefault(
+            self._pending_key, {BEFORE_COMMIT: [], AFTER_COMMIT: []}
+        )
+        pending[phase].append((method, args, kwargs))
+
+    def _run_pending(self, session, phase: str) -> None:
+        pending = session.info.get(self._pending_key, None)
+        if not pending:
+            return
+        # Calls run in the order they were made
+        calls, pending[phase] = pending[phase], []
+        for method, args, kwargs in calls:
+            self._map(method, args, **kwargs)
+
+    def _before_commit(self, session) -> None:
+        # Raising here aborts the commit of the main session
+        self._run_pending(session, BEFORE_COMMIT)
+
+    def _after_commit(self, session) -> None:
+        try:
+            self._run_pending(session, AFTER_COMMIT)
+        except Exception as e:
+            logging.error(f"Sharded store deletion failed after commit: {e}")
+        finally:
+            session.info.pop(self._pending_key, None)
+
+    def _after_rollback(self, session, previous_transaction) -> None:
+        session.info.pop(self._pending_key, None)
+
+    def load(
+        self, records: List[Tuple[dict, Optional[StoredBytes]]], commit: bool = True
+    ) -> None:
+        """Write objects returned by `DiskObjectStore.dump` to their shards.
+
+        A shared payload only comes with the first object pointing to it, the
+        shards of the other objects copy it from the batch or from the shard
+        that already stores it.
+        """
+        payloads = {
+            record["content_hash"]: payload
+            for record, payload in records
+            if record["content_hash"] is not None and payload is not None
+        }
+        groups: Dict[int, List[Tuple[dict, Optional[StoredBytes]]]] = {}
+        for record, payload in records:
+            index = self.shard_index(UID.from_string(record["id"]))
+            groups.setdefault(index, []).append((record, payload))
+
+        args = {
+            i: (self._attach_blobs(i, group, payloads),) for i, group in groups.items()
+        }
+        if not commit:
+            self._defer(BEFORE_COMMIT, "load", args)
+            return
+        self._map("load", args)
+
+    def _attach_blobs(
+        self,
+        index: int,
+        group: List[Tuple[dict, Optional[StoredBytes]]],
+        payloads: Dict[str, StoredBytes],
+    ) -> List[Tuple[dict, Optional[StoredBytes]]]:
+        provided = {record["content_hash"] for record, payload in group if payload}
+        missing = {
+            record["content_hash"]
+            for record, payload in group
+            if record["content_hash"] is not None and payload is None
+        }
+        missing -= provided
+        if not missing:
+            return group
+        missing -= self._call(self.shards[index], "_existing_blobs", list(missing))
+
+        attached = []
+        for record, payload in group:
+            _hash = record["content_hash"]
+            if _hash in missing:
+                payload = payloads.get(_hash, None) or self._read_blob(_hash)
+                missing.discard(_hash)
+            attached.append((record, payload))
+        return attached
+
+    def _read_blob(self, _hash: str) -> Optional[StoredBytes]:
+        for shard in self.shards:
+            payload = self._call(shard, "read_blob", _hash)
+            if payload is not None:
+                return payload
+        return None
+
+    def get_objects_of_type(self, obj_type: type) -> Iterable[StorableObject]:
+        results = self._map(
+            "get_objects_of_type", {i: (obj_type,) for i in range(len(self.binds))}
+        )
+        return [obj for objs in results.values() for obj in objs]
+
+    def get_metadata_of_type(
+        self, obj_type: type, offset: int = 0, limit: Optional[int] = None
+    ) -> List[ObjectMetadata]:
+        return self._merge_pages(
+            "get_metadata_of_type", lambda m: m.obj, offset, limit, obj_type
+        )
+
+    def search(
+        self, tags: Iterable[str], match: str = "all", verify_key: Any = None
+    ) -> List[UID]:
+        results = self._map(
+            "search",
+            {i: () for i in range(len(self.binds))},
+            tags=list(tags),
+            match=match,
+            verify_key=verify_key,
+        )
+        return [key for keys in results.values() for key in keys]
+
+    def get_metadata(self, key: UID) -> ObjectMetadata:
+        return self._call(self.shard_for(key), "get_metadata", key)
+
+    def update_metadata(self, key: UID, commit: bool = True, **fields) -> None:
+        self._write("update_metadata", key, commit, **fields)
+
+    def grant_permission(self, key: UID, *args, commit: bool = True, **kwargs) -> None:
+        self._write("grant_permission", key, commit, *args, **kwargs)
+
+    def revoke_permission(self, key: UID, *args, commit: bool = True, **kwargs) -> None:
+        self._write("revoke_permission", key, commit, *args, **kwargs)
+
+    def has_permission(self, key: UID, *args, **kwargs) -> bool:
+        return self._call(self.shard_for(key), "has_permission", key, *args, **kwargs)
+
+    def get_permissions(self, key: UID, *args, **kwargs) -> Dict[str, Optional[str]]:
+        return self._call(self.shard_for(key), "get_permissions", key, *args, **kwargs)
+
+    def readable_by(
+        self, verify_key: Any, offset: int = 0, limit: Optional[int] = None
+    ) -> List[UID]:
+        return self._merge_pages(
+            "readable_by", lambda key: str(key.value), offset, limit, verify_key
+        )
+
+    def keys_page(self, offset: int = 0, limit: Optional[int] = None) -> List[UID]:
+        """Return one page of keys, in the same order on every call."""
+        limit = limit or self.store_kwargs.get("page_size", 100)
+        return self._merge_pages("keys_page", lambda key: str(key.value), offset, limit)
+
+    def values_page(
+        self, offset: int = 0, limit: Optional[int] = None
+    ) -> List[StorableObject]:
+        return self.get_many(self.keys_page(offset=offset, limit=limit))
+
+    def iter_items(
+        self, page_size: Optional[int] = None
+    ) -> Iterator[Tuple[UID, StorableObject]]:
+        # Shards are streamed one after the other
+        for shard in self.shards:
+            try:
+                yield from shard.iter_items(page_size=page_size)
+            finally:
+                shard.db.session.remove()
+
+    def iter_keys(self, page_size: Optional[int] = None) -> Iterator[UID]:
+        for key, _ in self.iter_items(page_size=page_size):
+            yield key
+
+    def iter_values(self, page_size: Optional[int] = None) -> Iterator[StorableObject]:
+        for _, obj in self.iter_items(page_size=page_size):
+            yield obj
+
+    def keys(self) -> KeysView[UID]:
+        return [key for keys in self._map("keys").values() for key in keys]
+
+    def values(self) -> ValuesView[StorableObject]:
+        return list(self.iter_values())
+
+    def __len__(self) -> int:
+        return sum(self._map("__len__").values())
+
+    def __sizeof__(self) -> int:
+        return sum(self._map("__sizeof__").values())
+
+    def __str__(self) -> str:
+        return f"<{type(self).__name__}: {len(self)} objects, {len(self.binds)} shards>"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+    def compression_stats(self) -> Dict[str, Dict[str, int]]:
+        stats: Dict[str, Dict[str, int]] = {}
+        for shard_stats in self._map("compression_stats").values():
+            for codec, counters in shard_stats.items():
+                total = stats.setdefault(codec, dict.fromkeys(counters, 0))
+                for name, value in counters.items():
+                    total[name] += value
+        return stats
+
+    def dedup_stats(self) -> Dict[str, int]:
+        stats: Dict[str, int] = {}
+        for shard_stats in self._map("dedup_stats").values():
+            for name, value in shard_stats.items():
+                stats[name] = stats.get(name, 0) + value
+        return stats
+
+    def shard_stats(self) -> List[Dict[str, int]]:
+        """Number of objects and stored bytes of every shard."""
+        counts = self._map("__len__")
+        sizes = self._map("__sizeof__")
+        return [
+            {"shard": i, "objects": counts[i], "bytes": sizes[i]}
+            for i in range(len(self.binds))
+        ]
+
+    def flush(self) -> None:
+        self._map("flush")
+
+    def clear(self) -> None:
+        self._map("clear")
+
+    def close(self) -> None:
+        if self._shards is not None:
+            self._map("close")
+        self._executor.shutdown(wait=True)
+        event.remove(self.db.session, "before_commit", self._before_commit)
+        event.remove(self.db.session, "after_commit", self._after_commit)
+        event.remove(self.db.session, "after_soft_rollback", self._after_rollback)
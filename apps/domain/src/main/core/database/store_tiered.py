@@ -0,0 +1,330 @@
+# stdlib
+import os
+import sys
+from threading import RLock
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+# third party
+from flask import current_app as app
+from flask import has_app_context
+from nacl.signing import VerifyKey
+import numpy as np
+from syft.core.common.uid import UID
+from syft.core.store import ObjectStore
+from syft.core.store.storeable_object import StorableObject
+import torch as th
+
+# grid relative
+from .bin_storage.bin_obj import BinObject
+from .bin_storage.bin_obj import ObjectMetadata
+from .bin_storage.bin_obj import StoredBytes
+from .store_disk import DiskObjectStore
+from .store_disk import READ_PERMISSION
+from .store_disk import can_search
+from .store_disk import chunks
+from .store_disk import slice_object
+from .store_disk import verify_key_to_hex
+from .store_sharded import STORE_SHARDS
+from .store_sharded import ShardedObjectStore
+from .store_sharded import get_shard_binds
+
+# Byte budget of the memory tier, 0 to use the disk store alone
+STORE_MEMORY_SIZE = "STORE_MEMORY_SIZE"
+# Write objects to disk as soon as they are stored ("true") or only when they
+# are spilled from the memory tier (default)
+STORE_WRITE_THROUGH = "STORE_WRITE_THROUGH"
+
+
+def estimate_size(data: Any) -> int:
+    """Approximate memory held by an object that hasn't been serialized."""
+    if isinstance(data, th.Tensor):
+        return data.element_size() * data.nelement()
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    if isinstance(data, (bytes, bytearray, str)):
+        return len(data)
+    return sys.getsizeof(data)
+
+
+class TieredObjectStore(DiskObjectStore):
+    """Disk object store with a byte-budgeted memory tier in front of it.
+
+    Recently used objects are kept deserialized in memory. Objects read from
+    disk are promoted to the memory tier, and the least recently used ones are
+    dropped from it when the budget is exceeded.
+
+    New objects are written to memory only, unless `write_through` is set, and
+    reach the disk when they are evicted (spilled) from the memory tier, when
+    the store is flushed, or before any query that reads the whole store
+    (iteration, pages, dumps...). Length, tag searches and read permission
+    checks also answer from the memory tier, and metadata or permission
+    changes only spill the object they concern. Objects that were never
+    spilled are lost if the process dies, which is the price of memory-speed
+    writes.
+
+    Args:
+        db: Flask-SQLAlchemy database instance.
+        memory_size: Byte budget of the memory tier.
+        write_through: Write objects to disk as soon as they are stored.
+        kwargs: DiskObjectStore arguments (page size, write-behind queue).
+    """
+
+    def __init__(
+        self, db, memory_size: int, write_through: bool = False, **kwargs
+    ) -> None:
+        super().__init__(db, cache_size=memory_size, **kwargs)
+        self.write_through = write_through
+        # Objects that are in the memory tier only
+        self._dirty: Dict[str, Tuple[UID, StorableObject]] = {}
+        self._lock = RLock()
+        self._app = None
+
+    def __getitem__(self, key: UID) -> StorableObject:
+        with self._lock:
+            entry = self._dirty.get(str(key.value), None)
+            if entry is not None:
+                self.cache.get(str(key.value))
+                return entry[1]
+        return super().__getitem__(key)
+
+    def read_slice(self, key: UID, *args, **kwargs) -> Any:
+        with self._lock:
+            entry = self._dirty.get(str(key.value), None)
+        if entry is not None:
+            return slice_object(entry[1].data, *args, **kwargs)
+        return super().read_slice(key, *args, **kwargs)
+
+    def __contains__(self, key: UID) -> bool:
+        with self._lock:
+            if str(key.value) in self._dirty:
+                return True
+        return super().__contains__(key)
+
+    def __setitem__(self, key: UID, value: StorableObject) -> None:
+        if self.write_through:
+            super().__setitem__(key, value)
+            self._promote(key, value)
+            return
+
+        if self._app is None and has_app_context():
+            # Objects left in memory are spilled at exit, out of any request
+            self._app = app._get_current_object()
+
+        _id = str(key.value)
+        with self._lock:
+            self._dirty[_id] = (key, value)
+            self._spill(self.cache.put(_id, value, size=estimate_size(value.data)))
+
+    def delete(self, key: UID) -> None:
+        self._discard([key])
+        super().delete(key)
+
+    def get_many(self, keys: Iterable[UID]) -> List[StorableObject]:
+        keys = list(keys)
+        with self._lock:
+            found = {
+                str(key.value): self._dirty[str(key.value)][1]
+                for key in keys
+                if str(key.value) in self._dirty
+            }
+        stored = super().get_many([key for key in keys if str(key.value) not in found])
+        found.update({str(obj.id.value): obj for obj in stored})
+        return [found[str(key.value)] for key in keys if str(key.value) in found]
+
+    def set_many(
+        self, items: Iterable[Tuple[UID, StorableObject]], commit: bool = True
+    ) -> None:
+        # These writes replace the memory-only versions of the same keys
+        items = list(items)
+        self._discard([key for key, _ in items])
+        super().set_many(items, commit=commit)
+
+    def delete_many(self, keys: Iterable[UID], commit: bool = True) -> None:
+        keys = list(keys)
+        self._discard(keys)
+        super().delete_many(keys, commit=commit)
+
+    def load(
+        self, records: List[Tuple[dict, Optional[StoredBytes]]], commit: bool = True
+    ) -> None:
+        self._discard([UID.from_string(record["id"]) for record, _ in records])
+        super().load(records, commit=commit)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._flush_queue()
+            ids = list(self._dirty)
+            stored = set()
+            for batch in chunks(ids):
+                stored.update(
+                    _id
+                    for (_id,) in self.db.session.query(ObjectMetadata.obj).filter(
+                        ObjectMetadata.obj.in_(batch)
+                    )
+                )
+            count = self.db.session.query(ObjectMetadata).count()
+        return count + len(ids) - len(stored)
+
+    def search(
+        self,
+        tags: Iterable[str],
+        match: str = "all",
+        verify_key: Optional[Union[VerifyKey, str]] = None,
+    ) -> List[UID]:
+        tags = set(tags)
+        with self._lock:
+            dirty = list(self._dirty.values())
+        self._flush_queue()
+        keys = self._search(tags, match=match, verify_key=verify_key)
+
+        # Memory-only versions replace the ones on disk
+        dirty_ids = {str(key.value) for key, _ in dirty}
+        keys = [key for key in keys if str(key.value) not in dirty_ids]
+        for key, value in dirty:
+            found = tags.intersection(value.tags or [])
+            if (
+                found
+                and (match == "any" or found == tags)
+                and (verify_key is None or can_search(value, verify_key))
+            ):
+                keys.append(key)
+        return keys
+
+    def has_permission(
+        self,
+        key: UID,
+        verify_key: Union[VerifyKey, str],
+        kind: str = READ_PERMISSION,
+    ) -> bool:
+        with self._lock:
+            entry = self._dirty.get(str(key.value), None)
+        if entry is None or kind != READ_PERMISSION:
+            return super().has_permission(key, verify_key, kind=kind)
+        verify_key = verify_key_to_hex(verify_key)
+        return any(
+            verify_key_to_hex(granted) == verify_key
+            for granted in entry[1].read_permissions or {}
+        )
+
+    def flush(self) -> None:
+        """Write every memory-only object to disk. They stay in the memory
+        tier, as clean copies."""
+        super().flush()
+        with self._lock:
+            if not self._dirty:
+                return
+            items = list(self._dirty.values())
+            self._write(items)
+            for key, value in items:
+                self._promote(key, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._dirty.clear()
+        super().clear()
+
+    def close(self) -> None:
+        if self._dirty and self._app is not None and not has_app_context():
+            with self._app.app_context():
+                self.flush()
+        else:
+            self.flush()
+        super().close()
+
+    def tier_stats(self) -> Dict[str, int]:
+        """Memory tier counters, including the objects not written to disk."""
+        stats = self.cache.stats()
+        with self._lock:
+            stats["dirty"] = len(self._dirty)
+        return stats
+
+    def _promote(self, key: UID, value: StorableObject) -> None:
+        with self._lock:
+            self._spill(
+                self.cache.put(str(key.value), value, size=estimate_size(value.data))
+            )
+
+    def _cache_put(self, bin_obj: BinObject, obj: StorableObject) -> None:
+        # Promotion of objects read from disk may evict memory-only ones. They
+        # are sized like written objects: deserialized, without codec headers.
+        with self._lock:
+            self._spill(self.cache.put(bin_obj.id, obj, size=estimate_size(obj.data)))
+
+    def _flush_key(self, key: UID) -> None:
+        # Only the object the metadata or permissions belong to is spilled
+        with self._lock:
+            entry = self._dirty.get(str(key.value), None)
+            if entry is None:
+                self._flush_queue()
+                return
+            self._write([entry])
+            self._promote(*entry)
+
+    def _spill(self, evicted: List[Tuple[str, StorableObject]]) -> None:
+        items = [self._dirty[_id] for _id, _ in evicted if _id in self._dirty]
+        if items:
+            self._write(items)
+
+    def _write(self, items: List[Tuple[UID, StorableObject]]) -> None:
+        # Queued deletions are older than the objects being written
+        self._flush_queue()
+        self._set_many(items, commit=True)
+        for key, _ in items:
+            self._dirty.pop(str(key.value), None)
+
+    def _discard(self, keys: Iterable[UID]) -> None:
+        with self._lock:
+            for key in keys:
+                self._dirty.pop(str(key.value), None)
+                self.cache.invalidate(str(key.value))
+
+
+def create_object_store(
+    db,
+    memory_size: Optional[int] = None,
+    write_through: Optional[bool] = None,
+    **kwargs,
+) -> ObjectStore:
+    """Create the object store of a node.
+
+    Args:
+        db: Flask-SQLAlchemy database instance.
+        memory_size: Byte budget of a memory tier. If it is positive, a
+            TieredObjectStore is returned, otherwise a DiskObjectStore. Read
+            from the STORE_MEMORY_SIZE environment variable by default.
+        write_through: Whether the memory tier writes objects to disk as soon
+            as they are stored. Read from STORE_WRITE_THROUGH by default.
+        kwargs: DiskObjectStore arguments.
+    Returns:
+        store: A ShardedObjectStore if shard databases are configured
+            (STORE_SHARDS), otherwise a DiskObjectStore or TieredObjectStore.
+    Raises:
+        ValueError: If both shards and a memory tier are configured, the memory
+            tier only fronts a single database.
+    """
+    if memory_size is None:
+        memory_size = int(os.getenv(STORE_MEMORY_SIZE, 0))
+    if write_through is None:
+        write_through = os.getenv(STORE_WRITE_THROUGH, "").lower() in ("1", "true")
+
+    shard_binds = get_shard_binds()
+    if shard_binds:
+        if memory_size > 0 or write_through:
+            raise ValueError(
+                f"{STORE_MEMORY_SIZE} and {STORE_WRITE_THROUGH} can't be used "
+                f"with a sharded store ({STORE_SHARDS})"
+            )
+        return ShardedObjectStore(db, binds=list(shard_binds), **kwargs)
+
+    if memory_size > 0:
+        kwargs.pop("cache_size", None)
+        return TieredObjectStore(
+            db, memory_size=memory_size, write_through=write_through, **kwargs
+        )
+    return DiskObjectStore(db, **kwargs)
@@ -0,0 +1,304 @@
+# stdlib
+import logging
+from threading import Condition
+from threading import Thread
+import time
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# third party
+from syft.core.common.uid import UID
+from syft.core.store.storeable_object import StorableObject
+
+# Marks a pending deletion in the queue
+DELETED = object()
+
+Batch = List[Tuple[UID, object]]
+
+# Seconds before a failed write is retried, doubled after every failure
+RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 30.0
+# Attempts of a write before it is moved to the dead letters
+MAX_ATTEMPTS = 5
+
+
+class WriteBehindError(RuntimeError):
+    """Queued writes couldn't be committed."""
+
+
+class WriteBehindQueue:
+    """Bounded queue of pending store writes, flushed by a background thread.
+
+    Writes are coalesced per key (only the last value of a key is written)
+    and flushed as one batch, in one transaction, when `flush_batch` keys are
+    pending or when the oldest pending write is `flush_interval` seconds old.
+    Pending values stay readable until their batch is committed, so readers
+    always see their own writes.
+
+    A write that fails stays queued and readable, and is retried with an
+    exponential backoff, unless a newer write of the same key replaces it.
+    After MAX_ATTEMPTS failures it is logged and moved to the dead letters
+    (see `dead_letters`). Failures never propagate to `flush`, which readers
+    call: one bad write can't break unrelated reads. `close` raises if some
+    writes were dead-lettered, they are lost.
+
+    Args:
+        write: Called from the flusher thread with a batch of (key, value)
+            pairs, where value is either a StorableObject or DELETED. It must
+            write the whole batch in a single transaction.
+        max_pending: Maximum number of pending keys. Writers block when the
+            queue is full, until the flusher catches up.
+        flush_batch: Number of pending keys that triggers a flush.
+        flush_interval: Maximum time (in seconds) a write stays pending.
+        context: Optional callable returning a context manager entered around
+            each flush, e.g. the Flask application context.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[Batch], None],
+        max_pending: int = 1000,
+        flush_batch: int = 100,
+        flush_interval: float = 0.05,
+        context: Optional[Callable] = None,
+    ) -> None:
+        self.write = write
+        self.max_pending = max(1, max_pending)
+        self.flush_batch = max(1, min(flush_batch, self.max_pending))
+        self.flush_interval = flush_interval
+        self.context = context
+
+        self.flushes = 0
+        self.flushed = 0
+        self.failed = 0
+
+        # Failed attempts and next retry time of the pending writes that
+        # failed, writes that ran out of attempts and why
+        self._attempts: Dict[str, int] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._dead: List[Tuple[UID, object, Exception]] = []
+
+        self._pending: Dict[str, Tuple[UID, object]] = {}
+        self._flushing: Dict[str, Tuple[UID, object]] = {}
+        # Time of the oldest pending write that was never attempted
+        self._oldest: Optional[float] = None
+        self._flush_requested = False
+        self._closed = False
+        self._condition = Condition()
+        self._thread: Optional[Thread] = None
+
+    def put(self, key: UID, value: StorableObject) -> None:
+        self._enqueue(key, value)
+
+    def delete(self, key: UID) -> None:
+        self._enqueue(key, DELETED)
+
+    def get(self, key: str) -> Optional[object]:
+        """Return the pending value of a key (a StorableObject or DELETED), or
+        None if there's no pending write for it."""
+        with self._condition:
+            entry = self._pending.get(key, None) or self._flushing.get(key, None)
+            return entry[1] if entry is not None else None
+
+    def flush(self) -> None:
+        """Block until every write queued so far is committed, or failed and
+        waits for a retry."""
+        with self._condition:
+            if not self._fresh() and not self._flushing:
+                return
+            self._flush_requested = True
+            self._condition.notify_all()
+            while self._fresh() or self._flushing:
+                self._condition.wait()
+
+    def close(self) -> None:
+        """Flush pending writes and stop the flusher thread. Writes still
+        failing are attempted once more.
+
+        Raises:
+            WriteBehindError: If some writes were dead-lettered, they are lost.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        if self._dead:
+            keys = ", ".join(str(key.value) for key, _, _ in self._dead)
+            error = self._dead[-1][2]
+            raise WriteBehindError(
+                f"{len(self._dead)} write-behind writes failed ({keys}): {error}"
+            ) from error
+
+    def dead_letters(self) -> List[Tuple[UID, object, Exception]]:
+        """(key, value, error) of the writes that ran out of attempts."""
+        with self._condition:
+            return list(self._dead)
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                "pending": len(self._pending) + len(self._flushing),
+                "max_pending": self.max_pending,
+                "flushes": self.flushes,
+                "flushed": self.flushed,
+                "failed": self.failed,
+                "retrying": len(self._retry_at),
+                "dead": len(self._dead),
+            }
+
+    def __len__(self) -> int:
+        return len(self._pending) + len(self._flushing)
+
+    def _enqueue(self, key: UID, value: object) -> None:
+        _id = str(key.value)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The write-behind queue is closed")
+            self._start()
+
+            # Back-pressure: overwriting a pending key doesn't take a new slot
+            while _id not in self._pending and len(self._pending) >= self.max_pending:
+                self._condition.notify_all()
+                self._condition.wait()
+
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            # A new write of a failing key starts over
+            self._attempts.pop(_id, None)
+            self._retry_at.pop(_id, None)
+            self._pending[_id] = (key, value)
+            if len(self._pending) >= self.flush_batch:
+                self._condition.notify_all()
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _fresh(self) -> List[str]:
+        """Pending keys that were never attempted."""
+        return [_id for _id in self._pending if _id not in self._retry_at]
+
+    def _due(self) -> List[str]:
+        """Pending keys to write now: fresh ones and retries past their
+        backoff, or every key when closing."""
+        now = time.monotonic()
+        return [
+            _id
+            for _id in self._pending
+            if self._closed or self._retry_at.get(_id, now) <= now
+        ]
+
+    def _ready(self) -> bool:
+        if not self._pending:
+            return False
+        if self._closed:
+            return True
+        now = time.monotonic()
+        if any(retry_at <= now for retry_at in self._retry_at.values()):
+            return True
+        fresh = self._fresh()
+        if not fresh:
+            return False
+        return (
+            self._flush_requested
+            or len(fresh) >= self.flush_batch
+            or now - self._oldest >= self.flush_interval
+        )
+
+    def _timeout(self) -> Optional[float]:
+        deadlines = list(self._retry_at.values())
+        if self._oldest is not None:
+            deadlines.append(self._oldest + self.flush_interval)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._ready():
+                    if self._closed and not self._pending:
+                        return
+                    self._condition.wait(self._timeout())
+
+                # Due writes move to the flushing batch, where they stay
+                # readable until they are committed. Retries waiting for their
+                # backoff stay pending.
+                self._flushing = {_id: self._pending.pop(_id) for _id in self._due()}
+                self._oldest = None
+                self._flush_requested = False
+                # Writers blocked on a full queue can go on
+                self._condition.notify_all()
+
+            batch = list(self._flushing.values())
+            failed = self._write(batch)
+
+            with self._condition:
+                failed_ids = {str(key.value) for key, _, _ in failed}
+                for _id in self._flushing:
+                    if _id not in failed_ids:
+                        self._attempts.pop(_id, None)
+                        self._retry_at.pop(_id, None)
+                self._flushing = {}
+                self.flushes += 1
+                self.flushed += len(batch) - len(failed)
+                self.failed += len(failed)
+                self._requeue(failed)
+                self._condition.notify_all()
+
+    def _requeue(self, failed: List[Tuple[UID, object, Exception]]) -> None:
+        now = time.monotonic()
+        for key, value, error in failed:
+            _id = str(key.value)
+            if _id in self._pending:
+                # A newer write of the same key replaces the failed one
+                continue
+            attempts = self._attempts.get(_id, 0) + 1
+            if self._closed or attempts >= MAX_ATTEMPTS:
+                self._attempts.pop(_id, None)
+                self._retry_at.pop(_id, None)
+                self._dead.append((key, value, error))
+                logging.error(
+                    f"Write-behind write of {_id} failed {attempts} times, "
+                    f"giving up: {error}"
+                )
+                continue
+
+            delay = min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+            self._pending[_id] = (key, value)
+            self._attempts[_id] = attempts
+            self._retry_at[_id] = now + delay
+            logging.error(
+                f"Write-behind write of {_id} failed, retrying in {delay:.1f}s: "
+                f"{error}"
+            )
+
+    def _write(self, batch: Batch) -> List[Tuple[UID, object, Exception]]:
+        """Write a batch, return the (key, value, error) of the failed writes."""
+        try:
+            self._call_write(batch)
+            return []
+        except Exception as e:
+            logging.error(f"Write-behind flush of {len(batch)} objects failed: {e}")
+
+        # Isolate the writes that can't be committed instead of failing the
+        # whole batch
+        failed = []
+        for key, value in batch:
+            try:
+                self._call_write([(key, value)])
+            except Exception as e:
+                failed.append((key, value, e))
+        return failed
+
+    def _call_write(self, batch: Batch) -> None:
+        if self.context is None:
+            self.write(batch)
+        else:
+            with self.context():
+                self.write(batch)
@@ -0,0 +1,242 @@
+# stdlib
+import hashlib
+import json
+import os
+import tempfile
+from threading import Lock
+import time
+from typing import BinaryIO
+from typing import Dict
+from typing import Optional
+import uuid
+
+# Directory of the uploads in progress, a "grid-uploads" directory of the
+# system temporary directory by default
+UPLOAD_DIR = "UPLOAD_DIR"
+# Seconds an upload stays resumable after its last chunk
+UPLOAD_SESSION_TTL = "UPLOAD_SESSION_TTL"
+DEFAULT_UPLOAD_SESSION_TTL = 24 * 3600
+
+# Bytes of a chunk copied to disk at once
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+class UploadOffsetError(ValueError):
+    """A chunk doesn't start where the received bytes end."""
+
+    def __init__(self, offset: int) -> None:
+        super().__init__(f"Chunks must start at offset {offset}")
+        self.offset = offset
+
+
+class ChunkedUpload:
+    """File uploaded in consecutive chunks, appended to a file on disk.
+
+    The file is its own progress record: the offset of the next chunk is the
+    size of the file, and the uploader is recorded in a sidecar JSON file, so
+    an upload can be resumed after a dropped connection or a node restart.
+    """
+
+    def __init__(self, path: str, info: dict) -> None:
+        self.path = path
+        self.id = info["id"]
+        self.user_id = info["user_id"]
+        self.total_size = info.get("total_size", None)
+        self.created_at = info["created_at"]
+
+    @property
+    def offset(self) -> int:
+        return os.path.getsize(self.path)
+
+    @property
+    def updated_at(self) -> float:
+        return os.path.getmtime(self.path)
+
+    def write_chunk(
+        self,
+        offset: int,
+        stream: BinaryIO,
+        checksum: Optional[str] = None,
+    ) -> int:
+        """Append a chunk read from a stream, in blocks.
+
+        Args:
+            offset: Position of the chunk in the file, the current offset.
+            stream: Readable file object of the chunk.
+            checksum: "<algorithm> <hex digest>" of the chunk, e.g.
+                "sha256 9f86d0...". A chunk that doesn't match is dropped.
+        Returns:
+            offset: Offset of the next chunk.
+        Raises:
+            UploadOffsetError: If the chunk doesn't start at the current offset.
+            ValueError: If the checksum is invalid or doesn't match.
+            ValueError: If the chunk goes past the declared size of the file.
+        """
+        digest = None
+        if checksum:
+            algorithm, _, expected = checksum.partition(" ")
+            if algorithm not in hashlib.algorithms_guaranteed or not expected:
+                raise ValueError(f"Invalid checksum: {checksum}")
+            digest = hashlib.new(algorithm)
+
+        if offset != self.offset:
+            raise UploadOffsetError(self.offset)
+
+        with open(self.path, "r+b") as file_obj:
+            file_obj.seek(offset)
+            try:
+                while True:
+                    block = stream.read(COPY_BLOCK_SIZE)
+                    if not block:
+                        break
+                    file_obj.write(block)
+                    if digest is not None:
+                        digest.update(block)
+                    if (
+                        self.total_size is not None
+                        and file_obj.tell() > self.total_size
+                    ):
+                        raise ValueError("Chunk goes past the size of the upload")
+                if digest is not None and digest.hexdigest() != expected.lower():
+                    raise ValueError("Chunk checksum mismatch")
+            except Exception:
+                # The chunk is dropped, the upload resumes at the same offset
+                file_obj.truncate(offset)
+                raise
+            return file_obj.tell()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "offset": self.offset,
+            "total_size": self.total_size,
+            "created_at": self.created_at,
+        }
+
+
+class ChunkedUploads:
+    """Uploads in progress, stored in a directory.
+
+    Chunks of the same upload are written one at a time, chunks of different
+    uploads concurrently. Uploads without a new chunk for `ttl` seconds are
+    deleted.
+
+    Args:
+        directory: Directory of the upload files.
+        ttl: Seconds an upload stays resumable after its last chunk.
+    """
+
+    def __init__(
+        self, directory: Optional[str] = None, ttl: Optional[float] = None
+    ) -> None:
+        if directory is None:
+            directory = os.getenv(
+                UPLOAD_DIR, os.path.join(tempfile.gettempdir(), "grid-uploads")
+            )
+        if ttl is None:
+            ttl = float(os.getenv(UPLOAD_SESSION_TTL, DEFAULT_UPLOAD_SESSION_TTL))
+        self.directory = directory
+        self.ttl = ttl
+        self._locks: Dict[str, Lock] = {}
+        self._lock = Lock()
+
+    def create(self, user_id: int, total_size: Optional[int] = None) -> ChunkedUpload:
+        """Start an upload, with the size of the whole file if it is known."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._expire()
+
+        info = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "total_size": total_size,
+            "created_at": time.time(),
+        }
+        path = self._path(info["id"])
+        open(path, "wb").close()
+        with open(self._info_path(info["id"]), "w") as file_obj:
+            json.dump(info, file_obj)
+        return ChunkedUpload(path, info)
+
+    def get(self, upload_id: str) -> Optional[ChunkedUpload]:
+        # Ids are hex strings, anything else can't name a file of the directory
+        if not upload_id.isalnum():
+            return None
+        try:
+            with open(self._info_path(upload_id)) as file_obj:
+                info = json.load(file_obj)
+        except FileNotFoundError:
+            return None
+        return ChunkedUpload(self._path(upload_id), info)
+
+    def write_chunk(
+        self,
+        upload: ChunkedUpload,
+        offset: int,
+        stream: BinaryIO,
+        checksum: Optional[str] = None,
+    ) -> int:
+        """Append a chunk to an upload (see ChunkedUpload.write_chunk),
+        unless another chunk of the same upload is being written."""
+        lock = self._upload_lock(upload)
+        if not lock.acquire(blocking=False):
+            raise UploadOffsetError(upload.offset)
+        try:
+            return upload.write_chunk(offset, stream, checksum=checksum)
+        finally:
+            lock.release()
+
+    def complete(self, upload: ChunkedUpload) -> BinaryIO:
+        """Finish an upload and return its file, open for reading.
+
+        The file is removed from the directory right away: it is deleted once
+        the returned file object is closed.
+
+        Raises:
+            ValueError: If bytes of the declared size are missing, or a chunk
+                is being written.
+        """
+        lock = self._upload_lock(upload)
+        if not lock.acquire(blocking=False):
+            raise ValueError("A chunk of the upload is being written")
+        try:
+            if upload.total_size is not None and upload.offset != upload.total_size:
+                raise ValueError(
+                    f"Upload incomplete: {upload.offset} of {upload.total_size} bytes"
+                )
+            file_obj = open(upload.path, "rb")
+            self.discard(upload)
+            return file_obj
+        finally:
+            lock.release()
+
+    def discard(self, upload: ChunkedUpload) -> None:
+        for path in (self._info_path(upload.id), upload.path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._locks.pop(upload.id, None)
+
+    def _expire(self) -> None:
+        deadline = time.time() - self.ttl
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            upload = self.get(name[: -len(".json")])
+            try:
+                expired = upload is not None and upload.updated_at < deadline
+            except FileNotFoundError:
+                expired = True
+            if expired:
+                self.discard(upload)
+
+    def _upload_lock(self, upload: ChunkedUpload) -> Lock:
+        with self._lock:
+            return self._locks.setdefault(upload.id, Lock())
+
+    def _path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.part")
+
+    def _info_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.json")
@@ -1,10 +1,16 @@
 # stdlib
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import wait
 from copy import deepcopy
-import csv
 from io import StringIO
+import json
 import tarfile
+from typing import Dict
 from typing import Iterable
+from typing import List
 from typing import Optional
+from typing import Sequence
 
 # third party
 from nacl.encoding import HexEncoder
@@ -12,116 +18,226 @@ from nacl.signing import SigningKey
 import numpy as np
 import pandas as pd
 from pandas import DataFrame
+from sqlalchemy import String
+from sqlalchemy import cast
+from sqlalchemy.orm import aliased
 from syft.core.common.group import VERIFYALL
 from syft.core.common.group import VerifyAll
 from syft.core.common.uid import UID
-from syft.core.node.common.action.save_object_action import SaveObjectAction
 from syft.core.store.storeable_object import StorableObject
 import torch as th
 
 # grid relative
 from ..database import db
-from ..database.bin_storage.bin_obj import BinObject
-from ..database.bin_storage.bin_obj import ObjectMetadata
+from ..database.bin_storage.columnar import is_columnar_enabled
 from ..database.bin_storage.json_obj import JsonObject
 from ..database.bin_storage.metadata import get_metadata
+from ..database.dataset.catalog import catalog_version
 from ..database.dataset.datasetgroup import BinObjDataset
 from ..database.dataset.datasetgroup import Dataset
+from ..database.dataset.datasetgroup import DatasetColumn
 from ..database.dataset.datasetgroup import DatasetGroup
 from ..database.store_disk import DiskObjectStore
+from ..database.store_disk import chunks
 from ..database.utils import model_to_json
-
-
-def decompress(file_obj):
-    tar_obj = tarfile.open(fileobj=file_obj)
-    tar_obj.extractall()
-    return tar_obj
-
-
-def extract_metadata_info(tar_obj):
+from .parsing import describe_columns
+from .parsing import dtype_schema
+from .parsing import fit_dtypes
+from .parsing import get_parse_executor
+from .parsing import histogram_bins
+from .parsing import ingest_member
+from .parsing import is_narrowing_enabled
+from .parsing import parse_member
+from .parsing import parse_workers
+from .parsing import read_csv
+from .parsing import schema_dtypes
+from .upload_jobs import ProgressReader
+from .upload_jobs import UploadJob
+
+
+def decompress(file_obj) -> tarfile.TarFile:
+    """Open an uploaded archive in stream mode: members are read once, in
+    order, straight from the upload and nothing is extracted to disk."""
+    return tarfile.open(fileobj=file_obj, mode="r|*")
+
+
+def store_objects(store, storables: Iterable[StorableObject]) -> None:
+    """Stage a batch of objects into the node store.
+
+    The disk store only adds them to the current session, so they are committed
+    together with the dataset rows. A sharded store commits each shard on its
+    own. Other stores fall back to one write per object.
+    """
+    if hasattr(store, "set_many"):
+        store.set_many([(obj.id, obj) for obj in storables], commit=False)
+    else:
+        for obj in storables:
+            store[obj.id] = obj
+
+
+def process_items(node, tar_obj, user_key, job: Optional[UploadJob] = None):
+    # Optional fields
     tags = []
     manifest = ""
     description = ""
-    skip_files = []
-    for file_obj in tar_obj.members:
-        if "tags" in file_obj.name:
-            tags = tar_obj.extractfile(file_obj.name).read().decode().split("\n")[:-1]
-            skip_files.append(file_obj.name)
-        elif "description" in file_obj.name:
-            description = tar_obj.extractfile(file_obj.name).read().decode()
-            skip_files.append(file_obj.name)
-        elif "manifest" in file_obj.name:
-            manifest = tar_obj.extractfile(file_obj.name).read().decode()
-            skip_files.append(file_obj.name)
-
-    return tags, manifest, description, skip_files
-
-
-def process_items(node, tar_obj, user_key):
-    # Optional fields
-    tags, manifest, description, skip_files = extract_metadata_info(tar_obj)
+
+    # Data files are parsed and described by the worker processes while the
+    # archive stream is read. Metadata files may come after them in the stream.
+    executor = get_parse_executor()
+    columnar = is_columnar_enabled()
+    bins = histogram_bins()
+    narrow = is_narrowing_enabled()
+    parsing = []
+    running = set()
+    for item in tar_obj:
+        if not item.isfile():
+            continue
+        file_obj = tar_obj.extractfile(item)
+        if "tags" in item.name:
+            tags = file_obj.read().decode().split("\n")[:-1]
+        elif "description" in item.name:
+            description = file_obj.read().decode()
+        elif "manifest" in item.name:
+            manifest = file_obj.read().decode()
+        else:
+            if executor is None:
+                future = _parse_inline(file_obj, item.size, columnar, bins, narrow)
+            else:
+                # Bound the raw files held in memory while they wait for a
+                # worker
+                if len(running) >= 2 * parse_workers():
+                    _, running = wait(running, return_when=FIRST_COMPLETED)
+                future = executor.submit(
+                    ingest_member,
+                    file_obj.read(),
+                    columnar=columnar,
+                    bins=bins,
+                    narrow=narrow,
+                )
+                running.add(future)
+            if job is not None:
+                future.add_done_callback(
+                    lambda f: job.member_done(failed=f.exception() is not None)
+                )
+            parsing.append((item.name, future))
+
+    # A file that can't be parsed, or cast to the types of the manifest schema,
+    # is reported, the others are still stored. The schema is only known once
+    # the whole stream is read, so files are cast after being parsed.
+    schema = dtype_schema(manifest)
+    arrays = []
+    errors = []
+    for name, result in parsing:
+        try:
+            parsed, columns = result.result()
+            dtypes = schema_dtypes(schema, name)
+            if dtypes is not None:
+                parsed = fit_dtypes(parsed, dtypes)
+                columns = describe_columns(parsed, bins=bins)
+            arrays.append((name, (parsed, columns)))
+        except Exception as e:
+            errors.append({"name": name, "error": str(e)})
+    if errors and not arrays:
+        raise ValueError(f"No dataset file could be parsed: {errors}")
+
+    # Same permissions a SaveObjectAction signed by the uploader would grant
+    user_verify_key = SigningKey(
+        user_key.encode("utf-8"), encoder=HexEncoder
+    ).verify_key
+    read_permissions = {node.verify_key: node.id, user_verify_key: None}
 
     dataset_db = Dataset(
         id=str(UID().value), manifest=manifest, description=description, tags=tags
     )
     db.session.add(dataset_db)
     data = list()
-    for item in tar_obj.members:
-        if not item.isdir() and (not item.name in skip_files):
-            reader = csv.reader(
-                tar_obj.extractfile(item.name).read().decode().split("\n"),
-                delimiter=",",
-            )
-
-            dataset = []
-
-            for row in reader:
-                if len(row) != 0:
-                    dataset.append(row)
-            dataset = np.array(dataset, dtype=np.float)
-            df = th.tensor(dataset, dtype=th.float32)
-            id_at_location = UID()
-
-            # Step 2: create message which contains object to send
-            storable = StorableObject(
+    storables = list()
+    for name, (array, columns) in arrays:
+        # Tables are stored as parsed, the tensor of an array shares its
+        # buffer without copying it
+        df = array if isinstance(array, DataFrame) else th.from_numpy(array)
+        id_at_location = UID()
+
+        storables.append(
+            StorableObject(
                 id=id_at_location,
                 data=df,
-                tags=tags + ["#" + item.name.split("/")[-1]],
+                tags=tags + ["#" + name.split("/")[-1]],
+                read_permissions=dict(read_permissions),
                 search_permissions={VERIFYALL: None},
             )
+        )
 
-            obj_msg = SaveObjectAction(obj=storable, address=node.address)
-
-            signed_message = obj_msg.sign(
-                signing_key=SigningKey(user_key.encode("utf-8"), encoder=HexEncoder)
-            )
-
-            node.recv_immediate_msg_without_reply(msg=signed_message)
-
-            obj_dataset_relation = BinObjDataset(
-                name=item.name,
-                dataset=dataset_db.id,
-                obj=str(id_at_location.value),
-                dtype=df.__class__.__name__,
-                shape=str(tuple(df.shape)),
-            )
-            db.session.add(obj_dataset_relation)
-            data.append(
-                {
-                    "name": obj_dataset_relation.name,
-                    "id": str(id_at_location.value),
-                    "tags": tags + ["#" + item.name.split("/")[-1]],
-                    "dtype": obj_dataset_relation.dtype,
-                    "shape": obj_dataset_relation.shape,
-                }
-            )
+        obj_dataset_relation = BinObjDataset(
+            name=name,
+            dataset=dataset_db.id,
+            obj=str(id_at_location.value),
+            dtype=df.__class__.__name__,
+            shape=str(tuple(df.shape)),
+        )
+        db.session.add(obj_dataset_relation)
+        db.session.add_all(_column_rows(str(id_at_location.value), columns))
+        data.append(
+            {
+                "name": obj_dataset_relation.name,
+                "id": str(id_at_location.value),
+                "tags": tags + ["#" + name.split("/")[-1]],
+                "dtype": obj_dataset_relation.dtype,
+                "shape": obj_dataset_relation.shape,
+                "columns": columns,
+            }
+        )
 
+    # Objects and dataset relations land in a single transaction
+    store_objects(node.store, storables)
+    catalog_version.bump()
     db.session.commit()
     ds = model_to_json(dataset_db)
     ds["data"] = data
+    ds["errors"] = errors
     return ds
 
 
+def _parse_inline(
+    file_obj, size: int, columnar: bool = False, bins: int = 0, narrow: bool = False
+) -> Future:
+    # Same interface as a worker result, parsing errors are raised by result()
+    future = Future()
+    try:
+        if columnar:
+            parsed = parse_member(file_obj.read(), columnar=True)
+        else:
+            parsed = read_csv(
+                file_obj, size, dtype=np.float64 if narrow else np.float32
+            )
+        parsed = fit_dtypes(parsed, narrow=narrow)
+        future.set_result((parsed, describe_columns(parsed, bins=bins)))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def _column_rows(obj_id: str, columns: List[dict]) -> List[DatasetColumn]:
+    return [
+        DatasetColumn(obj=obj_id, position=position, **column)
+        for position, column in enumerate(columns)
+    ]
+
+
+def run_upload_job(job: UploadJob, node, file_obj, key) -> None:
+    """Ingest an uploaded archive in the background, reporting progress to
+    an upload job. The file object is closed once it is processed."""
+    job.start()
+    try:
+        tar_obj = decompress(ProgressReader(file_obj, job))
+        job.complete(process_items(node, tar_obj, key, job=job))
+    except Exception as e:
+        db.session.rollback()
+        job.fail(str(e))
+    finally:
+        file_obj.close()
+
+
 def create_df_dataset(node, tarfile, key):
     try:
         tar_obj = decompress(tarfile)
@@ -131,9 +247,8 @@ def create_df_dataset(node, tarfile, key):
         return {"error": str(e)}, 400
 
 
-def create_dataset(df_json: dict) -> dict:
+def create_dataset(df_json: dict, storage: DiskObjectStore) -> dict:
     _json = deepcopy(df_json)
-    storage = DiskObjectStore(db)
     mapping = []
 
     # Separate CSV from metadata
@@ -147,24 +262,42 @@ def create_dataset(df_json: dict) -> dict:
     _json["id"] = str(df_id.value)
 
     # Create storables from UID/CSV. Update metadata
+    columnar = is_columnar_enabled()
+    bins = histogram_bins()
+    narrow = is_narrowing_enabled()
     storables = []
     for idx, (name, _id, raw_file) in enumerate(mapping):
         _tensor = pd.read_csv(StringIO(raw_file))
-        _tensor = th.tensor(_tensor.values.astype(np.float32))
-
-        _json["tensors"][name]["shape"] = [int(x) for x in _tensor.size()]
-        _json["tensors"][name]["dtype"] = "{}".format(_tensor.dtype)
-        storage.__setitem__(_id, StorableObject(id=_id, data=_tensor))
+        # Schema of the file: a type, or types by column (see dtype_schema)
+        dtypes = _json["tensors"][name].get("dtypes", None)
+        if columnar:
+            _tensor.columns = [str(column) for column in _tensor.columns]
+            _tensor = fit_dtypes(_tensor, dtypes, narrow=narrow)
+            columns = describe_columns(_tensor, bins=bins)
+            _json["tensors"][name]["dtype"] = type(_tensor).__name__
+        else:
+            values = fit_dtypes(_tensor.values, dtypes, narrow=narrow)
+            columns = describe_columns(values, bins=bins)
+            _tensor = th.from_numpy(values)
+            _json["tensors"][name]["dtype"] = "{}".format(_tensor.dtype)
+
+        _json["tensors"][name]["shape"] = [int(x) for x in _tensor.shape]
+        _json["tensors"][name]["columns"] = columns
+        db.session.add_all(_column_rows(str(_id.value), columns))
+        storables.append((_id, StorableObject(id=_id, data=_tensor)))
         # Ensure we have same ID in metadata and dataset
         db.session.add(
             DatasetGroup(bin_object=str(_id.value), dataset=str(df_id.value))
         )
 
+    storage.set_many(storables, commit=False)
+
     json_obj = JsonObject(id=_json["id"], binary=_json)
     metadata = get_metadata(db)
     metadata.length += 1
 
     db.session.add(json_obj)
+    catalog_version.bump()
     db.session.commit()
     return _json
 
@@ -180,10 +313,95 @@ def get_all_datasets():
     return list(db.session.query(Dataset).all())
 
 
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def get_datasets_page(
+    limit: Optional[int] = None,
+    offset: int = 0,
+    after: Optional[str] = None,
+    tags: Optional[Sequence[str]] = None,
+) -> List[dict]:
+    """List datasets with their files in a single joined query.
+
+    Datasets are ordered by id. A page is selected by offset, or by cursor:
+    the id of the last dataset of the previous page.
+
+    Args:
+        limit: Number of datasets of the page, all of them by default.
+        offset: Number of datasets skipped.
+        after: Cursor, only datasets with a greater id are listed.
+        tags: Tags every listed dataset has.
+    Returns:
+        datasets: Dataset metadata, with the name, id, dtype and shape of their
+            files under "data".
+    """
+    page = db.session.query(Dataset)
+    if after is not None:
+        page = page.filter(Dataset.id > after)
+    for tag in tags or []:
+        # Tags are stored as a JSON list, matched as JSON encoded strings
+        pattern = f"%{_escape_like(json.dumps(tag))}%"
+        page = page.filter(cast(Dataset.tags, String).like(pattern, escape="\\"))
+    page = page.order_by(Dataset.id).offset(offset or None).limit(limit).subquery()
+
+    dataset = aliased(Dataset, page)
+    rows = (
+        db.session.query(dataset, BinObjDataset)
+        .outerjoin(BinObjDataset, BinObjDataset.dataset == dataset.id)
+        .order_by(dataset.id, BinObjDataset.id)
+        .all()
+    )
+
+    datasets = {}
+    for ds, obj in rows:
+        if ds.id not in datasets:
+            datasets[ds.id] = dict(model_to_json(ds), data=[])
+        if obj is not None:
+            datasets[ds.id]["data"].append(
+                {
+                    "name": obj.name,
+                    "id": obj.obj,
+                    "dtype": obj.dtype,
+                    "shape": obj.shape,
+                }
+            )
+    return list(datasets.values())
+
+
 def get_all_relations(key):
     return list(db.session.query(BinObjDataset).filter_by(dataset=key).all())
 
 
+def get_columns(obj_ids: List[str]) -> Dict[str, List[dict]]:
+    """Columns of dataset files, by object id, read from the column table
+    only."""
+    columns = {_id: [] for _id in obj_ids}
+    for batch in chunks(obj_ids):
+        rows = (
+            db.session.query(DatasetColumn)
+            .filter(DatasetColumn.obj.in_(batch))
+            .order_by(DatasetColumn.obj, DatasetColumn.position)
+            .all()
+        )
+        for row in rows:
+            columns[row.obj].append(
+                {
+                    "name": row.name,
+                    "dtype": row.dtype,
+                    "null_count": row.null_count,
+                    "count": row.count,
+                    "min": row.min,
+                    "max": row.max,
+                    "mean": row.mean,
+                    "std": row.std,
+                    "histogram": row.histogram,
+                }
+            )
+    return columns
+
+
 def get_specific_dataset_and_relations(key):
     ds = db.session.query(Dataset).filter_by(id=key).first()
     objs = get_all_relations(key)
@@ -221,15 +439,23 @@ def update_dataset(key: str, tags: list, manifest: str, description: str):
     elif description:
         db.session.query(Dataset).filter_by(id=key).update({"description": description})
 
+    catalog_version.bump()
     db.session.commit()
 
 
-def delete_dataset(key: str) -> None:
+def delete_dataset(key: str, storage: DiskObjectStore) -> None:
     ds_objs = get_all_relations(key)
-    for ds_obj in ds_objs:
-        db.session.query(BinObject).filter_by(id=ds_obj.obj).delete()
-        db.session.query(ObjectMetadata).filter_by(obj=ds_obj.obj).delete()
-        db.session.delete(ds_obj)
+    storage.delete_many(
+        [UID.from_string(ds_obj.obj) for ds_obj in ds_objs], commit=False
+    )
+    for batch in chunks([ds_obj.obj for ds_obj in ds_objs]):
+        db.session.query(DatasetColumn).filter(DatasetColumn.obj.in_(batch)).delete(
+            synchronize_session=False
+        )
+    db.session.query(BinObjDataset).filter_by(dataset=key).delete(
+        synchronize_session=False
+    )
 
     db.session.query(Dataset).filter_by(id=key).delete()
+    catalog_version.bump()
     db.session.commit()
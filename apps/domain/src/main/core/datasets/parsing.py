@@ -0,0 +1,438 @@
+# stdlib
+from concurrent.futures import ProcessPoolExecutor
+import io
+import json
+import multiprocessing
+import os
+from threading import Lock
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+# third party
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from pandas.api.types import is_numeric_dtype
+
+# Bytes of CSV text parsed at once
+CSV_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Processes parsing dataset files, 0 or 1 (the default) to parse them on the
+# request thread
+DATASET_PARSE_WORKERS = "DATASET_PARSE_WORKERS"
+DEFAULT_PARSE_WORKERS = 1
+
+# Bins of the histogram of each numeric column computed at ingestion, 0 (the
+# default) to skip it
+DATASET_HISTOGRAM_BINS = "DATASET_HISTOGRAM_BINS"
+
+# Types of the parsed dataset files: "float32" (the default) stores every file
+# as float32, "narrow" infers the smallest type holding the values of each file
+# (of each column for columnar storage)
+DATASET_DTYPES = "DATASET_DTYPES"
+DEFAULT_DATASET_DTYPES = "float32"
+NARROW_DTYPES = "narrow"
+
+# Types a dtype schema may ask for, the ones tensors and the raw codec support
+SCHEMA_DTYPES = {
+    "bool",
+    "uint8",
+    "int8",
+    "int16",
+    "int32",
+    "int64",
+    "float16",
+    "float32",
+    "float64",
+}
+INT_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = Lock()
+
+
+def read_csv(
+    file_obj, size: int, dtype: type = np.float32, block_size: int = CSV_BLOCK_SIZE
+) -> np.ndarray:
+    """Parse a numeric CSV file without header into a 2D array.
+
+    The text is read in blocks of whole lines, each one parsed by the
+    vectorized pandas C parser and copied into an array preallocated from the
+    row density of the first block, so neither the whole text nor Python row
+    lists are ever held in memory.
+
+    Args:
+        file_obj: Binary file object of the CSV file.
+        size: Size of the file in bytes, used to preallocate the array.
+        dtype: Type of the array.
+        block_size: Bytes of text parsed at once.
+    Returns:
+        array: Parsed values, of shape (rows, columns).
+    Raises:
+        ValueError: If rows don't have the same number of columns.
+    """
+    array = None
+    rows = 0
+    rest = b""
+    while True:
+        data = file_obj.read(block_size)
+        if data:
+            # Only whole lines are parsed, the last partial one waits for the
+            # next block
+            data = rest + data
+            end = data.rfind(b"\n") + 1
+            block, rest = data[:end], data[end:]
+        else:
+            block, rest = rest, b""
+        if not block.strip():
+            if not data:
+                break
+            continue
+
+        chunk = pd.read_csv(io.BytesIO(block), header=None, dtype=dtype).to_numpy()
+        if array is None:
+            # Rows expected in the whole file, plus some headroom
+            expected = int(len(chunk) * size / len(block) * 1.05) + 1
+            array = np.empty((max(expected, len(chunk)), chunk.shape[1]), dtype=dtype)
+        elif chunk.shape[1] != array.shape[1]:
+            raise ValueError("All the rows of a CSV file should have the same length")
+
+        if rows + len(chunk) > len(array):
+            array.resize(
+                (max(rows + len(chunk), len(array) * 3 // 2), array.shape[1]),
+                refcheck=False,
+            )
+        array[rows : rows + len(chunk)] = chunk
+        rows += len(chunk)
+
+    if array is None:
+        return np.empty(0, dtype=dtype)
+    # Give back the unused headroom
+    array.resize((rows, array.shape[1]), refcheck=False)
+    return array
+
+
+def has_header(line: bytes) -> bool:
+    """Whether the first line of a CSV file names its columns: any of its
+    fields isn't a number (empty fields are missing values)."""
+    for field in line.decode(errors="replace").split(","):
+        field = field.strip().strip('"')
+        if not field:
+            continue
+        try:
+            float(field)
+        except ValueError:
+            return True
+    return False
+
+
+def read_table(data: bytes) -> DataFrame:
+    """Parse a CSV file into a DataFrame, keeping the type pandas infers for
+    each column.
+
+    Args:
+        data: Content of the CSV file, with or without a header.
+    Returns:
+        df: Parsed table. Columns of a file without header are named after
+            their index.
+    """
+    end = data.find(b"\n")
+    first_line = data if end < 0 else data[:end]
+    header = 0 if has_header(first_line) else None
+    df = pd.read_csv(io.BytesIO(data), header=header)
+    df.columns = [str(name) for name in df.columns]
+    return df
+
+
+def parse_member(
+    data: bytes, dtype: type = np.float32, columnar: bool = False
+) -> Union[np.ndarray, DataFrame]:
+    """Parse the content of a CSV dataset file, in a worker process: into a
+    DataFrame for columnar storage, a 2D array otherwise."""
+    if columnar:
+        return read_table(data)
+    return read_csv(io.BytesIO(data), len(data), dtype=dtype)
+
+
+def histogram_bins() -> int:
+    return int(os.getenv(DATASET_HISTOGRAM_BINS, 0))
+
+
+def _finite(value) -> Optional[float]:
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def column_stats(values: np.ndarray, bins: int = 0) -> dict:
+    """Summary statistics of the values of a numeric column, missing (NaN)
+    values left out.
+
+    Args:
+        values: 1D array of the column values.
+        bins: Number of bins of the histogram of the values, 0 for none.
+    Returns:
+        stats: count, min, max, mean, std (population), and histogram (bin
+            edges and counts). Statistics of a column without values are None.
+    """
+    if values.dtype.kind == "f":
+        values = values[~np.isnan(values)]
+    elif values.dtype.kind == "b":
+        values = values.view(np.uint8)
+
+    stats = dict.fromkeys(["min", "max", "mean", "std", "histogram"])
+    stats["count"] = int(len(values))
+    if not len(values):
+        return stats
+
+    stats["min"] = _finite(values.min())
+    stats["max"] = _finite(values.max())
+    # Infinite values make the mean and std undefined
+    with np.errstate(invalid="ignore"):
+        stats["mean"] = _finite(values.mean(dtype=np.float64))
+        stats["std"] = _finite(values.std(dtype=np.float64))
+    if bins > 0:
+        finite = values[np.isfinite(values)] if values.dtype.kind == "f" else values
+        if len(finite):
+            counts, edges = np.histogram(finite, bins=bins)
+            stats["histogram"] = {"edges": edges.tolist(), "counts": counts.tolist()}
+    return stats
+
+
+def describe_columns(data: Union[np.ndarray, DataFrame], bins: int = 0) -> List[dict]:
+    """Name, type, number of missing values and summary statistics of the
+    columns of a parsed dataset file (see `column_stats`). Columns that aren't
+    numeric only get their count of values."""
+    columns = []
+    if isinstance(data, DataFrame):
+        for name, series in data.items():
+            values = series.dropna()
+            if is_numeric_dtype(series):
+                stats = column_stats(values.to_numpy(dtype=np.float64), bins=bins)
+            else:
+                stats = dict.fromkeys(["min", "max", "mean", "std", "histogram"])
+                stats["count"] = int(len(values))
+            columns.append(
+                dict(
+                    name=str(name),
+                    dtype=str(series.dtype),
+                    null_count=int(len(series) - len(values)),
+                    **stats,
+                )
+            )
+        return columns
+
+    array = data
+    if array.ndim != 2:
+        # A file without rows has no columns
+        array = array.reshape(-1, 1) if array.size else array.reshape(0, 0)
+    for i in range(array.shape[1]):
+        stats = column_stats(array[:, i], bins=bins)
+        columns.append(
+            dict(
+                name=str(i),
+                dtype=str(array.dtype),
+                null_count=len(array) - stats["count"],
+                **stats,
+            )
+        )
+    return columns
+
+
+def is_narrowing_enabled() -> bool:
+    return os.getenv(DATASET_DTYPES, DEFAULT_DATASET_DTYPES) == NARROW_DTYPES
+
+
+def narrow_array(array: np.ndarray, float16: bool = True) -> np.ndarray:
+    """Return the values of an array in the smallest type holding them.
+
+    Integral values without missing ones get the smallest integer type of
+    their range. Other values get float16 if it holds them exactly, float32
+    otherwise. Boolean arrays are kept as they are.
+
+    Args:
+        array: Parsed values, usually float64.
+        float16: Whether float16 may be chosen.
+    """
+    if array.dtype.kind == "b":
+        return array
+    if not array.size:
+        return array if array.dtype.kind in "iu" else array.astype(np.float32)
+    if array.dtype.kind in "iu":
+        low, high = array.min(), array.max()
+    else:
+        with np.errstate(invalid="ignore"):
+            integral = np.array_equal(array, np.trunc(array))
+        low, high = (array.min(), array.max()) if integral else (np.nan, np.nan)
+
+    # NaN or infinite bounds fit no integer type
+    if np.isfinite(low) and np.isfinite(high):
+        for dtype in INT_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return array.astype(dtype)
+    if array.dtype.kind != "f":
+        return array
+
+    if float16:
+        with np.errstate(over="ignore"):
+            half = array.astype(np.float16)
+        if np.array_equal(half, array, equal_nan=True):
+            return half
+    return array.astype(np.float32)
+
+
+def cast_array(array: np.ndarray, dtype: str) -> np.ndarray:
+    """Cast the values of an array to a type of a dtype schema.
+
+    Raises:
+        ValueError: If the type isn't supported, or can't hold the values
+            (missing values as integers or booleans, integers out of range).
+    """
+    if dtype not in SCHEMA_DTYPES:
+        raise ValueError(f"Unsupported dtype: {dtype}")
+    dtype = np.dtype(dtype)
+    if array.dtype.kind == "O":
+        raise ValueError(f"Values that aren't numbers can't be stored as {dtype}")
+    if dtype.kind in "biu" and array.dtype.kind == "f" and np.isnan(array).any():
+        raise ValueError(f"Missing values can't be stored as {dtype}")
+    if dtype.kind in "iu" and array.size:
+        info = np.iinfo(dtype)
+        if array.min() < info.min or array.max() > info.max:
+            raise ValueError(f"Values out of the range of {dtype}")
+    return array.astype(dtype)
+
+
+def narrow_dtypes(data: Union[np.ndarray, DataFrame]) -> Union[np.ndarray, DataFrame]:
+    """Narrow a parsed dataset file: a whole array to one type, each numeric
+    column of a DataFrame to its own (never float16, that Parquet files may
+    not hold)."""
+    if not isinstance(data, DataFrame):
+        return narrow_array(data)
+    for name, series in data.items():
+        if is_numeric_dtype(series):
+            data[name] = narrow_array(series.to_numpy(), float16=False)
+    return data
+
+
+def cast_dtypes(
+    data: Union[np.ndarray, DataFrame], dtypes: Union[str, Dict[str, str]]
+) -> Union[np.ndarray, DataFrame]:
+    """Cast a parsed dataset file to the types of a dtype schema.
+
+    Args:
+        data: Parsed dataset file.
+        dtypes: Type of the whole file, or of some columns of a DataFrame by
+            name.
+    Raises:
+        ValueError: If a type can't hold the values (see `cast_array`), or
+            names columns of an array or missing columns.
+    """
+    if not isinstance(data, DataFrame):
+        if not isinstance(dtypes, str):
+            raise ValueError("The columns of a tensor share a single dtype")
+        return cast_array(data, dtypes)
+
+    if isinstance(dtypes, str):
+        dtypes = dict.fromkeys(data.columns, dtypes)
+    for name, dtype in dtypes.items():
+        if name not in data.columns:
+            raise ValueError(f"Unknown column: {name}")
+        data[name] = cast_array(data[name].to_numpy(), dtype)
+    return data
+
+
+def fit_dtypes(
+    data: Union[np.ndarray, DataFrame],
+    dtypes: Union[str, Dict[str, str], None] = None,
+    narrow: bool = False,
+) -> Union[np.ndarray, DataFrame]:
+    """Store a parsed dataset file in the types of its schema if it has one,
+    the narrowest ones if asked, float32 (tensors) or the parsed ones
+    (DataFrames) otherwise."""
+    if dtypes is not None:
+        return cast_dtypes(data, dtypes)
+    if narrow:
+        return narrow_dtypes(data)
+    if not isinstance(data, DataFrame) and data.dtype != np.float32:
+        return data.astype(np.float32)
+    return data
+
+
+def dtype_schema(manifest: str) -> Dict[str, Union[str, Dict[str, str]]]:
+    """Read the dtype schema of a dataset manifest.
+
+    A JSON manifest may hold a "dtypes" entry: a type for all the files, or a
+    mapping from file names to the type of the file, or to the types of its
+    columns by name. "*" names the files left out. Other manifests have no
+    schema.
+
+    Example:
+        {"dtypes": {"labels.csv": "int8", "table.csv": {"age": "int16"}}}
+    Returns:
+        schema: Types by file name.
+    Raises:
+        ValueError: If the "dtypes" entry isn't a type or a mapping.
+    """
+    try:
+        manifest = json.loads(manifest)
+    except ValueError:
+        return {}
+    dtypes = manifest.get("dtypes", {}) if isinstance(manifest, dict) else {}
+    if isinstance(dtypes, str):
+        return {"*": dtypes}
+    if not isinstance(dtypes, dict):
+        raise ValueError("The dtypes of a manifest should be a type or a mapping")
+    return dtypes
+
+
+def schema_dtypes(
+    schema: Dict[str, Union[str, Dict[str, str]]], name: str
+) -> Union[str, Dict[str, str], None]:
+    """Types of a dataset file in a dtype schema, by name or base name."""
+    for key in (name, name.split("/")[-1], "*"):
+        if key in schema:
+            return schema[key]
+    return None
+
+
+def ingest_member(
+    data: bytes, columnar: bool = False, bins: int = 0, narrow: bool = False
+) -> Tuple[Union[np.ndarray, DataFrame], List[dict]]:
+    """Parse a dataset file, narrow its types if asked and describe its
+    columns, in a worker process.
+
+    Narrowed values are parsed as float64 first, so integers past the
+    precision of float32 keep their value.
+    """
+    parsed = parse_member(
+        data, dtype=np.float64 if narrow else np.float32, columnar=columnar
+    )
+    parsed = fit_dtypes(parsed, narrow=narrow)
+    return parsed, describe_columns(parsed, bins=bins)
+
+
+def parse_workers() -> int:
+    return int(os.getenv(DATASET_PARSE_WORKERS, DEFAULT_PARSE_WORKERS))
+
+
+def get_parse_executor() -> Optional[ProcessPoolExecutor]:
+    """Return the process pool parsing dataset files, None if they are parsed
+    on the calling thread (DATASET_PARSE_WORKERS <= 1).
+
+    Workers are spawned rather than forked: the node runs threads (write-behind
+    flusher, executor) that a forked child would inherit in an unknown state.
+    """
+    global _executor
+    workers = parse_workers()
+    if workers <= 1:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
@@ -0,0 +1,175 @@
+# stdlib
+import json
+import os
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+# third party
+import numpy as np
+from pandas import DataFrame
+from syft.core.common.uid import UID
+import torch as th
+
+# grid relative
+from ..database import db
+from ..database.dataset.datasetgroup import BinObjDataset
+from ..exceptions import DatasetNotFoundError
+from .dataset_ops import get_columns
+
+# Most rows returned by a single slice of a dataset file
+DATASET_SLICE_MAX_ROWS = "DATASET_SLICE_MAX_ROWS"
+DEFAULT_SLICE_MAX_ROWS = 10000
+
+
+def slice_max_rows() -> int:
+    return int(os.getenv(DATASET_SLICE_MAX_ROWS, DEFAULT_SLICE_MAX_ROWS))
+
+
+def parse_shape(shape: Optional[str]) -> Optional[Tuple[int, ...]]:
+    """Shape of a dataset file, recorded as the string of a tuple, e.g.
+    "(100, 3)". None if it wasn't recorded."""
+    try:
+        return tuple(int(size) for size in shape.strip("()").split(",") if size)
+    except (AttributeError, ValueError):
+        return None
+
+
+def row_range(
+    rows: Optional[Sequence[Optional[int]]], num_rows: Optional[int]
+) -> Tuple[int, int]:
+    """Normalize a requested [start, stop) range of rows like a Python slice:
+    negative positions count from the end, and ranges are clipped to the file
+    and to DATASET_SLICE_MAX_ROWS rows.
+
+    Args:
+        rows: [start, stop) range, None for the first rows of the file.
+        num_rows: Number of rows of the file, None if it isn't known.
+    Returns:
+        rows: (start, stop) range, with 0 <= start <= stop.
+    Raises:
+        ValueError: If the number of rows isn't known and the range is
+            negative or inverted.
+    """
+    start, stop = rows if rows is not None else (None, None)
+    if num_rows is not None:
+        start, stop, _ = slice(start, stop).indices(num_rows)
+        stop = max(start, stop)
+    else:
+        start = start or 0
+        if start < 0 or (stop is not None and stop < start):
+            raise ValueError(f"Invalid row range: {start}:{stop}")
+
+    max_stop = start + slice_max_rows()
+    return start, max_stop if stop is None else min(stop, max_stop)
+
+
+def select_columns(
+    columns: Sequence[Union[str, int]], names: List[str], by_name: bool
+) -> List[Union[str, int]]:
+    """Resolve requested columns, given by name or position, into the names
+    (tables) or positions (tensors) the store reads.
+
+    Args:
+        columns: Requested columns.
+        names: Names of the columns of the file, in order. Tensor columns are
+            named after their position.
+        by_name: Whether the file is a table.
+    Returns:
+        selected: Column names or positions, in the requested order.
+    Raises:
+        ValueError: If a column isn't part of the file.
+    """
+    if not names:
+        # File whose columns weren't recorded, the store checks them
+        return [str(column) if by_name else int(column) for column in columns]
+
+    selected = []
+    for column in columns:
+        if str(column) in names:
+            position = names.index(str(column))
+        elif str(column).isdigit() and int(column) < len(names):
+            position = int(column)
+        else:
+            raise ValueError(f"Unknown column: {column}")
+        selected.append(names[position] if by_name else position)
+    return selected
+
+
+def to_json_rows(window: Union[DataFrame, th.Tensor, np.ndarray]) -> list:
+    """Values of a slice as nested lists, missing values as None."""
+    if isinstance(window, DataFrame):
+        return json.loads(window.to_json(orient="values", date_format="iso"))
+
+    array = window.numpy() if isinstance(window, th.Tensor) else window
+    if np.issubdtype(array.dtype, np.floating):
+        missing = np.isnan(array)
+        if missing.any():
+            array = np.where(missing, None, array)
+    return array.tolist()
+
+
+def get_member_slice(
+    storage,
+    dataset_id: str,
+    member_id: str,
+    rows: Optional[Sequence[Optional[int]]] = None,
+    columns: Optional[Sequence[Union[str, int]]] = None,
+) -> dict:
+    """Read a window of rows and columns of a dataset file.
+
+    The window is read through `read_slice`, so tables stored as Parquet and
+    raw tensors are never loaded whole.
+
+    Args:
+        storage: Object store holding the file.
+        dataset_id: Dataset of the file.
+        member_id: Object id of the file.
+        rows: [start, stop) range of rows, normalized by `row_range`.
+        columns: Names or positions of the columns, all of them by default.
+    Returns:
+        window: Rows, columns, shape and values of the window.
+    Raises:
+        DatasetNotFoundError: If the file isn't part of the dataset.
+        ValueError: If the window is invalid.
+    """
+    relation = (
+        db.session.query(BinObjDataset)
+        .filter_by(dataset=dataset_id, obj=member_id)
+        .first()
+    )
+    if relation is None:
+        raise DatasetNotFoundError
+
+    shape = parse_shape(relation.shape)
+    start, stop = row_range(rows, shape[0] if shape else None)
+
+    is_table = relation.dtype == DataFrame.__name__
+    if columns and not is_table and shape is not None and len(shape) < 2:
+        raise ValueError("Columns can't be selected from a 1-D file")
+    names = [column["name"] for column in get_columns([member_id])[member_id]]
+    selected = None
+    if columns:
+        selected = select_columns(columns, names, by_name=is_table)
+
+    window = storage.read_slice(
+        UID.from_string(member_id), rows=(start, stop), columns=selected
+    )
+
+    if is_table:
+        column_names = [str(name) for name in window.columns]
+    elif selected is not None:
+        column_names = [str(position) for position in selected]
+    else:
+        column_names = names
+    return {
+        "id": member_id,
+        "name": relation.name,
+        "dtype": relation.dtype,
+        "rows": [start, start + len(window)],
+        "columns": column_names,
+        "shape": [int(size) for size in window.shape],
+        "data": to_json_rows(window),
+    }
@@ -0,0 +1,230 @@
+# stdlib
+import logging
+import os
+from threading import Lock
+import time
+from typing import Dict
+from typing import Optional
+import uuid
+
+# third party
+from sqlalchemy.exc import SQLAlchemyError
+
+# grid relative
+from ..database.dataset.datasetgroup import DatasetUploadJob
+
+# Seconds a finished upload job stays queryable
+UPLOAD_JOB_TTL = "UPLOAD_JOB_TTL"
+DEFAULT_UPLOAD_JOB_TTL = 3600
+
+# Most seconds between two saves of the progress of a running job
+SAVE_INTERVAL = 1.0
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Columns of DatasetUploadJob saved from the job attributes of the same name
+RECORD_FIELDS = [
+    "user_id",
+    "status",
+    "bytes_total",
+    "bytes_processed",
+    "members_done",
+    "members_failed",
+    "created_at",
+    "started_at",
+    "finished_at",
+    "result",
+    "error",
+]
+
+
+class UploadJob:
+    """Progress of a dataset upload processed in the background.
+
+    Every change of status is saved to the database when one is given, and
+    the progress of a running job at most every SAVE_INTERVAL seconds.
+
+    Args:
+        user_id: Uploader, the only user besides the owner allowed to read the
+            job status.
+        bytes_total: Size of the uploaded archive.
+        db: Database the job state is saved to, if any.
+    """
+
+    def __init__(self, user_id: int, bytes_total: int, db=None) -> None:
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.status = PENDING
+        self.bytes_total = bytes_total
+        self.bytes_processed = 0
+        self.members_done = 0
+        self.members_failed = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.db = db
+        self._saved_at = 0.0
+        self._lock = Lock()
+
+    @classmethod
+    def from_record(cls, record: DatasetUploadJob) -> "UploadJob":
+        """Snapshot of a job saved by a node process."""
+        job = cls(user_id=record.user_id, bytes_total=record.bytes_total)
+        job.id = record.id
+        for name in RECORD_FIELDS:
+            setattr(job, name, getattr(record, name))
+        return job
+
+    def start(self) -> None:
+        with self._lock:
+            self.status = RUNNING
+            self.started_at = time.time()
+        self.save()
+
+    def add_bytes(self, n: int) -> None:
+        with self._lock:
+            self.bytes_processed += n
+            due = time.monotonic() - self._saved_at >= SAVE_INTERVAL
+        if due:
+            self.save()
+
+    def member_done(self, failed: bool = False) -> None:
+        with self._lock:
+            if failed:
+                self.members_failed += 1
+            else:
+                self.members_done += 1
+
+    def complete(self, result: dict) -> None:
+        with self._lock:
+            self.status = COMPLETED
+            self.result = result
+            self.finished_at = time.time()
+        self.save()
+
+    def fail(self, error: str) -> None:
+        with self._lock:
+            self.status = FAILED
+            self.error = error
+            self.finished_at = time.time()
+        self.save()
+
+    def save(self, insert: bool = False) -> None:
+        """Write the job state to the database, in its own transaction: the
+        session of the job holds the dataset being ingested."""
+        if self.db is None:
+            return
+        with self._lock:
+            values = {name: getattr(self, name) for name in RECORD_FIELDS}
+            self._saved_at = time.monotonic()
+
+        table = DatasetUploadJob.__table__
+        if insert:
+            statement = table.insert().values(id=self.id, **values)
+        else:
+            statement = table.update().where(table.c.id == self.id).values(**values)
+        try:
+            with self.db.engine.begin() as conn:
+                conn.execute(statement)
+        except SQLAlchemyError as e:
+            # Progress reports must not fail the upload
+            logging.error(f"Upload job {self.id} couldn't be saved: {e}")
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            elapsed = None
+            if self.started_at is not None:
+                elapsed = (self.finished_at or time.time()) - self.started_at
+            return {
+                "id": self.id,
+                "status": self.status,
+                "bytes_total": self.bytes_total,
+                "bytes_processed": self.bytes_processed,
+                "members_done": self.members_done,
+                "members_failed": self.members_failed,
+                "elapsed": elapsed,
+                # Bytes of the uploaded archive processed per second
+                "throughput": self.bytes_processed / elapsed if elapsed else None,
+                "dataset": self.result,
+                "error": self.error,
+            }
+
+
+class ProgressReader:
+    """File object wrapper counting the bytes read into an upload job."""
+
+    def __init__(self, file_obj, job: UploadJob) -> None:
+        self.file_obj = file_obj
+        self.job = job
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.file_obj.read(size)
+        self.job.add_bytes(len(data))
+        return data
+
+
+class UploadJobs:
+    """Upload jobs of the node.
+
+    Jobs run in the process that received the upload, which serves their
+    live progress from memory. With a database, their state is also saved
+    there, so every process of the node (and a restarted node) can report
+    it. Finished jobs expire after `ttl` seconds.
+
+    Args:
+        db: Database the jobs are saved to, none to keep them in memory.
+        ttl: Seconds a finished job stays queryable, UPLOAD_JOB_TTL by default.
+    """
+
+    def __init__(self, db=None, ttl: Optional[float] = None) -> None:
+        if ttl is None:
+            ttl = float(os.getenv(UPLOAD_JOB_TTL, DEFAULT_UPLOAD_JOB_TTL))
+        self.db = db
+        self.ttl = ttl
+        self._jobs: Dict[str, UploadJob] = {}
+        self._lock = Lock()
+
+    def create(self, user_id: int, bytes_total: int) -> UploadJob:
+        job = UploadJob(user_id=user_id, bytes_total=bytes_total, db=self.db)
+        self._expire()
+        job.save(insert=True)
+        with self._lock:
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[UploadJob]:
+        with self._lock:
+            job = self._jobs.get(job_id, None)
+        if job is None and self.db is not None:
+            # Job of another process
+            record = self.db.session.query(DatasetUploadJob).get(job_id)
+            if record is not None and not self._expired(record.finished_at):
+                job = UploadJob.from_record(record)
+        return job
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def _expired(self, finished_at: Optional[float]) -> bool:
+        return finished_at is not None and finished_at < time.time() - self.ttl
+
+    def _expire(self) -> None:
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if self._expired(job.finished_at)
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+        if self.db is not None:
+            table = DatasetUploadJob.__table__
+            deadline = time.time() - self.ttl
+            with self.db.engine.begin() as conn:
+                conn.execute(table.delete().where(table.c.finished_at < deadline))
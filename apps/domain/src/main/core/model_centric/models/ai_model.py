@@ -4,6 +4,8 @@ import syft as sy
 # grid relative
 from ...database import BaseModel
 from ...database import db
+from ...database.bin_storage.compression import compress_payload
+from ...database.bin_storage.compression import decompress
 
 
 class Model(BaseModel):
@@ -34,17 +36,34 @@ class ModelCheckPoint(BaseModel):
 
     Columns:
         id (Integer, Primary Key): Checkpoint ID.
-        value (Binary): Value of the model at a given checkpoint.
+        value (Binary): Value of the model at a given checkpoint, compressed
+            transparently when a compression codec is configured.
         model_id (String, Foreign Key): Model's ID.
+        compression (String): Codec the value is stored with, if any.
+        size (BigInteger): Uncompressed value bytes.
+        stored_size (BigInteger): Stored value bytes.
     """
 
     __tablename__ = "model_centric_model_checkpoint"
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    value = db.Column(db.LargeBinary)
+    _value = db.Column("value", db.LargeBinary)
     number = db.Column(db.Integer)
     alias = db.Column(db.String(255))
     model_id = db.Column(db.Integer, db.ForeignKey("model_centric_model.id"))
+    compression = db.Column(db.String(64))
+    size = db.Column(db.BigInteger())
+    stored_size = db.Column(db.BigInteger())
+
+    @property
+    def value(self) -> bytes:
+        return decompress(self._value, self.compression)
+
+    @value.setter
+    def value(self, data: bytes) -> None:
+        self._value, self.compression = compress_payload(data)
+        self.size = len(data)
+        self.stored_size = len(self._value)
 
     @property
     def object(self):
@@ -7,6 +7,7 @@ from syft.federated.model_serialization import wrap_model_params
 from syft.lib.python.list import List
 
 # grid relative
+from ...database.bin_storage.compression import compression_stats
 from ...exceptions import ModelNotFoundError
 from ...manager.database_manager import DatabaseManager
 from ..models.ai_model import Model
@@ -21,6 +22,10 @@ class ModelCheckPointManager(DatabaseManager):
         self._schema = ModelCheckPointManager.schema
         self.db = database
 
+    def compression_stats(self):
+        """Stored vs logical checkpoint bytes, per compression codec."""
+        return compression_stats(self.db.session, self._schema)
+
 
 class _ModelManager(DatabaseManager):
 
@@ -1,3 +1,6 @@
+# stdlib
+import os
+
 # third party
 from flask_sockets import Sockets
 from main import ws
@@ -39,6 +42,18 @@ def create_worker_app(app, args):
     global node
     node = GridWorker(name=args.name, domain_url=args.domain_address)
 
+    if hasattr(node, "disk_store"):
+        # grid relative
+        from .database import db
+        from .database import set_database_config
+        from .database.schema import upgrade_schema
+
+        # The memory tier spills objects to the database (or its shards)
+        set_database_config(app)
+        app.app_context().push()
+        db.create_all()
+        upgrade_schema(db.engine)
+
     app.config["EXECUTOR_PROPAGATE_EXCEPTIONS"] = True
     app.config["EXECUTOR_TYPE"] = "thread"
     executor.init_app(app)
@@ -69,6 +84,7 @@ def create_network_app(app, args, testing=False):
     from .database import db
     from .database import seed_db
     from .database import set_database_config
+    from .database.schema import upgrade_schema
 
     global node
     node = GridNetwork(name=args.name)
@@ -78,6 +94,7 @@ def create_network_app(app, args, testing=False):
     s = app.app_context().push()
 
     db.create_all()
+    upgrade_schema(db.engine)
 
     if not testing:
         if len(db.session.query(Role).all()) == 0:
@@ -134,6 +151,9 @@ def create_domain_app(app, args, testing=False):
     from .database import db
     from .database import seed_db
     from .database import set_database_config
+    from .database.schema import upgrade_schema
+    from .database.store_gc import STORE_GC_INTERVAL
+    from .database.store_gc import schedule_garbage_collection
 
     global node
     node = GridDomain(name=args.name)
@@ -142,6 +162,7 @@ def create_domain_app(app, args, testing=False):
     set_database_config(app, test_config=test_config)
     app.app_context().push()
     db.create_all()
+    upgrade_schema(db.engine)
 
     if not testing:
         if len(db.session.query(Role).all()) == 0:
@@ -163,6 +184,18 @@ def create_domain_app(app, args, testing=False):
         # Register global middlewares
         # Always after context is pushed
         app.wsgi_app = SleepyUntilConfigured(app, app.wsgi_app)
+
+        # Periodic removal of orphaned objects and payloads. Dataset objects
+        # of MEMORY_STORE nodes aren't in the disk store, their rows are kept.
+        gc_interval = float(os.getenv(STORE_GC_INTERVAL, 0))
+        if gc_interval > 0:
+            schedule_garbage_collection(
+                app,
+                db,
+                node.disk_store,
+                gc_interval,
+                datasets=node.store is node.disk_store,
+            )
     db.session.commit()
 
     app.config["EXECUTOR_PROPAGATE_EXCEPTIONS"] = True
@@ -1,4 +1,5 @@
 # stdlib
+import atexit
 import os
 from threading import Thread
 from time import sleep
@@ -51,7 +52,13 @@ import tenseal as ts
 
 # grid relative
 from ..database import db
-from ..database.store_disk import DiskObjectStore
+from ..database.store_sharded import STORE_SHARDS
+from ..database.store_sharded import get_shard_binds
+from ..database.store_tiered import STORE_MEMORY_SIZE
+from ..database.store_tiered import STORE_WRITE_THROUGH
+from ..database.store_tiered import create_object_store
+from ..datasets.chunked_uploads import ChunkedUploads
+from ..datasets.upload_jobs import UploadJobs
 from ..manager.association_request_manager import AssociationRequestManager
 from ..manager.environment_manager import EnvironmentManager
 from ..manager.group_manager import GroupManager
@@ -75,6 +82,73 @@ sy.load("tenseal")
 sy.load("sympc")
 sy.load("pydp")
 
+# Byte budget of the deserialized objects cache, 0 to disable it
+STORE_CACHE_SIZE = "STORE_CACHE_SIZE"
+# Max queued writes, 0 to commit them synchronously
+STORE_WRITE_BEHIND = "STORE_WRITE_BEHIND"
+# Writes committed per transaction, and seconds between commits, of the queue
+STORE_FLUSH_BATCH = "STORE_FLUSH_BATCH"
+STORE_FLUSH_INTERVAL = "STORE_FLUSH_INTERVAL"
+
+
+def store_config(
+    memory_size: Optional[int] = None, write_through: Optional[bool] = None
+) -> Dict[str, Any]:
+    """Object store settings of a domain, read from the environment.
+
+    Stores are built from a disk store (STORE_SHARDS spreads it over several
+    databases) and optional layers. Supported combinations:
+
+        ====== =========== ============= ===== ============
+        shards memory tier write-through cache write-behind
+        ====== =========== ============= ===== ============
+        no     no          no            opt.  opt.
+        no     yes         opt.          no    opt.
+        yes    no          no            opt.  opt.
+        ====== =========== ============= ===== ============
+
+    The memory tier (STORE_MEMORY_SIZE) fronts a single database and replaces
+    the objects cache (STORE_CACHE_SIZE). Write-through (STORE_WRITE_THROUGH)
+    is a mode of the memory tier. A sharded store gives each shard its own
+    cache and write-behind queue (STORE_WRITE_BEHIND).
+
+    Args:
+        memory_size: Byte budget of the memory tier, STORE_MEMORY_SIZE by
+            default.
+        write_through: Write-through memory tier, STORE_WRITE_THROUGH by
+            default.
+    Returns:
+        config: create_object_store arguments.
+    Raises:
+        ValueError: If the settings aren't one of the supported combinations.
+    """
+    if memory_size is None:
+        memory_size = int(os.getenv(STORE_MEMORY_SIZE, 0))
+    if write_through is None:
+        write_through = os.getenv(STORE_WRITE_THROUGH, "").lower() in ("1", "true")
+    cache_size = int(os.getenv(STORE_CACHE_SIZE, 0))
+
+    if get_shard_binds() and memory_size > 0:
+        raise ValueError(
+            f"{STORE_MEMORY_SIZE} can't be used with a sharded store ({STORE_SHARDS})"
+        )
+    if write_through and memory_size <= 0:
+        raise ValueError(f"{STORE_WRITE_THROUGH} requires {STORE_MEMORY_SIZE}")
+    if memory_size > 0 and cache_size > 0:
+        raise ValueError(
+            f"{STORE_CACHE_SIZE} can't be used with {STORE_MEMORY_SIZE}, the "
+            "memory tier replaces the objects cache"
+        )
+
+    return {
+        "memory_size": memory_size,
+        "write_through": write_through,
+        "cache_size": cache_size,
+        "write_behind": int(os.getenv(STORE_WRITE_BEHIND, 0)),
+        "flush_batch": int(os.getenv(STORE_FLUSH_BATCH, 100)),
+        "flush_interval": float(os.getenv(STORE_FLUSH_INTERVAL, 0.05)),
+    }
+
 
 class GridDomain(Domain):
     def __init__(
@@ -88,6 +162,8 @@ class GridDomain(Domain):
         verify_key: Optional[VerifyKey] = None,
         root_key: Optional[VerifyKey] = None,
         db_path: Optional[str] = None,
+        store_memory_size: Optional[int] = None,
+        store_write_through: Optional[bool] = None,
     ):
         super().__init__(
             name=name,
@@ -104,13 +180,24 @@ class GridDomain(Domain):
         self.users = UserManager(db)
         self.roles = RoleManager(db)
         self.groups = GroupManager(db)
-        self.disk_store = DiskObjectStore(db)
+        # Layers of the object store, see store_config
+        self.disk_store = create_object_store(
+            db,
+            **store_config(
+                memory_size=store_memory_size, write_through=store_write_through
+            ),
+        )
+        # Queued writes are committed before the process exits
+        atexit.register(self.disk_store.close)
         if not os.getenv("MEMORY_STORE", None):
-            self.store = DiskObjectStore(db)
+            # Share the instance so both handles see the same cache
+            self.store = self.disk_store
         self.environments = EnvironmentManager(db)
         self.setup = SetupManager(db)
         self.association_requests = AssociationRequestManager(db)
         self.data_requests = RequestManager(db)
+        self.upload_jobs = UploadJobs(db)
+        self.chunked_uploads = ChunkedUploads()
 
         self.env_clients = {}
         self.setup_configs = {}
@@ -1,4 +1,6 @@
 # stdlib
+import atexit
+import os
 from threading import Thread
 from time import sleep
 from typing import Dict
@@ -28,7 +30,8 @@ import tenseal as ts
 
 # grid relative
 from ..database import db
-from ..database.store_disk import DiskObjectStore
+from ..database.store_tiered import STORE_MEMORY_SIZE
+from ..database.store_tiered import create_object_store
 from ..manager.association_request_manager import AssociationRequestManager
 from ..manager.environment_manager import EnvironmentManager
 from ..manager.group_manager import GroupManager
@@ -62,6 +65,8 @@ class GridWorker(Domain):
         verify_key: Optional[VerifyKey] = None,
         root_key: Optional[VerifyKey] = None,
         db_path: Optional[str] = None,
+        store_memory_size: Optional[int] = None,
+        store_write_through: Optional[bool] = None,
     ):
         super().__init__(
             name=name,
@@ -79,6 +84,18 @@ class GridWorker(Domain):
             conn_type=GridHTTPConnection,  # HTTP Connection Protocol
             client_type=DomainClient,
         )
+        # Workers keep the in-memory syft store unless a memory tier budget is
+        # given (store_memory_size / STORE_MEMORY_SIZE), in which case objects
+        # spill to the database once the budget is exceeded
+        if store_memory_size is None:
+            store_memory_size = int(os.getenv(STORE_MEMORY_SIZE, 0))
+        if store_memory_size > 0:
+            self.disk_store = create_object_store(
+                db, memory_size=store_memory_size, write_through=store_write_through
+            )
+            atexit.register(self.disk_store.close)
+            self.store = self.disk_store
+
         self.immediate_services_with_reply.append(TransferObjectService)
         self.immediate_services_without_reply.append(SaveObjectService)
 
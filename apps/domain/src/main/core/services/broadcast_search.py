@@ -1,7 +1,12 @@
 # stdlib
 from datetime import datetime
+import json
+import logging
+import os
 import secrets
+from typing import Dict
 from typing import List
+from typing import Optional
 from typing import Type
 from typing import Union
 
@@ -9,6 +14,7 @@ from typing import Union
 from nacl.encoding import HexEncoder
 from nacl.signing import SigningKey
 from nacl.signing import VerifyKey
+import requests
 from syft.core.common.message import ImmediateSyftMessageWithReply
 
 # syft relative
@@ -27,6 +33,19 @@ from ..exceptions import AuthorizationError
 from ..exceptions import InvalidParameterValueError
 from ..exceptions import MissingRequestKeyError
 
+# Seconds an associated domain has to answer a tag search
+BROADCAST_SEARCH_TIMEOUT = "BROADCAST_SEARCH_TIMEOUT"
+DEFAULT_BROADCAST_SEARCH_TIMEOUT = 5.0
+# JSON object of the accounts the network searches associated domains with,
+# by domain address: {"http://domain:5000": {"email": ..., "password": ...}}
+DOMAIN_CREDENTIALS = "DOMAIN_CREDENTIALS"
+
+
+def domain_credentials(url: str) -> Optional[Dict[str, str]]:
+    """Email and password of the account of the network on a domain."""
+    credentials = json.loads(os.getenv(DOMAIN_CREDENTIALS, "") or "{}")
+    return credentials.get(url.rstrip("/"), None) or credentials.get(url, None)
+
 
 class BroadcastSearchService(ImmediateNodeServiceWithReply):
     @staticmethod
@@ -38,11 +57,48 @@ class BroadcastSearchService(ImmediateNodeServiceWithReply):
     ) -> NetworkSearchResponse:
         queries = set(msg.content.get("query", []))
         associations = node.association_requests.associations()
+        timeout = float(
+            os.getenv(BROADCAST_SEARCH_TIMEOUT, DEFAULT_BROADCAST_SEARCH_TIMEOUT)
+        )
 
         def filter_domains(url):
+            # Domains only list the objects an account can search
+            credentials = domain_credentials(url)
+            if credentials is None:
+                logging.warning(f"No credentials for domain {url}, not searched")
+                return False
+
+            # Ask the domain's tag index first, a single indexed query there
+            if queries:
+                try:
+                    login = requests.post(
+                        url.rstrip("/") + "/users/login",
+                        json=credentials,
+                        timeout=timeout,
+                    )
+                    login.raise_for_status()
+                    response = requests.get(
+                        url.rstrip("/") + "/data-centric/objects/search",
+                        params={"tags": list(queries), "match": "all"},
+                        headers={"token": login.json()["token"]},
+                        timeout=timeout,
+                    )
+                    response.raise_for_status()
+                    return len(response.json()["objects"]) > 0
+                except requests.Timeout as e:
+                    # An unresponsive domain isn't scanned either
+                    logging.warning(f"Search of domain {url} timed out: {e}")
+                    return False
+                except (requests.RequestException, KeyError, ValueError) as e:
+                    logging.warning(
+                        f"Tag search of domain {url} failed, scanning its store: {e}"
+                    )
+
+            # Domains without the search route: scan their store
             domain = connect(
                 url=url,  # Domain Address
                 conn_type=GridHTTPConnection,  # HTTP Connection Protocol
+                credentials=credentials,
             )
 
             for data in domain.store:
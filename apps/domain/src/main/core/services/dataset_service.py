@@ -37,15 +37,17 @@ from ..database import expand_user_object
 from ..database.utils import model_to_json
 from ..datasets.dataset_ops import create_dataset
 from ..datasets.dataset_ops import delete_dataset
-from ..datasets.dataset_ops import get_all_datasets
 from ..datasets.dataset_ops import get_all_datasets_metadata
-from ..datasets.dataset_ops import get_all_relations
+from ..datasets.dataset_ops import get_columns
 from ..datasets.dataset_ops import get_dataset_metadata
+from ..datasets.dataset_ops import get_datasets_page
 from ..datasets.dataset_ops import get_specific_dataset_and_relations
 from ..datasets.dataset_ops import update_dataset
+from ..datasets.slicing import get_member_slice
 from ..exceptions import AuthorizationError
 from ..exceptions import DatasetNotFoundError
 from ..exceptions import MissingRequestKeyError
+from ..exceptions import PyGridError
 from ..exceptions import RoleNotFoundError
 from ..exceptions import UserNotFoundError
 
@@ -66,7 +68,7 @@ def create_dataset_msg(
     if _allowed:
         _dataset = msg.content.get("dataset", None)
         storage = node.disk_store
-        _json = create_dataset(_dataset)
+        _json = create_dataset(_dataset, storage=storage)
     else:
         raise AuthorizationError("You're not allowed to upload data!")
 
@@ -82,6 +84,10 @@ def get_dataset_metadata_msg(
     node: AbstractNode,
     verify_key: VerifyKey,
 ) -> GetDatasetResponse:
+    # A window of one of the dataset files is requested with the same message
+    if msg.content.get("member_id", None) is not None:
+        return get_dataset_slice_msg(msg=msg, node=node, verify_key=verify_key)
+
     # Get Payload Content
     _dataset_id = msg.content.get("dataset_id", None)
     _current_user_id = msg.content.get("current_user", None)
@@ -98,8 +104,15 @@ def get_dataset_metadata_msg(
     if not ds:
         raise DatasetNotFoundError
     dataset_json = model_to_json(ds)
+    columns = get_columns([obj.obj for obj in objs])
     dataset_json["data"] = [
-        {"name": obj.name, "id": obj.obj, "dtype": obj.dtype, "shape": obj.shape}
+        {
+            "name": obj.name,
+            "id": obj.obj,
+            "dtype": obj.dtype,
+            "shape": obj.shape,
+            "columns": columns[obj.obj],
+        }
         for obj in objs
     ]
 
@@ -110,6 +123,45 @@ def get_dataset_metadata_msg(
     )
 
 
+def get_dataset_slice_msg(
+    msg: GetDatasetMessage,
+    node: AbstractNode,
+    verify_key: VerifyKey,
+) -> GetDatasetResponse:
+    # Get Payload Content
+    _dataset_id = msg.content.get("dataset_id", None)
+    _member_id = msg.content.get("member_id", None)
+    _rows = msg.content.get("rows", None)
+    _columns = msg.content.get("columns", None)
+    _current_user_id = msg.content.get("current_user", None)
+    users = node.users
+    if not _current_user_id:
+        _current_user_id = users.first(
+            verify_key=verify_key.encode(encoder=HexEncoder).decode("utf-8")
+        ).id
+
+    # Data uploaders read every file, other users the ones they were granted
+    storage = node.disk_store
+    _allowed = users.can_upload_data(
+        user_id=_current_user_id
+    ) or storage.has_permission(UID.from_string(_member_id), verify_key)
+    if not _allowed:
+        raise AuthorizationError("You're not allowed to read this dataset file!")
+
+    try:
+        _window = get_member_slice(
+            storage, _dataset_id, _member_id, rows=_rows, columns=_columns
+        )
+    except ValueError as e:
+        raise PyGridError(str(e))
+
+    return GetDatasetResponse(
+        address=msg.reply_to,
+        status_code=200,
+        content=_window,
+    )
+
+
 def get_all_datasets_metadata_msg(
     msg: GetDatasetsMessage,
     node: AbstractNode,
@@ -126,21 +178,13 @@ def get_all_datasets_metadata_msg(
 
     _msg = {}
 
-    storage = node.disk_store
-    datasets = []
-    for dataset in get_all_datasets():
-        ds = model_to_json(dataset)
-        objs = get_all_relations(dataset.id)
-        ds["data"] = [
-            {
-                "name": obj.name,
-                "id": obj.obj,
-                "dtype": obj.dtype,
-                "shape": obj.shape,
-            }
-            for obj in objs
-        ]
-        datasets.append(ds)
+    # Every dataset unless a page is requested
+    datasets = get_datasets_page(
+        limit=msg.content.get("limit", None),
+        offset=msg.content.get("offset", 0),
+        after=msg.content.get("after", None),
+        tags=msg.content.get("tags", None),
+    )
 
     return GetDatasetsResponse(
         address=msg.reply_to,
@@ -202,7 +246,7 @@ def delete_dataset_msg(
 
     if _allowed:
         storage = node.disk_store
-        delete_dataset(_dataset_id)
+        delete_dataset(_dataset_id, storage=storage)
     else:
         raise AuthorizationError("You're not allowed to upload data!")
 
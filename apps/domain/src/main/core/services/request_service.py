@@ -58,6 +58,21 @@ from ..exceptions import MissingRequestKeyError
 from ..exceptions import RequestError
 
 
+def grant_read_permission(node: AbstractNode, request) -> None:
+    """Give the requester read access to the requested object."""
+    key = UID.from_string(request.object_id)
+
+    if hasattr(node.store, "grant_permission"):
+        # Only a permission row is added, the object itself isn't rewritten
+        node.store.grant_permission(key, request.verify_key, request_id=request.id)
+    else:
+        tmp_obj = node.store[key]
+        tmp_obj.read_permissions[
+            VerifyKey(request.verify_key.encode("utf-8"), encoder=HexEncoder)
+        ] = request.id
+        node.store[key] = tmp_obj
+
+
 def create_request_msg(
     msg: CreateRequestMessage,
     node: AbstractNode,
@@ -237,11 +252,7 @@ def update_request_msg(
     _req_owner = _current_user_key == _req.verify_key
 
     if status == "accepted" and _can_triage_request:
-        tmp_obj = node.store[UID.from_string(_req.object_id)]
-        tmp_obj.read_permissions[
-            VerifyKey(_req.verify_key.encode("utf-8"), encoder=HexEncoder)
-        ] = _req.id
-        node.store[UID.from_string(_req.object_id)] = tmp_obj
+        grant_read_permission(node, _req)
         node.data_requests.set(request_id=_req.id, status=status)
     elif status == "denied" and (_can_triage_request or _req_owner):
         node.data_requests.set(request_id=_req.id, status=status)
@@ -488,11 +499,7 @@ def accept_or_deny_request(
     _can_triage_request = node.users.can_triage_requests(user_id=current_user.id)
     if _msg.accept:
         if _req and _can_triage_request:
-            tmp_obj = node.store[UID.from_string(_req.object_id)]
-            tmp_obj.read_permissions[
-                VerifyKey(_req.verify_key.encode("utf-8"), encoder=HexEncoder)
-            ] = _req.id
-            node.store[UID.from_string(_req.object_id)] = tmp_obj
+            grant_read_permission(node, _req)
             node.data_requests.set(request_id=_req.id, status="accepted")
     else:
         _req_owner = current_user.verify_key == _req.verify_key
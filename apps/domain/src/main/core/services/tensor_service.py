@@ -163,18 +163,34 @@ def get_tensors_msg(
     node: AbstractNode,
 ) -> GetTensorsResponse:
     try:
-        tensors = node.store.get_objects_of_type(obj_type=th.Tensor)
-
         result = []
 
-        for tensor in tensors:
-            result.append(
-                {
-                    "id": str(tensor.id.value),
-                    "tags": tensor.tags,
-                    "description": tensor.description,
-                }
+        if hasattr(node.store, "get_metadata_of_type"):
+            # Answered from the metadata table, no tensor is deserialized
+            page = node.store.get_metadata_of_type(
+                obj_type=th.Tensor,
+                offset=int(msg.content.get("offset", 0)),
+                limit=msg.content.get("limit", None),
             )
+            for metadata in page:
+                result.append(
+                    {
+                        "id": metadata.obj,
+                        "tags": metadata.tags,
+                        "description": metadata.description,
+                    }
+                )
+        else:
+            tensors = node.store.get_objects_of_type(obj_type=th.Tensor)
+
+            for tensor in tensors:
+                result.append(
+                    {
+                        "id": str(tensor.id.value),
+                        "tags": tensor.tags,
+                        "description": tensor.description,
+                    }
+                )
         return GetTensorsResponse(
             address=msg.reply_to,
             status_code=200,
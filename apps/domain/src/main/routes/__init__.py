@@ -3,6 +3,7 @@ from .association_requests.blueprint import association_requests_blueprint
 from .association_requests.routes import *
 from .data_centric.blueprint import dcfl_blueprint
 from .data_centric.datasets.routes import *
+from .data_centric.objects.routes import *
 from .data_centric.requests.routes import *
 from .data_centric.tensors.routes import *
 from .data_centric.workers.routes import *
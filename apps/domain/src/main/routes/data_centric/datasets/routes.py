@@ -1,12 +1,15 @@
 # stdlib
-import io
 from json import dumps
 from json import loads
+import shutil
+import tempfile
 
 # third party
 from flask import Response
 from flask import request
-from main.core.datasets.dataset_ops import create_df_dataset
+from main.core.datasets.chunked_uploads import UploadOffsetError
+from main.core.datasets.dataset_ops import run_upload_job
+from main.core.datasets.upload_jobs import COMPLETED
 from main.core.exceptions import AuthorizationError
 from main.core.task_handler import route_logic
 from main.core.task_handler import task_handler
@@ -20,6 +23,7 @@ from syft.grid.messages.dataset_messages import UpdateDatasetMessage
 from werkzeug.utils import secure_filename
 
 # grid relative
+from ....core.database.dataset.catalog import catalog_version
 from ...auth import error_handler
 from ...auth import optional_token
 from ...auth import token_required
@@ -27,6 +31,13 @@ from ..blueprint import dcfl_blueprint as dcfl_route
 
 ALLOWED_EXTENSIONS = {"tar.gz"}
 
+# Uploads larger than this (in bytes) are spooled to a temporary file
+UPLOAD_SPOOL_SIZE = 16 * 1024 * 1024
+
+# Datasets listed per page when paging without a limit, and at most
+DATASET_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
 
 def allowed_file(filename):
     return "." in filename and filename.x.split(".", 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -35,41 +46,232 @@ def allowed_file(filename):
 @dcfl_route.route("/datasets", methods=["POST"])
 @token_required
 def create_dataset(current_user):
+    """Accept a dataset archive (tar.gz) and ingest it in the background.
+
+    Returns the id of the upload job, whose progress is served by
+    /datasets/jobs/<job_id>. With ?wait=true the archive is ingested before
+    responding, with the dataset metadata as before background uploads.
+    """
     # grid relative
     from ....core.node import get_node  # TODO: fix circular import
 
-    # check if the post request has the file part
-    if "file" not in request.files:
-        response = {
-            "error": "File not found, please submit a compressed file (tar.gz)!"
-        }
-        status_code = 400
+    users = get_node().users
+    if not users.can_upload_data(user_id=current_user.id):
+        response = {"error": "You're not allowed to upload data!"}
+        return Response(dumps(response), status=401, mimetype="application/json")
 
-    file_obj = request.files["file"]
+    # check if the post request has the file part
+    file_obj = request.files.get("file", None)
 
     # if user does not select file, browser also
     # submit an empty part without filename
-    if file_obj.filename == "":
+    if file_obj is None or file_obj.filename == "":
         response = {
-            "error": "File has not been selected, please submit a compressed file (tar.gz)!"
+            "error": "File not found, please submit a compressed file (tar.gz)!"
         }
-        status_code = 400
+        return Response(dumps(response), status=400, mimetype="application/json")
 
-    file_like_object = io.BytesIO(file_obj.stream.read())
+    # The upload outlives the request, it is spooled to disk when it is large
+    upload = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE)
+    shutil.copyfileobj(file_obj.stream, upload)
+    bytes_total = upload.tell()
+    upload.seek(0)
+
+    job = get_node().upload_jobs.create(
+        user_id=current_user.id, bytes_total=bytes_total
+    )
+    return _start_upload_job(current_user, job, upload)
 
-    users = get_node().users
 
-    _allowed = users.can_upload_data(user_id=current_user.id)
+def _start_upload_job(current_user, job, file_obj):
+    """Run an upload job in the background and return its id (202), or run it
+    on the request thread with ?wait=true and return the dataset (200)."""
+    # grid relative
+    from ....core.node import get_node  # TODO: fix circular import
 
-    if _allowed:
-        response, status_code = create_df_dataset(
-            get_node(), file_like_object, current_user.private_key
+    if request.args.get("wait", "false").lower() != "true":
+        executor.submit(
+            run_upload_job, job, get_node(), file_obj, current_user.private_key
         )
-    else:
+        response = {"job_id": job.id, "status": job.status}
+        return Response(dumps(response), status=202, mimetype="application/json")
+
+    run_upload_job(job, get_node(), file_obj, current_user.private_key)
+    if job.status == COMPLETED:
+        return Response(dumps(job.result), status=200, mimetype="application/json")
+    response = {"error": job.error, "job_id": job.id}
+    return Response(dumps(response), status=400, mimetype="application/json")
+
+
+def _get_chunked_upload(current_user, upload_id):
+    """Return an upload in progress and None, or None and the error response
+    if it doesn't exist or belongs to another user."""
+    # grid relative
+    from ....core.node import get_node  # TODO: fix circular import
+
+    upload = get_node().chunked_uploads.get(upload_id)
+    if upload is None:
+        response = {"error": "Upload not found!"}
+        return None, Response(dumps(response), status=404, mimetype="application/json")
+
+    if upload.user_id != current_user.id:
+        response = {"error": str(AuthorizationError())}
+        return None, Response(dumps(response), status=403, mimetype="application/json")
+    return upload, None
+
+
+@dcfl_route.route("/datasets/uploads", methods=["POST"])
+@token_required
+def create_chunked_upload(current_user):
+    """Start a resumable upload of a dataset archive, sent in chunks.
+
+    The body may declare the size of the archive: {"total_size": <bytes>}.
+    Chunks are then sent with PUT /datasets/uploads/<upload_id>, and the
+    archive is ingested by POST /datasets/uploads/<upload_id>/complete.
+    """
+    # grid relative
+    from ....core.node import get_node  # TODO: fix circular import
+
+    users = get_node().users
+    if not users.can_upload_data(user_id=current_user.id):
         response = {"error": "You're not allowed to upload data!"}
-        status_code = 401
+        return Response(dumps(response), status=401, mimetype="application/json")
+
+    total_size = (request.get_json(silent=True) or {}).get("total_size", None)
+    if total_size is not None and (not isinstance(total_size, int) or total_size < 0):
+        response = {"error": "Invalid total_size!"}
+        return Response(dumps(response), status=400, mimetype="application/json")
+
+    upload = get_node().chunked_uploads.create(
+        user_id=current_user.id, total_size=total_size
+    )
+    return Response(dumps(upload.to_dict()), status=201, mimetype="application/json")
+
+
+@dcfl_route.route("/datasets/uploads/<upload_id>", methods=["GET"])
+@token_required
+def get_chunked_upload(current_user, upload_id):
+    """Offset where an interrupted upload resumes."""
+    upload, error = _get_chunked_upload(current_user, upload_id)
+    if error is not None:
+        return error
+    return Response(dumps(upload.to_dict()), status=200, mimetype="application/json")
+
+
+@dcfl_route.route("/datasets/uploads/<upload_id>", methods=["PUT"])
+@token_required
+def put_upload_chunk(current_user, upload_id):
+    """Append the request body to an upload.
+
+    Headers:
+        Upload-Offset: Position of the chunk, the current offset of the upload.
+        Upload-Checksum: Optional "<algorithm> <hex digest>" of the chunk.
+
+    The body is streamed to disk. A chunk that doesn't start at the current
+    offset gets a 409 with that offset, a corrupted one is dropped.
+    """
+    # grid relative
+    from ....core.node import get_node  # TODO: fix circular import
+
+    upload, error = _get_chunked_upload(current_user, upload_id)
+    if error is not None:
+        return error
+
+    try:
+        offset = int(request.headers["Upload-Offset"])
+    except (KeyError, ValueError):
+        response = {"error": "Missing or invalid Upload-Offset header!"}
+        return Response(dumps(response), status=400, mimetype="application/json")
+
+    try:
+        offset = get_node().chunked_uploads.write_chunk(
+            upload,
+            offset,
+            request.stream,
+            checksum=request.headers.get("Upload-Checksum", None),
+        )
+    except UploadOffsetError as e:
+        response = {"error": str(e), "offset": e.offset}
+        return Response(dumps(response), status=409, mimetype="application/json")
+    except ValueError as e:
+        response = {"error": str(e), "offset": upload.offset}
+        return Response(dumps(response), status=400, mimetype="application/json")
+
+    response = {"id": upload.id, "offset": offset}
+    return Response(dumps(response), status=200, mimetype="application/json")
 
-    del file_like_object
+
+@dcfl_route.route("/datasets/uploads/<upload_id>/complete", methods=["POST"])
+@token_required
+def complete_chunked_upload(current_user, upload_id):
+    """Hand a complete upload to the ingestion pipeline, as a background job
+    (see /datasets/jobs/<job_id>), or before responding with ?wait=true."""
+    # grid relative
+    from ....core.node import get_node  # TODO: fix circular import
+
+    upload, error = _get_chunked_upload(current_user, upload_id)
+    if error is not None:
+        return error
+
+    bytes_total = upload.offset
+    try:
+        file_obj = get_node().chunked_uploads.complete(upload)
+    except ValueError as e:
+        response = {"error": str(e)}
+        return Response(dumps(response), status=400, mimetype="application/json")
+
+    job = get_node().upload_jobs.create(
+        user_id=current_user.id, bytes_total=bytes_total
+    )
+    return _start_upload_job(current_user, job, file_obj)
+
+
+@dcfl_route.route("/datasets/uploads/<upload_id>", methods=["DELETE"])
+@token_required
+def delete_chunked_upload(current_user, upload_id):
+    """Abort an upload and delete its chunks."""
+    # grid relative
+    from ....core.node import get_node  # TODO: fix circular import
+
+    upload, error = _get_chunked_upload(current_user, upload_id)
+    if error is not None:
+        return error
+    get_node().chunked_uploads.discard(upload)
+    return Response(status=204)
+
+
+@dcfl_route.route("/datasets/jobs/<job_id>", methods=["GET"])
+@token_required
+def get_upload_job(current_user, job_id):
+    """Progress of a dataset upload: bytes processed, files parsed,
+    throughput, and the dataset metadata once it is stored."""
+    # grid relative
+    from ....core.node import get_node  # TODO: fix circular import
+
+    job = get_node().upload_jobs.get(job_id)
+    if job is None:
+        response = {"error": "Upload job not found!"}
+        return Response(dumps(response), status=404, mimetype="application/json")
+
+    is_owner = current_user.role == get_node().roles.owner_role.id
+    if job.user_id != current_user.id and not is_owner:
+        response = {"error": str(AuthorizationError())}
+        return Response(dumps(response), status=403, mimetype="application/json")
+
+    return Response(dumps(job.to_dict()), status=200, mimetype="application/json")
+
+
+@dcfl_route.route("/datasets/<dataset_id>", methods=["GET"])
+@token_required
+def get_dataset_info(current_user, dataset_id):
+    content = {}
+    content["current_user"] = current_user
+    content["dataset_id"] = dataset_id
+    status_code, response_msg = error_handler(
+        route_logic, GetDatasetMessage, current_user, content
+    )
+
+    response = response_msg if isinstance(response_msg, dict) else response_msg.content
 
     return Response(
         dumps(response),
@@ -78,12 +280,46 @@ def create_dataset(current_user):
     )
 
 
-@dcfl_route.route("/datasets/<dataset_id>", methods=["GET"])
+def parse_rows(value):
+    """Parse a "start:stop" row range, either bound may be omitted."""
+    start, _, stop = value.partition(":")
+    return [int(start) if start else 0, int(stop) if stop else None]
+
+
+def parse_columns(value):
+    """Parse comma separated column names, positions and "start:stop"
+    position ranges."""
+    columns = []
+    for column in value.split(","):
+        start, sep, stop = column.partition(":")
+        if sep and start.isdigit() and stop.isdigit():
+            columns.extend(range(int(start), int(stop)))
+        elif column:
+            columns.append(column)
+    return columns
+
+
+@dcfl_route.route("/datasets/<dataset_id>/members/<member_id>/slice", methods=["GET"])
 @token_required
-def get_dataset_info(current_user, dataset_id):
+def get_dataset_slice(current_user, dataset_id, member_id):
+    """Read a window of a dataset file, e.g. ?rows=1000:2000&columns=3:5,age
+
+    Only the requested rows and columns are read from the store, whenever the
+    file format allows it.
+    """
     content = {}
     content["current_user"] = current_user
     content["dataset_id"] = dataset_id
+    content["member_id"] = member_id
+    try:
+        if "rows" in request.args:
+            content["rows"] = parse_rows(request.args["rows"])
+        if "columns" in request.args:
+            content["columns"] = parse_columns(request.args["columns"])
+    except ValueError:
+        response = {"error": "Invalid rows or columns!"}
+        return Response(dumps(response), status=400, mimetype="application/json")
+
     status_code, response_msg = error_handler(
         route_logic, GetDatasetMessage, current_user, content
     )
@@ -100,19 +336,53 @@ def get_dataset_info(current_user, dataset_id):
 @dcfl_route.route("/datasets", methods=["GET"])
 @token_required
 def get_all_datasets_info(current_user):
+    """List datasets, or a page, e.g. ?limit=100&after=<cursor>&tags=#a,#b
+
+    Every dataset is listed unless a limit or a cursor is given. Pages are
+    selected by offset or by cursor, the X-Next-Cursor header of the previous
+    page. Responses carry an ETag: a client sending it back gets a 304 as
+    long as no dataset changed, after a single lookup of the catalog version.
+    """
+    after = request.args.get("after", None)
+    try:
+        limit = request.args.get("limit", None)
+        if limit is not None or after is not None:
+            limit = min(int(limit or DATASET_PAGE_SIZE), MAX_PAGE_SIZE)
+        offset = int(request.args.get("offset", 0))
+    except ValueError:
+        response = {"error": "Invalid limit or offset!"}
+        return Response(dumps(response), status=400, mimetype="application/json")
+    tags = [tag for tag in request.args.get("tags", "").split(",") if tag]
+
+    # Tagged before the query: a change during the query yields a new tag
+    etag = catalog_version.etag(limit, offset, after, tags)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
     content = {}
     content["current_user"] = current_user
+    content["limit"] = limit
+    content["offset"] = offset
+    content["after"] = after
+    content["tags"] = tags
     status_code, response_msg = error_handler(
         route_logic, GetDatasetsMessage, current_user, content
     )
 
     response = response_msg if isinstance(response_msg, dict) else response_msg.content
 
-    return Response(
+    http_response = Response(
         dumps(response),
         status=status_code,
         mimetype="application/json",
     )
+    if status_code == 200:
+        http_response.set_etag(etag)
+        if limit is not None and len(response) == limit:
+            http_response.headers["X-Next-Cursor"] = response[-1]["id"]
+    return http_response
 
 
 @dcfl_route.route("/datasets/<dataset_id>", methods=["PUT"])
@@ -0,0 +1,131 @@
+# stdlib
+import json
+
+# third party
+from flask import Response
+from flask import request
+from flask import stream_with_context
+
+# grid relative
+from ....core.database import db
+from ....core.database.store_archive import import_archive
+from ....core.database.store_archive import iter_archive
+from ....core.database.store_disk import can_search
+from ....core.database.store_gc import collect_garbage
+from ....core.exceptions import AuthorizationError
+from ...auth import token_required
+from ..blueprint import dcfl_blueprint as dcfl_route
+
+
+@dcfl_route.route("/objects/search", methods=["GET"])
+@token_required
+def search_objects(current_user):
+    """Search stored objects by tag. Only the objects the user can search
+    (see StorableObject.search_permissions) are listed, every object for the
+    node owner.
+
+    Query args:
+        tags: Tag to look for, can be repeated (?tags=#a&tags=#b).
+        match: "all" (default) or "any".
+    """
+    # grid relative
+    from ....core.node import get_node  # TODO: fix circular import
+
+    tags = set(request.args.getlist("tags"))
+    match = request.args.get("match", "all")
+
+    if match not in ("all", "any"):
+        response = {"error": 'match should be either "all" or "any"'}
+        return Response(json.dumps(response), status=400, mimetype="application/json")
+
+    verify_key = None
+    if current_user.role != get_node().roles.owner_role.id:
+        verify_key = current_user.verify_key
+
+    store = get_node().store
+    if hasattr(store, "search"):
+        keys = store.search(tags=tags, match=match, verify_key=verify_key)
+    else:
+        matches = tags.issubset if match == "all" else tags.intersection
+        keys = [
+            obj.id
+            for obj in store.values()
+            if tags
+            and matches(set(obj.tags))
+            and (verify_key is None or can_search(obj, verify_key))
+        ]
+
+    response = {"objects": [str(key.value) for key in keys]}
+    return Response(json.dumps(response), status=200, mimetype="application/json")
+
+
+@dcfl_route.route("/objects/gc", methods=["POST"])
+@token_required
+def collect_store_garbage(current_user):
+    """Remove orphaned objects and payloads, then vacuum the database.
+    Restricted to the node owner. Dataset rows are only collected when
+    datasets are stored in the disk store (not on MEMORY_STORE nodes).
+
+    Body (optional):
+        batch_size: Rows deleted per transaction.
+        vacuum: Reclaim the freed space (default true).
+    """
+    # grid relative
+    from ....core.node import get_node  # TODO: fix circular import
+
+    if current_user.role != get_node().roles.owner_role.id:
+        response = {"error": str(AuthorizationError())}
+        return Response(json.dumps(response), status=403, mimetype="application/json")
+
+    node = get_node()
+    options = request.get_json(silent=True) or {}
+    report = collect_garbage(
+        db,
+        node.disk_store,
+        batch_size=int(options.get("batch_size", 500)),
+        vacuum=bool(options.get("vacuum", True)),
+        datasets=node.store is node.disk_store,
+    )
+    return Response(json.dumps(report), status=200, mimetype="application/json")
+
+
+@dcfl_route.route("/objects/export", methods=["GET"])
+@token_required
+def export_store(current_user):
+    """Stream the object store, its metadata, datasets and permissions as a
+    tar.gz archive. Restricted to the node owner."""
+    # grid relative
+    from ....core.node import get_node  # TODO: fix circular import
+
+    if current_user.role != get_node().roles.owner_role.id:
+        response = {"error": str(AuthorizationError())}
+        return Response(json.dumps(response), status=403, mimetype="application/json")
+
+    archive = iter_archive(db, get_node().disk_store)
+    return Response(
+        stream_with_context(archive),
+        status=200,
+        mimetype="application/gzip",
+        headers={"Content-Disposition": "attachment; filename=store.tar.gz"},
+    )
+
+
+@dcfl_route.route("/objects/import", methods=["POST"])
+@token_required
+def import_store(current_user):
+    """Restore an archive produced by /objects/export, sent as the request
+    body. Restricted to the node owner."""
+    # grid relative
+    from ....core.node import get_node  # TODO: fix circular import
+
+    if current_user.role != get_node().roles.owner_role.id:
+        response = {"error": str(AuthorizationError())}
+        return Response(json.dumps(response), status=403, mimetype="application/json")
+
+    try:
+        report = import_archive(db, get_node().disk_store, request.stream)
+    except Exception as e:
+        db.session.rollback()
+        response = {"error": str(e)}
+        return Response(json.dumps(response), status=400, mimetype="application/json")
+    return Response(json.dumps(report), status=200, mimetype="application/json")
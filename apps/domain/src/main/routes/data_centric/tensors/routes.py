@@ -68,6 +68,11 @@ def get_all_tensors():
     if not content:
         content = {}
 
+    # Optional pagination: /tensors?offset=100&limit=50
+    for arg in ("offset", "limit"):
+        if arg in request.args:
+            content[arg] = request.args.get(arg, type=int)
+
     status_code, response_msg = error_handler(
         route_logic, GetTensorsMessage, None, content
     )
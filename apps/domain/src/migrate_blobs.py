@@ -0,0 +1,59 @@
+"""Move stored object payloads between blob backends.
+
+Example:
+    BLOB_STORAGE_PATH=/data/blobs python migrate_blobs.py --backend=filesystem
+
+Uses the same database settings as the node (DATABASE_URL or --start_local_db).
+"""
+
+# stdlib
+import argparse
+import os
+
+# third party
+from app import create_app
+from main.core.database import db
+from main.core.database.bin_storage.migration import migrate_blobs
+
+parser = argparse.ArgumentParser(
+    description="Move PyGrid object payloads to another blob backend."
+)
+
+parser.add_argument(
+    "--backend",
+    type=str,
+    choices=["database", "filesystem"],
+    help="Destination blob backend, e.g. --backend=filesystem.",
+    required=True,
+)
+
+parser.add_argument(
+    "--batch_size",
+    type=int,
+    help="Number of objects moved per transaction. Default is 100.",
+    default=100,
+)
+
+parser.add_argument(
+    "--name",
+    type=str,
+    help="Grid node name. Default is os.environ.get('GRID_NODE_NAME','OpenMined').",
+    default=os.environ.get("GRID_NODE_NAME", "OpenMined"),
+)
+
+parser.add_argument(
+    "--start_local_db",
+    dest="start_local_db",
+    action="store_true",
+    help="If this flag is used a SQLAlchemy DB URI is generated to use a local db.",
+)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+
+    app = create_app(args)
+    result = migrate_blobs(db, target=args.backend, batch_size=args.batch_size)
+    print(
+        f"Moved {result['objects']} objects ({result['bytes']} bytes) "
+        f"to the {args.backend} backend."
+    )
@@ -0,0 +1,99 @@
+# stdlib
+import mmap
+import os
+
+# third party
+import pytest
+from src.main.core.database import *
+from src.main.core.database.bin_storage import blob_backend
+from src.main.core.database.bin_storage.blob_backend import FileSystemBlobBackend
+from src.main.core.database.bin_storage.migration import migrate_blobs
+from src.main.core.database.store_disk import DiskObjectStore
+from syft.core.common.uid import UID
+from syft.core.store.storeable_object import StorableObject
+import torch as th
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(BinObject).delete()
+        database.session.query(Blob).delete()
+        database.session.query(ObjectMetadata).delete()
+        database.session.query(ObjectPermission).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+@pytest.fixture
+def fs_backend(tmp_path, monkeypatch):
+    backend = FileSystemBlobBackend(root=str(tmp_path))
+    monkeypatch.setitem(blob_backend._backends, "filesystem", backend)
+    monkeypatch.setenv("BLOB_BACKEND", "filesystem")
+    return backend
+
+
+def test_filesystem_backend_requires_path(monkeypatch):
+    monkeypatch.delitem(blob_backend._backends, "filesystem", raising=False)
+    monkeypatch.delenv("BLOB_STORAGE_PATH", raising=False)
+
+    with pytest.raises(ValueError):
+        blob_backend.get_blob_backend("filesystem")
+
+
+def test_filesystem_backend_roundtrip(tmp_path):
+    backend = FileSystemBlobBackend(root=str(tmp_path))
+
+    ref = backend.write(b"payload")
+    assert bytes(backend.read(ref)) == b"payload"
+    assert list(backend.refs()) == [ref]
+
+    backend.delete(ref)
+    assert not os.path.exists(backend.path(ref))
+
+
+def test_large_payloads_are_mapped_and_released(tmp_path):
+    backend = FileSystemBlobBackend(root=str(tmp_path))
+    data = os.urandom(blob_backend.MMAP_MIN_SIZE)
+    ref = backend.write(data)
+    assert not os.path.exists(backend.path(ref) + ".tmp")
+
+    payload = backend.read(ref)
+    assert isinstance(payload, mmap.mmap)
+    with blob_backend.released(payload) as mapped:
+        assert bytes(mapped) == data
+    assert payload.closed
+
+    assert isinstance(backend.read(backend.write(b"small")), bytearray)
+
+
+def test_store_with_filesystem_backend(database, cleanup, fs_backend):
+    store = DiskObjectStore(database)
+    _id = UID()
+    store[_id] = StorableObject(id=_id, data=th.tensor([1.0, 2.0, 3.0]))
+
+    bin_obj = database.session.query(BinObject).get(str(_id.value))
+    assert bin_obj.binary is None
+    assert bin_obj.backend == "filesystem"
+    assert os.path.exists(fs_backend.path(bin_obj.blob_ref))
+    assert th.equal(store[_id].data, th.tensor([1.0, 2.0, 3.0]))
+
+    path = fs_backend.path(bin_obj.blob_ref)
+    store.delete(_id)
+    assert not os.path.exists(path)
+
+
+def test_migrate_blobs(database, cleanup, fs_backend, monkeypatch):
+    monkeypatch.setenv("BLOB_BACKEND", "database")
+    store = DiskObjectStore(database)
+    ids = [UID() for _ in range(3)]
+    store.set_many([(_id, StorableObject(id=_id, data=th.tensor([1]))) for _id in ids])
+
+    result = migrate_blobs(database, target="filesystem", batch_size=2)
+
+    assert result["objects"] == 3
+    assert len(list(fs_backend.refs())) == 3
+    for _id in ids:
+        assert th.equal(store[_id].data, th.tensor([1]))
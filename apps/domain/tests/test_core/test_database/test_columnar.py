@@ -0,0 +1,100 @@
+# third party
+import pandas as pd
+import pytest
+from src.main.core.database import *
+from src.main.core.database.bin_storage.columnar import DATASET_STORAGE
+from src.main.core.database.bin_storage.columnar import PARQUET_CODEC
+from src.main.core.database.bin_storage.columnar import PARQUET_ROW_GROUP_SIZE
+from src.main.core.database.bin_storage.columnar import decode_parquet
+from src.main.core.database.bin_storage.columnar import encode_parquet
+from src.main.core.database.bin_storage.columnar import parquet_columns
+from src.main.core.database.store_disk import DiskObjectStore
+from syft.core.common.uid import UID
+from syft.core.store.storeable_object import StorableObject
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def columnar(monkeypatch):
+    monkeypatch.setenv(DATASET_STORAGE, "columnar")
+    monkeypatch.setenv(PARQUET_ROW_GROUP_SIZE, "10")
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(BinObject).delete()
+        database.session.query(ObjectMetadata).delete()
+        database.session.query(ObjectTag).delete()
+        database.session.query(ObjectPermission).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+def create_table(rows=35):
+    return pd.DataFrame(
+        {
+            "id": range(rows),
+            "name": [f"row {i}" for i in range(rows)],
+            "score": [None if i % 7 == 0 else i / 2 for i in range(rows)],
+        }
+    )
+
+
+def test_parquet_keeps_names_and_types(columnar):
+    df = create_table()
+
+    result = decode_parquet(encode_parquet(df))
+
+    pd.testing.assert_frame_equal(result, df)
+
+
+def test_parquet_projection_and_row_range(columnar):
+    df = create_table()
+
+    result = decode_parquet(encode_parquet(df), columns=["score"], rows=(12, 25))
+
+    assert list(result.columns) == ["score"]
+    assert list(result.index) == list(range(12, 25))
+    assert result["score"].equals(df["score"].iloc[12:25])
+
+
+def test_parquet_row_range_past_the_end(columnar):
+    result = decode_parquet(encode_parquet(create_table()), rows=(50, 60))
+
+    assert len(result) == 0
+    assert list(result.columns) == ["id", "name", "score"]
+
+
+def test_parquet_negative_and_inverted_row_ranges(columnar):
+    payload = encode_parquet(create_table())
+
+    result = decode_parquet(payload, rows=(-5, None))
+    assert list(result["id"]) == list(range(30, 35))
+    assert list(result.index) == list(range(30, 35))
+    assert len(decode_parquet(payload, rows=(20, 10))) == 0
+
+
+def test_parquet_columns_read_from_footer(columnar):
+    columns = parquet_columns(encode_parquet(create_table()))
+
+    assert [column["name"] for column in columns] == ["id", "name", "score"]
+    assert columns[0]["dtype"] == "int64"
+    assert columns[2]["null_count"] == 5
+
+
+def test_store_reads_table_slices(database, cleanup, columnar):
+    store = DiskObjectStore(database)
+    df = create_table()
+    _id = UID()
+    store[_id] = StorableObject(id=_id, data=df)
+
+    bin_obj = database.session.query(BinObject).get(str(_id.value))
+    assert bin_obj.codec == PARQUET_CODEC
+    pd.testing.assert_frame_equal(store[_id].data, df)
+
+    result = store.read_slice(_id, rows=(3, 5), columns=["id", "name"])
+    assert result.to_dict("list") == {"id": [3, 4], "name": ["row 3", "row 4"]}
@@ -0,0 +1,58 @@
+# third party
+import pytest
+from src.main.core.database import *
+from src.main.core.database.bin_storage.compression import compress
+from src.main.core.database.bin_storage.compression import decompress
+from src.main.core.database.store_disk import DiskObjectStore
+from syft.core.common.uid import UID
+from syft.core.store.storeable_object import StorableObject
+import torch as th
+
+zstandard = pytest.importorskip("zstandard")
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(BinObject).delete()
+        database.session.query(Blob).delete()
+        database.session.query(ObjectMetadata).delete()
+        database.session.query(ObjectTag).delete()
+        database.session.query(ObjectPermission).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+@pytest.fixture
+def zstd(monkeypatch):
+    monkeypatch.setenv("BLOB_COMPRESSION", "zstd")
+    monkeypatch.setenv("BLOB_COMPRESSION_THRESHOLD", "1024")
+
+
+def test_compress_roundtrip():
+    data = b"grid" * 1000
+    compressed = compress(data, "zstd", level=1)
+    assert len(compressed) < len(data)
+    assert decompress(compressed, "zstd") == data
+    assert decompress(data, None) == data
+
+
+def test_store_compresses_large_payloads(database, cleanup, zstd):
+    store = DiskObjectStore(database)
+    small, large = UID(), UID()
+    store[small] = StorableObject(id=small, data=th.zeros(4))
+    store[large] = StorableObject(id=large, data=th.zeros(10000))
+
+    assert database.session.query(BinObject).get(str(small.value)).compression is None
+    bin_obj = database.session.query(BinObject).get(str(large.value))
+    assert bin_obj.compression == "zstd"
+    assert bin_obj.stored_size < bin_obj.size
+
+    assert th.equal(store[large].data, th.zeros(10000))
+
+    stats = store.compression_stats()
+    assert stats["zstd"]["objects"] == 1
+    assert stats["zstd"]["stored_bytes"] < stats["zstd"]["logical_bytes"]
+    assert stats["none"]["objects"] == 1
@@ -0,0 +1,94 @@
+# stdlib
+import os
+
+# third party
+import pytest
+from src.main.core.database import *
+from src.main.core.database.bin_storage import blob_backend
+from src.main.core.database.bin_storage.blob_backend import FileSystemBlobBackend
+from src.main.core.database.store_disk import DiskObjectStore
+from syft.core.common.uid import UID
+from syft.core.store.storeable_object import StorableObject
+import torch as th
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(BinObject).delete()
+        database.session.query(Blob).delete()
+        database.session.query(ObjectMetadata).delete()
+        database.session.query(ObjectTag).delete()
+        database.session.query(ObjectPermission).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+@pytest.fixture
+def dedup(monkeypatch):
+    monkeypatch.setenv("BLOB_DEDUP", "true")
+
+
+def create_copies(n, data):
+    return [StorableObject(id=UID(), data=data.clone()) for _ in range(n)]
+
+
+def test_identical_payloads_are_stored_once(database, cleanup, dedup):
+    store = DiskObjectStore(database)
+    objs = create_copies(3, th.arange(100))
+    store.set_many([(obj.id, obj) for obj in objs])
+
+    assert database.session.query(Blob).count() == 1
+    assert database.session.query(Blob).first().refcount == 3
+    for obj in objs:
+        assert th.equal(store[obj.id].data, th.arange(100))
+
+    stats = store.dedup_stats()
+    assert stats["objects"] == 3 and stats["blobs"] == 1
+    assert stats["logical_bytes"] == 3 * stats["stored_bytes"]
+
+
+def test_blob_is_deleted_with_its_last_reference(database, cleanup, dedup):
+    store = DiskObjectStore(database)
+    objs = create_copies(2, th.ones(10))
+    store.set_many([(obj.id, obj) for obj in objs])
+
+    store.delete(objs[0].id)
+    assert database.session.query(Blob).first().refcount == 1
+
+    # Overwriting the last reference with other data releases the blob
+    store[objs[1].id] = StorableObject(id=objs[1].id, data=th.zeros(10))
+    blob = database.session.query(Blob).one()
+    assert blob.refcount == 1
+    assert th.equal(store[objs[1].id].data, th.zeros(10))
+
+    store.delete(objs[1].id)
+    assert database.session.query(Blob).count() == 0
+
+
+def test_rewriting_same_content_keeps_blob(database, cleanup, dedup):
+    store = DiskObjectStore(database)
+    obj = create_copies(1, th.ones(10))[0]
+    store[obj.id] = obj
+    store[obj.id] = obj
+
+    assert database.session.query(Blob).one().refcount == 1
+
+
+def test_shared_files_are_deleted_once(database, cleanup, dedup, tmp_path, monkeypatch):
+    backend = FileSystemBlobBackend(root=str(tmp_path))
+    monkeypatch.setitem(blob_backend._backends, "filesystem", backend)
+    monkeypatch.setenv("BLOB_BACKEND", "filesystem")
+
+    store = DiskObjectStore(database)
+    objs = create_copies(2, th.ones(10))
+    store.set_many([(obj.id, obj) for obj in objs])
+    assert len(list(backend.refs())) == 1
+    path = backend.path(database.session.query(Blob).one().blob_ref)
+
+    store.delete(objs[0].id)
+    assert os.path.exists(path)
+    store.delete(objs[1].id)
+    assert not os.path.exists(path)
@@ -0,0 +1,54 @@
+# third party
+from sqlalchemy import create_engine
+from sqlalchemy import inspect
+from sqlalchemy import text
+from src.main.core.database.bin_storage.bin_obj import ObjectMetadata
+from src.main.core.database.schema import has_unique_key
+from src.main.core.database.schema import upgrade_schema
+
+
+def create_legacy_metadata(engine):
+    # Table of the first releases: no unique object key, no type column
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE obj_metadata (id INTEGER PRIMARY KEY, obj INTEGER, "
+                "tags JSON, description VARCHAR, read_permissions JSON, "
+                "search_permissions JSON)"
+            )
+        )
+        conn.execute(
+            text("INSERT INTO obj_metadata (id, obj) VALUES (1, 7), (2, 7), (3, 8)")
+        )
+
+
+def test_upgrade_legacy_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    create_legacy_metadata(engine)
+    assert not has_unique_key(engine, "obj_metadata", "obj")
+
+    statements = upgrade_schema(engine, tables=[ObjectMetadata.__table__])
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("obj_metadata")}
+    assert "obj_type" in columns
+    # Duplicate rows are kept, and block the unique key
+    assert not has_unique_key(engine, "obj_metadata", "obj")
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, obj FROM obj_metadata ORDER BY id"))
+        assert [tuple(row) for row in rows] == [(1, 7), (2, 7), (3, 8)]
+    assert statements
+    assert upgrade_schema(engine, tables=[ObjectMetadata.__table__]) == []
+
+    # They are only removed on request
+    statements = upgrade_schema(
+        engine, tables=[ObjectMetadata.__table__], deduplicate=True
+    )
+    assert has_unique_key(engine, "obj_metadata", "obj")
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, obj FROM obj_metadata ORDER BY id"))
+        assert [tuple(row) for row in rows] == [(2, 7), (3, 8)]
+
+    # Up to date tables are left alone
+    assert statements
+    assert upgrade_schema(engine, tables=[ObjectMetadata.__table__]) == []
@@ -0,0 +1,120 @@
+# stdlib
+import io
+
+# third party
+from nacl.signing import SigningKey
+import pytest
+from src.main.core.database import *
+from src.main.core.database.dataset.datasetgroup import BinObjDataset
+from src.main.core.database.dataset.datasetgroup import Dataset
+from src.main.core.database.store_archive import export_archive
+from src.main.core.database.store_archive import import_archive
+from src.main.core.database.store_disk import DiskObjectStore
+from syft.core.common.uid import UID
+from syft.core.store.storeable_object import StorableObject
+import torch as th
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(BinObjDataset).delete()
+        database.session.query(Dataset).delete()
+        database.session.query(BinObject).delete()
+        database.session.query(Blob).delete()
+        database.session.query(ObjectMetadata).delete()
+        database.session.query(ObjectTag).delete()
+        database.session.query(ObjectPermission).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+def create_objects(n, verify_key=None):
+    permissions = {verify_key: None} if verify_key is not None else {}
+    return [
+        StorableObject(
+            id=UID(),
+            data=th.arange(10) * i,
+            tags=["#tensor", f"#{i}"],
+            description=f"Tensor {i}",
+            read_permissions=dict(permissions),
+        )
+        for i in range(n)
+    ]
+
+
+def export_and_clear(database, store, batch_size=2):
+    archive = io.BytesIO()
+    export_archive(database, store, archive, batch_size=batch_size)
+    store.clear()
+    database.session.query(BinObjDataset).delete()
+    database.session.query(Dataset).delete()
+    database.session.commit()
+    archive.seek(0)
+    return archive
+
+
+def test_export_import_round_trip(database, cleanup):
+    verify_key = SigningKey.generate().verify_key
+    store = DiskObjectStore(database)
+    objs = create_objects(5, verify_key)
+    store.set_many([(obj.id, obj) for obj in objs])
+
+    archive = export_and_clear(database, store)
+    assert len(store) == 0
+
+    report = import_archive(database, store, archive)
+
+    assert report["objects"] == 5
+    assert len(store) == 5
+    for i, obj in enumerate(objs):
+        restored = store[obj.id]
+        assert th.equal(restored.data, th.arange(10) * i)
+        assert restored.description == f"Tensor {i}"
+        assert store.has_permission(obj.id, verify_key)
+    assert [str(key.value) for key in store.search(["#3"])] == [str(objs[3].id.value)]
+
+
+def test_shared_payloads_are_exported_once(database, cleanup, monkeypatch):
+    monkeypatch.setenv("BLOB_DEDUP", "true")
+    store = DiskObjectStore(database)
+    objs = [StorableObject(id=UID(), data=th.ones(1000)) for _ in range(4)]
+    store.set_many([(obj.id, obj) for obj in objs])
+
+    archive = export_and_clear(database, store, batch_size=1)
+    report = import_archive(database, store, archive)
+
+    assert report["objects"] == 4
+    assert report["bytes"] == store.dedup_stats()["stored_bytes"]
+    assert database.session.query(Blob).one().refcount == 4
+    for obj in objs:
+        assert th.equal(store[obj.id].data, th.ones(1000))
+
+
+def test_datasets_are_restored(database, cleanup):
+    store = DiskObjectStore(database)
+    obj = create_objects(1)[0]
+    store[obj.id] = obj
+    database.session.add(Dataset(id="dataset", manifest="m", tags=["#a"]))
+    database.session.add(
+        BinObjDataset(name="data.csv", dataset="dataset", obj=str(obj.id.value))
+    )
+    database.session.commit()
+
+    archive = export_and_clear(database, store)
+    report = import_archive(database, store, archive)
+    # Importing twice replaces the rows instead of duplicating them
+    import_archive(database, store, io.BytesIO(archive.getvalue()))
+
+    assert report["dataset"] == 1 and report["bin_obj_dataset"] == 1
+    assert database.session.query(Dataset).one().tags == ["#a"]
+    relation = database.session.query(BinObjDataset).one()
+    assert relation.obj == str(obj.id.value)
+
+
+def test_invalid_archive_is_rejected(database, cleanup):
+    store = DiskObjectStore(database)
+    with pytest.raises(Exception):
+        import_archive(database, store, io.BytesIO(b"not an archive"))
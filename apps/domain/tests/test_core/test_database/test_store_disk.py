@@ -0,0 +1,314 @@
+# third party
+from nacl.encoding import HexEncoder
+from nacl.signing import SigningKey
+import pytest
+from src.main.core.database import *
+from src.main.core.database.object_cache import ObjectCache
+from src.main.core.database.store_disk import DiskObjectStore
+from syft.core.common.group import VERIFYALL
+from syft.core.common.uid import UID
+from syft.core.store.storeable_object import StorableObject
+import torch as th
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(BinObject).delete()
+        database.session.query(Blob).delete()
+        database.session.query(ObjectMetadata).delete()
+        database.session.query(ObjectTag).delete()
+        database.session.query(ObjectPermission).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+def create_objects(n):
+    objs = []
+    for i in range(n):
+        _id = UID()
+        objs.append(
+            StorableObject(
+                id=_id,
+                data=th.tensor([i, i + 1, i + 2]),
+                tags=["#tensor", f"#{i}"],
+                description=f"Tensor {i}",
+            )
+        )
+    return objs
+
+
+def test_set_many_get_many(database, cleanup):
+    store = DiskObjectStore(database)
+    objs = create_objects(5)
+
+    store.set_many([(obj.id, obj) for obj in objs])
+
+    assert len(store) == 5
+    result = store.get_many([obj.id for obj in objs])
+    assert [obj.id for obj in result] == [obj.id for obj in objs]
+    for stored, original in zip(result, objs):
+        assert th.equal(stored.data, original.data)
+        assert stored.tags == original.tags
+        assert stored.description == original.description
+
+
+def test_get_many_skips_missing_keys(database, cleanup):
+    store = DiskObjectStore(database)
+    objs = create_objects(2)
+    store.set_many([(obj.id, obj) for obj in objs])
+
+    result = store.get_many([objs[0].id, UID(), objs[1].id])
+    assert [obj.id for obj in result] == [objs[0].id, objs[1].id]
+
+
+def test_set_many_overwrites(database, cleanup):
+    store = DiskObjectStore(database)
+    obj = create_objects(1)[0]
+    store[obj.id] = obj
+
+    new_obj = StorableObject(id=obj.id, data=th.tensor([42]), tags=["#new"])
+    store.set_many([(obj.id, new_obj)])
+
+    assert len(store) == 1
+    assert th.equal(store[obj.id].data, th.tensor([42]))
+    assert store[obj.id].tags == ["#new"]
+
+
+def test_delete_many(database, cleanup):
+    store = DiskObjectStore(database)
+    objs = create_objects(4)
+    store.set_many([(obj.id, obj) for obj in objs])
+
+    store.delete_many([obj.id for obj in objs[:3]] + [UID()])
+
+    assert len(store) == 1
+    assert objs[3].id in store
+    assert objs[0].id not in store
+
+
+def test_cache_hits_and_invalidation(database, cleanup):
+    store = DiskObjectStore(database, cache_size=1024 * 1024)
+    obj = create_objects(1)[0]
+    store[obj.id] = obj
+
+    first = store[obj.id]
+    second = store[obj.id]
+    assert first is second
+    assert store.cache_stats()["misses"] == 1
+    assert store.cache_stats()["hits"] == 1
+
+    store[obj.id] = StorableObject(id=obj.id, data=th.tensor([7]))
+    assert th.equal(store[obj.id].data, th.tensor([7]))
+
+    store.delete(obj.id)
+    assert store.cache_stats()["entries"] == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ObjectCache(max_bytes=20)
+    objs = create_objects(3)
+
+    cache.put("a", objs[0], size=10)
+    cache.put("b", objs[1], size=10)
+    assert cache.get("a") is objs[0]
+
+    # "b" is now the least recently used entry
+    cache.put("c", objs[2], size=10)
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 20
+
+    # Objects bigger than the whole budget are not cached
+    cache.put("d", objs[0], size=30)
+    assert "d" not in cache
+    assert len(cache) == 2
+
+
+def test_get_objects_of_type(database, cleanup):
+    store = DiskObjectStore(database)
+    tensors = create_objects(2)
+    store.set_many([(obj.id, obj) for obj in tensors])
+    _id = UID()
+    store[_id] = StorableObject(id=_id, data=th.nn.Parameter(th.tensor([1.0])))
+
+    metadata = database.session.query(ObjectMetadata).filter_by(obj=str(_id.value))
+    assert metadata.first().obj_type == "torch.nn.parameter.Parameter"
+
+    # Subclasses match, as they would with isinstance
+    assert len(store.get_objects_of_type(th.Tensor)) == 3
+    assert len(store.get_objects_of_type(th.nn.Parameter)) == 1
+
+    result = store.get_metadata_of_type(th.Tensor)
+    assert {m.obj for m in result} == {str(obj.id.value) for obj in tensors} | {
+        str(_id.value)
+    }
+
+
+def test_get_objects_of_type_backfills_missing_types(database, cleanup):
+    # Types are backfilled a page at a time
+    store = DiskObjectStore(database, page_size=2)
+    objs = create_objects(5)
+    for obj in objs:
+        store[obj.id] = obj
+    database.session.query(ObjectMetadata).update({"obj_type": None})
+    database.session.commit()
+
+    metadata = store.get_metadata_of_type(th.Tensor)
+    assert {m.obj for m in metadata} == {str(obj.id.value) for obj in objs}
+    types = database.session.query(ObjectMetadata.obj_type).distinct().all()
+    assert types == [("torch.Tensor",)]
+
+
+def test_iterate_store_in_pages(database, cleanup):
+    store = DiskObjectStore(database, page_size=2)
+    objs = create_objects(5)
+    store.set_many([(obj.id, obj) for obj in objs])
+    ids = sorted(str(obj.id.value) for obj in objs)
+
+    assert [str(key.value) for key in store.iter_keys()] == ids
+    assert [str(obj.id.value) for obj in store.iter_values()] == ids
+    assert [str(key.value) for key, _ in store.iter_items(page_size=3)] == ids
+
+    assert [str(key.value) for key in store.keys_page(offset=1, limit=2)] == ids[1:3]
+    page = store.values_page(offset=4)
+    assert [str(obj.id.value) for obj in page] == ids[4:]
+
+
+def test_str_and_sizeof_do_not_load_objects(database, cleanup):
+    store = DiskObjectStore(database)
+    objs = create_objects(3)
+    store.set_many([(obj.id, obj) for obj in objs])
+
+    assert str(store) == "<DiskObjectStore: 3 objects>"
+    assert store.__sizeof__() == sum(
+        bin_obj.payload_size for bin_obj in database.session.query(BinObject).all()
+    )
+
+
+def test_update_metadata_keeps_payload(database, cleanup):
+    store = DiskObjectStore(database)
+    obj = create_objects(1)[0]
+    store[obj.id] = obj
+    payload = bytes(database.session.query(BinObject).first().payload)
+
+    store.update_metadata(obj.id, tags=["#updated"], description="Updated")
+
+    stored = store[obj.id]
+    assert stored.tags == ["#updated"]
+    assert stored.description == "Updated"
+    assert bytes(database.session.query(BinObject).first().payload) == payload
+    assert database.session.query(ObjectMetadata).count() == 1
+
+
+def test_update_metadata_missing_object(database, cleanup):
+    store = DiskObjectStore(database)
+    with pytest.raises(Exception):
+        store.update_metadata(UID(), tags=["#tag"])
+
+
+def test_search_by_tags(database, cleanup):
+    store = DiskObjectStore(database)
+    objs = create_objects(3)
+    store.set_many([(obj.id, obj) for obj in objs])
+
+    assert store.search(tags=["#tensor", "#1"]) == [objs[1].id]
+    assert set(store.search(tags=["#0", "#2"], match="any")) == {
+        objs[0].id,
+        objs[2].id,
+    }
+    assert store.search(tags=["#0", "#2"], match="all") == []
+    assert len(store.search(tags=["#tensor"])) == 3
+
+    store.update_metadata(objs[0].id, tags=["#renamed"])
+    assert store.search(tags=["#renamed"]) == [objs[0].id]
+    assert len(store.search(tags=["#tensor"])) == 2
+
+    store.delete(objs[1].id)
+    assert store.search(tags=["#1"]) == []
+    assert (
+        database.session.query(ObjectTag).filter_by(obj=str(objs[1].id.value)).count()
+        == 0
+    )
+
+
+def test_search_rebuilds_missing_index(database, cleanup):
+    store = DiskObjectStore(database)
+    obj = create_objects(1)[0]
+    store[obj.id] = obj
+    database.session.query(ObjectTag).delete()
+    database.session.commit()
+
+    assert DiskObjectStore(database).search(tags=["#0"]) == [obj.id]
+
+
+def test_search_filters_by_search_permission(database, cleanup):
+    store = DiskObjectStore(database)
+    objs = create_objects(3)
+    key = SigningKey.generate().verify_key
+    objs[0].search_permissions = {VERIFYALL: None}
+    objs[1].search_permissions = {key: None}
+    objs[2].search_permissions = {}
+    store.set_many([(obj.id, obj) for obj in objs])
+
+    assert set(store.search(tags=["#tensor"], verify_key=key)) == {
+        objs[0].id,
+        objs[1].id,
+    }
+    other = SigningKey.generate().verify_key
+    assert store.search(tags=["#tensor"], verify_key=other) == [objs[0].id]
+    assert len(store.search(tags=["#tensor"])) == 3
+    assert store[objs[1].id].search_permissions == {key: None}
+
+
+def test_grant_revoke_and_check_permissions(database, cleanup):
+    store = DiskObjectStore(database)
+    objs = create_objects(2)
+    store.set_many([(obj.id, obj) for obj in objs])
+    key = SigningKey.generate().verify_key
+
+    assert not store.has_permission(objs[0].id, key)
+    assert store.readable_by(key) == []
+
+    store.grant_permission(objs[0].id, key, request_id="request")
+    assert store.has_permission(objs[0].id, key)
+    assert not store.has_permission(objs[0].id, key, kind="search")
+    assert store.readable_by(key) == [objs[0].id]
+    assert store[objs[0].id].read_permissions == {key: "request"}
+
+    store.revoke_permission(objs[0].id, key)
+    assert not store.has_permission(objs[0].id, key)
+    assert store[objs[0].id].read_permissions == {}
+
+    with pytest.raises(Exception):
+        store.grant_permission(UID(), key)
+
+
+def test_permissions_are_stored_with_objects(database, cleanup):
+    store = DiskObjectStore(database)
+    key = SigningKey.generate().verify_key
+    obj = StorableObject(id=UID(), data=th.tensor([1]), read_permissions={key: None})
+    store[obj.id] = obj
+
+    assert store.has_permission(obj.id, key)
+    assert list(store[obj.id].read_permissions.keys()) == [key]
+
+    store.delete(obj.id)
+    assert database.session.query(ObjectPermission).count() == 0
+
+
+def test_legacy_json_permissions_are_moved_to_table(database, cleanup):
+    store = DiskObjectStore(database)
+    key = SigningKey.generate().verify_key
+    obj = create_objects(1)[0]
+    store[obj.id] = obj
+    hex_key = key.encode(encoder=HexEncoder).decode("utf-8")
+    database.session.query(ObjectMetadata).update({"read_permissions": {hex_key: None}})
+    database.session.commit()
+
+    assert list(store[obj.id].read_permissions.keys()) == [key]
+    assert DiskObjectStore(database).readable_by(key) == [obj.id]
+    assert database.session.query(ObjectMetadata).first().read_permissions is None
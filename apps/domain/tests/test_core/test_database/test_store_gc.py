@@ -0,0 +1,139 @@
+# stdlib
+import os
+
+# third party
+import pytest
+from src.main.core.database import *
+from src.main.core.database.bin_storage import blob_backend
+from src.main.core.database.bin_storage.blob_backend import FileSystemBlobBackend
+from src.main.core.database.dataset.datasetgroup import BinObjDataset
+from src.main.core.database.store_disk import DiskObjectStore
+from src.main.core.database.store_gc import collect_garbage
+from syft.core.common.uid import UID
+from syft.core.store.storeable_object import StorableObject
+import torch as th
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(BinObjDataset).delete()
+        database.session.query(BinObject).delete()
+        database.session.query(Blob).delete()
+        database.session.query(ObjectMetadata).delete()
+        database.session.query(ObjectTag).delete()
+        database.session.query(ObjectPermission).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    backend = FileSystemBlobBackend(root=str(tmp_path))
+    monkeypatch.setitem(blob_backend._backends, "filesystem", backend)
+    return backend
+
+
+def store_objects(store, n):
+    objs = [
+        StorableObject(id=UID(), data=th.ones(10) * i, tags=["#x"]) for i in range(n)
+    ]
+    store.set_many([(obj.id, obj) for obj in objs])
+    return objs
+
+
+def test_gc_keeps_live_objects(database, cleanup, backend):
+    store = DiskObjectStore(database)
+    objs = store_objects(store, 3)
+
+    report = collect_garbage(database, store, vacuum=False)
+
+    assert report["objects"] == 0 and report["metadata"] == 0
+    assert len(store) == 3
+    assert th.equal(store[objs[2].id].data, th.ones(10) * 2)
+
+
+def test_gc_removes_orphaned_rows(database, cleanup, backend):
+    store = DiskObjectStore(database)
+    objs = store_objects(store, 4)
+
+    # Metadata without object, and object without metadata
+    database.session.query(BinObject).filter_by(id=str(objs[0].id.value)).delete()
+    database.session.query(ObjectMetadata).filter_by(obj=str(objs[1].id.value)).delete()
+    # Dataset member pointing to a missing object
+    database.session.add(BinObjDataset(name="x", obj=str(UID().value)))
+    database.session.commit()
+
+    report = collect_garbage(database, store, batch_size=1, vacuum=False)
+
+    assert report["metadata"] == 1
+    assert report["tags"] == 1
+    assert report["objects"] == 1
+    assert report["dataset_members"] == 1
+    assert database.session.query(BinObject).count() == 2
+    assert database.session.query(ObjectMetadata).count() == 2
+    assert database.session.query(BinObjDataset).count() == 0
+
+
+def test_gc_keeps_dataset_members(database, cleanup, backend):
+    store = DiskObjectStore(database)
+    obj = store_objects(store, 1)[0]
+    database.session.query(ObjectMetadata).delete()
+    database.session.add(BinObjDataset(name="x", obj=str(obj.id.value)))
+    database.session.commit()
+
+    report = collect_garbage(database, store, vacuum=False)
+
+    assert report["objects"] == 0
+    assert database.session.query(BinObject).count() == 1
+
+
+def test_gc_skips_datasets_of_other_stores(database, cleanup, backend):
+    store = DiskObjectStore(database)
+    # Member of a dataset stored in the in-memory store (MEMORY_STORE nodes)
+    database.session.add(BinObjDataset(name="x", obj=str(UID().value)))
+    database.session.commit()
+
+    report = collect_garbage(database, store, vacuum=False, datasets=False)
+
+    assert report["dataset_members"] == 0
+    assert database.session.query(BinObjDataset).count() == 1
+
+
+def test_gc_removes_unreferenced_blobs_and_files(database, cleanup, backend):
+    store = DiskObjectStore(database)
+    blob = Blob(hash="0" * 64, refcount=1)
+    blob.store_payload(b"leaked", backend="filesystem")
+    database.session.add(blob)
+    database.session.commit()
+    blob_path = backend.path(blob.blob_ref)
+    leaked_file = backend.path(backend.write(b"leaked"))
+
+    report = collect_garbage(database, store, vacuum=False, file_grace_period=0)
+
+    assert report["blobs"] == 1 and report["files"] == 1
+    assert database.session.query(Blob).count() == 0
+    assert not os.path.exists(blob_path)
+    assert not os.path.exists(leaked_file)
+
+
+def test_gc_keeps_recent_files(database, cleanup, backend):
+    store = DiskObjectStore(database)
+    path = backend.path(backend.write(b"in flight"))
+
+    report = collect_garbage(database, store, vacuum=False)
+
+    assert report["files"] == 0
+    assert os.path.exists(path)
+
+
+def test_gc_compacts_database(database, cleanup, backend):
+    store = DiskObjectStore(database)
+    store_objects(store, 2)
+
+    report = collect_garbage(database, store)
+
+    assert report["bytes_freed"] >= 0
+    assert len(store) == 2
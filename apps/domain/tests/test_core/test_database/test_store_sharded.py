@@ -0,0 +1,119 @@
+# third party
+import pytest
+from src.main.core.database.store_sharded import ShardedObjectStore
+from src.main.core.database.store_sharded import get_shard_binds
+from src.main.core.database.store_tiered import create_object_store
+from syft.core.common.uid import UID
+from syft.core.store.storeable_object import StorableObject
+import torch as th
+
+
+@pytest.fixture
+def store(app, database, tmp_path, monkeypatch):
+    binds = ["store_shard_0", "store_shard_1", "store_shard_2"]
+    for bind in binds:
+        monkeypatch.setitem(
+            app.config["SQLALCHEMY_BINDS"], bind, f"sqlite:///{tmp_path}/{bind}.db"
+        )
+    store = ShardedObjectStore(database, binds=binds)
+    yield store
+    store.close()
+
+
+def create_objects(n):
+    return [
+        StorableObject(id=UID(), data=th.tensor([i]), tags=["#sharded", f"#{i}"])
+        for i in range(n)
+    ]
+
+
+def test_get_shard_binds(monkeypatch):
+    monkeypatch.setenv("STORE_SHARDS", "sqlite:///a.db, sqlite:///b.db")
+    assert get_shard_binds() == {
+        "store_shard_0": "sqlite:///a.db",
+        "store_shard_1": "sqlite:///b.db",
+    }
+
+
+def test_objects_are_spread_across_shards(store):
+    objs = create_objects(30)
+    store.set_many([(obj.id, obj) for obj in objs])
+
+    assert len(store) == 30
+    stats = store.shard_stats()
+    assert sum(shard["objects"] for shard in stats) == 30
+    assert all(shard["objects"] > 0 for shard in stats)
+
+    for obj in objs:
+        assert obj.id in store.shard_for(obj.id)
+        assert th.equal(store[obj.id].data, obj.data)
+
+
+def test_batch_operations(store):
+    objs = create_objects(10)
+    store.set_many([(obj.id, obj) for obj in objs])
+
+    keys = [obj.id for obj in reversed(objs)] + [UID()]
+    assert [obj.id for obj in store.get_many(keys)] == keys[:-1]
+    assert set(store.search(tags=["#sharded"])) == {obj.id for obj in objs}
+
+    store.delete_many([obj.id for obj in objs[:4]])
+    assert len(store) == 6
+    assert objs[0].id not in store
+
+
+def test_pages_are_globally_ordered(store):
+    objs = create_objects(10)
+    store.set_many([(obj.id, obj) for obj in objs])
+    ids = sorted(str(obj.id.value) for obj in objs)
+
+    assert [str(key.value) for key in store.keys_page(offset=2, limit=5)] == ids[2:7]
+    page = store.get_metadata_of_type(th.Tensor, offset=8)
+    assert [metadata.obj for metadata in page] == ids[8:]
+
+
+def test_uncommitted_batches_follow_main_session(store, database):
+    objs = create_objects(6)
+    store.set_many([(obj.id, obj) for obj in objs], commit=False)
+    assert len(store) == 0
+    database.session.rollback()
+    database.session.commit()
+    assert len(store) == 0
+
+    store.set_many([(obj.id, obj) for obj in objs], commit=False)
+    database.session.commit()
+    assert len(store) == 6
+
+    store.delete_many([obj.id for obj in objs[:2]], commit=False)
+    assert len(store) == 6
+    database.session.commit()
+    assert len(store) == 4
+
+
+def test_uncommitted_permissions_follow_main_session(store, database):
+    obj = create_objects(1)[0]
+    store[obj.id] = obj
+    verify_key = "ab" * 32
+
+    store.grant_permission(obj.id, verify_key, commit=False)
+    assert not store.has_permission(obj.id, verify_key)
+    database.session.rollback()
+    database.session.commit()
+    assert not store.has_permission(obj.id, verify_key)
+
+    store.grant_permission(obj.id, verify_key, commit=False)
+    store.update_metadata(obj.id, commit=False, description="granted")
+    database.session.commit()
+    assert store.has_permission(obj.id, verify_key)
+    assert store.get_metadata(obj.id).description == "granted"
+
+    store.revoke_permission(obj.id, verify_key, commit=False)
+    database.session.commit()
+    assert not store.has_permission(obj.id, verify_key)
+
+
+def test_sharded_store_rejects_memory_tier(database, monkeypatch):
+    monkeypatch.setenv("STORE_SHARDS", "sqlite:///a.db")
+    monkeypatch.setenv("STORE_MEMORY_SIZE", "1024")
+    with pytest.raises(ValueError):
+        create_object_store(database)
@@ -0,0 +1,149 @@
+# third party
+import pytest
+from src.main.core.database import *
+from src.main.core.database.store_disk import DiskObjectStore
+from src.main.core.database.store_tiered import TieredObjectStore
+from src.main.core.database.store_tiered import create_object_store
+from src.main.core.nodes.domain import store_config
+from syft.core.common.uid import UID
+from syft.core.store.storeable_object import StorableObject
+import torch as th
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(BinObject).delete()
+        database.session.query(Blob).delete()
+        database.session.query(ObjectMetadata).delete()
+        database.session.query(ObjectTag).delete()
+        database.session.query(ObjectPermission).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+def create_object(size=4):
+    _id = UID()
+    return StorableObject(id=_id, data=th.zeros(size), tags=["#tiered"])
+
+
+def test_writes_stay_in_memory_until_spilled(database, cleanup):
+    # Room for two 4 float tensors
+    store = TieredObjectStore(database, memory_size=32)
+    objs = [create_object() for _ in range(3)]
+
+    store[objs[0].id] = objs[0]
+    store[objs[1].id] = objs[1]
+    assert database.session.query(BinObject).count() == 0
+    assert store[objs[0].id] is objs[0]
+    assert objs[1].id in store
+
+    # objs[1] is the least recently used one
+    store[objs[2].id] = objs[2]
+    assert database.session.query(BinObject).count() == 1
+    assert database.session.query(BinObject).first().id == str(objs[1].id.value)
+    assert th.equal(store[objs[1].id].data, objs[1].data)
+    assert store.tier_stats()["dirty"] == 1
+
+    # Length and searches count memory-only objects without spilling them
+    assert len(store) == 3
+    assert len(store.search(tags=["#tiered"])) == 3
+    assert store.tier_stats()["dirty"] == 1
+
+    # Whole store queries see every object
+    assert len(store.keys()) == 3
+    assert store.tier_stats()["dirty"] == 0
+
+
+def test_metadata_and_permissions_only_spill_their_object(database, cleanup):
+    store = TieredObjectStore(database, memory_size=1024)
+    objs = [create_object() for _ in range(3)]
+    for obj in objs:
+        store[obj.id] = obj
+    verify_key = "ab" * 32
+    objs[0].read_permissions = {verify_key: None}
+
+    assert store.has_permission(objs[0].id, verify_key)
+    assert not store.has_permission(objs[1].id, verify_key)
+    assert store.tier_stats()["dirty"] == 3
+
+    store.grant_permission(objs[1].id, verify_key)
+    store.update_metadata(objs[2].id, description="updated")
+    assert store.has_permission(objs[1].id, verify_key)
+    assert store.get_metadata(objs[2].id).description == "updated"
+    assert database.session.query(BinObject).count() == 2
+    assert store.tier_stats()["dirty"] == 1
+
+
+def test_large_objects_go_straight_to_disk(database, cleanup):
+    store = TieredObjectStore(database, memory_size=16)
+    obj = create_object(size=100)
+    store[obj.id] = obj
+
+    assert database.session.query(BinObject).count() == 1
+    assert store.tier_stats()["entries"] == 0
+
+
+def test_write_through(database, cleanup):
+    store = TieredObjectStore(database, memory_size=1024, write_through=True)
+    obj = create_object()
+    store[obj.id] = obj
+
+    assert database.session.query(BinObject).count() == 1
+    assert store[obj.id] is obj
+
+
+def test_delete_memory_only_object(database, cleanup):
+    store = TieredObjectStore(database, memory_size=1024)
+    obj = create_object()
+    store[obj.id] = obj
+    store.delete(obj.id)
+
+    assert obj.id not in store
+    store.flush()
+    assert database.session.query(BinObject).count() == 0
+
+
+def test_create_object_store(database, monkeypatch):
+    assert type(create_object_store(database)) is DiskObjectStore
+
+    monkeypatch.setenv("STORE_MEMORY_SIZE", "1024")
+    store = create_object_store(database)
+    assert isinstance(store, TieredObjectStore)
+    assert not store.write_through
+
+
+@pytest.mark.parametrize(
+    "env, store_type",
+    [
+        ({}, "DiskObjectStore"),
+        ({"STORE_CACHE_SIZE": "1024", "STORE_WRITE_BEHIND": "10"}, "DiskObjectStore"),
+        ({"STORE_MEMORY_SIZE": "1024", "STORE_WRITE_THROUGH": "true"}, "Tiered"),
+        ({"STORE_MEMORY_SIZE": "1024", "STORE_WRITE_BEHIND": "10"}, "Tiered"),
+        ({"STORE_SHARDS": "sqlite://", "STORE_CACHE_SIZE": "1024"}, "Sharded"),
+        ({"STORE_SHARDS": "sqlite://", "STORE_WRITE_BEHIND": "10"}, "Sharded"),
+    ],
+)
+def test_supported_store_configs(database, monkeypatch, env, store_type):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    store = create_object_store(database, **store_config())
+    assert type(store).__name__.startswith(store_type)
+    store.close()
+
+
+@pytest.mark.parametrize(
+    "env",
+    [
+        {"STORE_SHARDS": "sqlite://", "STORE_MEMORY_SIZE": "1024"},
+        {"STORE_WRITE_THROUGH": "true"},
+        {"STORE_MEMORY_SIZE": "1024", "STORE_CACHE_SIZE": "1024"},
+    ],
+)
+def test_unsupported_store_configs(monkeypatch, env):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    with pytest.raises(ValueError):
+        store_config()
@@ -0,0 +1,85 @@
+# third party
+import numpy as np
+import pytest
+from src.main.core.database.bin_storage.tensor_codec import decode_raw
+from src.main.core.database.bin_storage.tensor_codec import encode_raw
+from src.main.core.database.bin_storage.tensor_codec import is_raw_encodable
+from src.main.core.database.bin_storage.tensor_codec import slice_array
+import torch as th
+
+
+@pytest.mark.parametrize(
+    "tensor",
+    [
+        th.tensor([[1.0, 2.0], [3.0, 4.0]]),
+        th.tensor([[1, 2], [3, 4]], dtype=th.int8).t(),
+        th.tensor(True),
+        th.zeros((0, 3), dtype=th.float64),
+    ],
+)
+def test_raw_tensor_roundtrip(tensor):
+    assert is_raw_encodable(tensor)
+
+    result = decode_raw(encode_raw(tensor))
+
+    assert type(result) is th.Tensor
+    assert result.dtype == tensor.dtype
+    assert result.shape == tensor.shape
+    assert th.equal(result, tensor)
+
+
+def test_raw_numpy_roundtrip():
+    array = np.arange(12, dtype=np.int16).reshape(3, 4)
+
+    result = decode_raw(encode_raw(array))
+
+    assert type(result) is np.ndarray
+    assert result.dtype == array.dtype
+    assert np.array_equal(result, array)
+
+
+def test_raw_decode_uses_writable_buffer_in_place():
+    tensor = th.arange(8, dtype=th.float32)
+    payload = bytearray(encode_raw(tensor))
+
+    result = decode_raw(payload)
+    result[0] = 42.0
+
+    # No element-wise copy: the tensor is a view over the payload
+    assert decode_raw(payload)[0] == 42.0
+
+
+def test_requires_grad_is_kept():
+    tensor = th.tensor([1.0, 2.0], requires_grad=True)
+    assert decode_raw(encode_raw(tensor)).requires_grad
+
+
+def test_not_raw_encodable(monkeypatch):
+    assert not is_raw_encodable(th.nn.Parameter(th.tensor([1.0])))
+    assert not is_raw_encodable(np.array([{}, []], dtype=object))
+    assert not is_raw_encodable([1, 2, 3])
+
+    tensor = th.tensor([1.0, 2.0], requires_grad=True)
+    tensor.sum().backward()
+    assert not is_raw_encodable(tensor)
+
+    monkeypatch.setenv("TENSOR_CODEC", "protobuf")
+    assert not is_raw_encodable(th.tensor([1.0]))
+
+
+@pytest.mark.parametrize("payload_type", [bytes, bytearray])
+def test_raw_decode_row_range(payload_type):
+    tensor = th.arange(30, dtype=th.int16).reshape(10, 3)
+    payload = payload_type(encode_raw(tensor))
+
+    assert th.equal(decode_raw(payload, rows=(2, 5)), tensor[2:5])
+    assert th.equal(decode_raw(payload, rows=(8, 20)), tensor[8:])
+    assert decode_raw(payload, rows=(20, 30)).shape == (0, 3)
+
+
+def test_slice_array_columns():
+    array = np.arange(12).reshape(4, 3)
+
+    assert np.array_equal(
+        slice_array(array, rows=(1, 3), columns=[2, 0]), [[5, 3], [8, 6]]
+    )
@@ -0,0 +1,153 @@
+# stdlib
+from threading import Event
+
+# third party
+import pytest
+from src.main.core.database import *
+from src.main.core.database import write_behind
+from src.main.core.database.store_disk import DiskObjectStore
+from src.main.core.database.write_behind import DELETED
+from src.main.core.database.write_behind import WriteBehindError
+from src.main.core.database.write_behind import WriteBehindQueue
+from syft.core.common.uid import UID
+from syft.core.store.storeable_object import StorableObject
+import torch as th
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(BinObject).delete()
+        database.session.query(Blob).delete()
+        database.session.query(ObjectMetadata).delete()
+        database.session.query(ObjectTag).delete()
+        database.session.query(ObjectPermission).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+def test_queue_groups_and_coalesces_writes():
+    batches = []
+    queue = WriteBehindQueue(batches.append, flush_batch=10, flush_interval=60)
+    key = UID()
+
+    queue.put(key, "first")
+    queue.put(key, "second")
+    assert queue.get(str(key.value)) == "second"
+
+    queue.delete(key)
+    assert queue.get(str(key.value)) is DELETED
+
+    queue.flush()
+    assert batches == [[(key, DELETED)]]
+    assert queue.get(str(key.value)) is None
+    queue.close()
+
+
+def test_queue_back_pressure():
+    release = Event()
+    written = []
+
+    def write(batch):
+        release.wait()
+        written.extend(batch)
+
+    queue = WriteBehindQueue(write, max_pending=2, flush_batch=1, flush_interval=0)
+    for i in range(5):
+        if i == 3:
+            release.set()
+        queue.put(UID(), i)
+
+    queue.flush()
+    assert sorted(value for _, value in written) == list(range(5))
+    queue.close()
+
+
+def test_failed_writes_are_retried(monkeypatch):
+    # Retries only run when the test lets them
+    monkeypatch.setattr(write_behind, "RETRY_DELAY", 60)
+    failing = Event()
+    failing.set()
+    written = []
+
+    def write(batch):
+        if failing.is_set() and any(value == "bad" for _, value in batch):
+            raise IOError("disk full")
+        written.extend(batch)
+
+    queue = WriteBehindQueue(write, flush_batch=10, flush_interval=60)
+    good, bad = UID(), UID()
+    queue.put(good, "good")
+    queue.put(bad, "bad")
+
+    # Readers aren't failed by the bad write, which is still queued
+    queue.flush()
+    assert [value for _, value in written] == ["good"]
+    assert queue.get(str(bad.value)) == "bad"
+    assert queue.stats()["retrying"] == 1
+
+    failing.clear()
+    monkeypatch.setattr(write_behind, "RETRY_DELAY", 0)
+    queue.put(bad, "bad")
+    queue.flush()
+    assert sorted(value for _, value in written) == ["bad", "good"]
+    assert queue.stats()["retrying"] == 0
+    queue.close()
+
+
+def test_failing_writes_are_dead_lettered(monkeypatch):
+    monkeypatch.setattr(write_behind, "RETRY_DELAY", 0)
+
+    def write(batch):
+        raise IOError("disk full")
+
+    queue = WriteBehindQueue(write, flush_batch=1, flush_interval=0)
+    key = UID()
+    queue.put(key, "bad")
+    while not queue.dead_letters():
+        queue.flush()
+
+    assert queue.failed == write_behind.MAX_ATTEMPTS
+    assert queue.get(str(key.value)) is None
+    with pytest.raises(WriteBehindError):
+        queue.close()
+
+
+def test_store_reads_its_queued_writes(database, cleanup):
+    store = DiskObjectStore(database, write_behind=100, flush_interval=60)
+    _id = UID()
+    store[_id] = StorableObject(id=_id, data=th.tensor([1, 2]))
+
+    assert _id in store
+    assert th.equal(store[_id].data, th.tensor([1, 2]))
+    assert [obj.id for obj in store.get_many([_id])] == [_id]
+
+    store.delete(_id)
+    assert _id not in store
+
+    store[_id] = StorableObject(id=_id, data=th.tensor([3]), tags=["#tag"])
+    # Aggregate reads commit queued writes first
+    assert len(store) == 1
+    assert store.search(tags=["#tag"]) == [_id]
+    assert database.session.query(BinObject).count() == 1
+    assert store.write_queue_stats()["pending"] == 0
+    store.close()
+
+
+def test_cached_objects_give_way_to_queued_writes(database, cleanup):
+    store = DiskObjectStore(
+        database, cache_size=1024 * 1024, write_behind=100, flush_interval=60
+    )
+    _id = UID()
+    store[_id] = StorableObject(id=_id, data=th.tensor([1]))
+    store.flush()
+    assert th.equal(store.get_many([_id])[0].data, th.tensor([1]))
+
+    store[_id] = StorableObject(id=_id, data=th.tensor([2]))
+    assert th.equal(store.get_many([_id])[0].data, th.tensor([2]))
+
+    store.delete(_id)
+    assert store.get_many([_id]) == []
+    store.close()
@@ -0,0 +1,94 @@
+# third party
+import pytest
+from src.main.core.database.dataset.catalog import CatalogState
+from src.main.core.database.dataset.catalog import CatalogVersion
+from src.main.core.database.dataset.datasetgroup import BinObjDataset
+from src.main.core.database.dataset.datasetgroup import Dataset
+from src.main.core.datasets.dataset_ops import get_datasets_page
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(BinObjDataset).delete()
+        database.session.query(Dataset).delete()
+        database.session.query(CatalogState).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+def create_datasets(database, n):
+    for i in range(n):
+        database.session.add(
+            Dataset(
+                id=f"dataset-{i:02d}",
+                manifest="",
+                description=f"Dataset {i}",
+                tags=["#all", "#even" if i % 2 == 0 else "#odd_100%"],
+            )
+        )
+        for j in range(2):
+            database.session.add(
+                BinObjDataset(
+                    name=f"file-{j}.csv",
+                    obj=f"obj-{i}-{j}",
+                    dataset=f"dataset-{i:02d}",
+                    dtype="Tensor",
+                    shape="(2, 2)",
+                )
+            )
+    database.session.commit()
+
+
+def test_catalog_etag_changes_with_version_and_parameters(database, cleanup):
+    version = CatalogVersion()
+    etag = version.etag(100, 0)
+
+    assert version.etag(100, 0) == etag
+    assert version.etag(100, 100) != etag
+    version.bump(commit=True)
+    etag = version.etag(100, 0)
+    assert etag != version.etag(100, 100)
+
+    # Every worker reads the version from the database
+    assert CatalogVersion().etag(100, 0) == etag
+    version.bump()
+    database.session.rollback()
+    assert version.etag(100, 0) == etag
+    version.bump()
+    database.session.commit()
+    assert version.version == 2
+    assert CatalogVersion().etag(100, 0) != etag
+
+
+def test_datasets_page_joins_files(database, cleanup):
+    create_datasets(database, 5)
+
+    datasets = get_datasets_page()
+
+    assert [ds["id"] for ds in datasets] == [f"dataset-{i:02d}" for i in range(5)]
+    assert [obj["id"] for obj in datasets[1]["data"]] == ["obj-1-0", "obj-1-1"]
+
+
+def test_datasets_page_offset_and_cursor(database, cleanup):
+    create_datasets(database, 5)
+
+    first = get_datasets_page(limit=2)
+    by_cursor = get_datasets_page(limit=2, after=first[-1]["id"])
+    by_offset = get_datasets_page(limit=2, offset=2)
+
+    assert [ds["id"] for ds in first] == ["dataset-00", "dataset-01"]
+    assert by_cursor == by_offset
+    assert [ds["id"] for ds in by_cursor] == ["dataset-02", "dataset-03"]
+    assert len(by_cursor[0]["data"]) == 2
+
+
+def test_datasets_page_tag_filters(database, cleanup):
+    create_datasets(database, 5)
+
+    assert len(get_datasets_page(tags=["#all"])) == 5
+    assert len(get_datasets_page(tags=["#all", "#even"])) == 3
+    assert len(get_datasets_page(tags=["#odd_100%"])) == 2
+    assert get_datasets_page(tags=["#odd"]) == []
@@ -0,0 +1,68 @@
+# stdlib
+import hashlib
+import io
+import os
+
+# third party
+import pytest
+from src.main.core.datasets.chunked_uploads import ChunkedUploads
+from src.main.core.datasets.chunked_uploads import UploadOffsetError
+
+
+def checksum(data):
+    return "sha256 " + hashlib.sha256(data).hexdigest()
+
+
+def test_chunks_are_appended(tmp_path):
+    uploads = ChunkedUploads(directory=str(tmp_path))
+    upload = uploads.create(user_id=1, total_size=10)
+
+    assert uploads.write_chunk(upload, 0, io.BytesIO(b"01234")) == 5
+    offset = uploads.write_chunk(upload, 5, io.BytesIO(b"56789"), checksum(b"56789"))
+    assert offset == 10
+
+    file_obj = uploads.complete(upload)
+    assert file_obj.read() == b"0123456789"
+    file_obj.close()
+    # Nothing is left in the upload directory
+    assert os.listdir(tmp_path) == []
+    assert uploads.get(upload.id) is None
+
+
+def test_upload_resumes_at_offset(tmp_path):
+    upload = ChunkedUploads(directory=str(tmp_path)).create(user_id=1)
+    ChunkedUploads(directory=str(tmp_path)).write_chunk(upload, 0, io.BytesIO(b"012"))
+
+    # Progress is read back from disk, e.g. after a restart
+    resumed = ChunkedUploads(directory=str(tmp_path)).get(upload.id)
+    assert resumed.to_dict()["offset"] == 3
+    with pytest.raises(UploadOffsetError) as error:
+        resumed.write_chunk(0, io.BytesIO(b"012"))
+    assert error.value.offset == 3
+
+
+@pytest.mark.parametrize(
+    "data,chunk_checksum",
+    [(b"56789", "sha256 00"), (b"5678", "md4 00"), (b"567890", None)],
+)
+def test_invalid_chunk_is_dropped(tmp_path, data, chunk_checksum):
+    uploads = ChunkedUploads(directory=str(tmp_path))
+    upload = uploads.create(user_id=1, total_size=10)
+    uploads.write_chunk(upload, 0, io.BytesIO(b"01234"))
+
+    with pytest.raises(ValueError):
+        uploads.write_chunk(upload, 5, io.BytesIO(data), chunk_checksum)
+    assert upload.offset == 5
+    with pytest.raises(ValueError):
+        uploads.complete(upload)
+
+
+def test_stale_uploads_expire(tmp_path):
+    uploads = ChunkedUploads(directory=str(tmp_path), ttl=60)
+    stale = uploads.create(user_id=1)
+    os.utime(stale.path, (0, 0))
+
+    uploads.create(user_id=2)
+
+    assert uploads.get(stale.id) is None
+    assert uploads.get("../../etc") is None
@@ -0,0 +1,195 @@
+# stdlib
+import io
+import os
+import tarfile
+
+# third party
+import numpy as np
+import pytest
+from src.main.core.datasets.dataset_ops import decompress
+from src.main.core.datasets.parsing import cast_dtypes
+from src.main.core.datasets.parsing import column_stats
+from src.main.core.datasets.parsing import describe_columns
+from src.main.core.datasets.parsing import dtype_schema
+from src.main.core.datasets.parsing import has_header
+from src.main.core.datasets.parsing import ingest_member
+from src.main.core.datasets.parsing import narrow_array
+from src.main.core.datasets.parsing import parse_member
+from src.main.core.datasets.parsing import read_csv
+from src.main.core.datasets.parsing import read_table
+
+
+def make_csv(rows, columns=3):
+    return "".join(
+        ",".join(str(i * columns + j) for j in range(columns)) + "\n"
+        for i in range(rows)
+    ).encode()
+
+
+def make_archive(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("block_size", [7, 64, 1024 * 1024])
+def test_read_csv_blocks(block_size):
+    text = make_csv(500)
+    array = read_csv(io.BytesIO(text), len(text), block_size=block_size)
+
+    assert array.shape == (500, 3)
+    assert array.dtype == np.float32
+    assert np.array_equal(array.ravel(), np.arange(1500, dtype=np.float32))
+
+
+def test_read_csv_skips_blank_lines():
+    text = b"1,2\n\n3,4"
+    array = read_csv(io.BytesIO(text), len(text))
+
+    assert np.array_equal(array, [[1, 2], [3, 4]])
+
+
+def test_read_csv_underestimated_size_grows():
+    text = make_csv(100)
+    array = read_csv(io.BytesIO(text), size=10, block_size=16)
+
+    assert array.shape == (100, 3)
+
+
+def test_read_csv_ragged_rows():
+    text = make_csv(10) + make_csv(10, columns=2)
+    with pytest.raises(ValueError):
+        read_csv(io.BytesIO(text), len(text), block_size=16)
+
+
+def test_decompress_streams_members(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    archive = make_archive({"data/train.csv": make_csv(4), "data/tags": b"#a\n"})
+
+    tar_obj = decompress(archive)
+    names = [item.name for item in tar_obj]
+
+    assert names == ["data/train.csv", "data/tags"]
+    # Nothing is extracted to the working directory
+    assert os.listdir(tmp_path) == []
+
+
+def test_parse_member():
+    array = parse_member(make_csv(3, columns=2))
+
+    assert np.array_equal(array, [[0, 1], [2, 3], [4, 5]])
+
+
+def test_has_header():
+    assert has_header(b"age,income")
+    assert not has_header(b"1,2.5,-3e4")
+    assert not has_header(b"1,,3")
+
+
+def test_read_table_keeps_types():
+    df = read_table(b"name,age,score\nada,36,\nbob,41,7.5\n")
+
+    assert list(df.columns) == ["name", "age", "score"]
+    assert df["age"].dtype == np.int64
+    assert df["score"].dtype == np.float64
+
+    name, age, score = describe_columns(df)
+    assert (name["dtype"], name["count"], name["mean"]) == ("object", 2, None)
+    assert (age["dtype"], age["min"], age["max"], age["mean"]) == (
+        "int64",
+        36,
+        41,
+        38.5,
+    )
+    assert (score["null_count"], score["count"], score["std"]) == (1, 1, 0.0)
+
+
+def test_read_table_without_header():
+    df = parse_member(make_csv(3, columns=2), columnar=True)
+
+    assert list(df.columns) == ["0", "1"]
+    assert df.shape == (3, 2)
+
+
+def test_describe_array_columns():
+    array = np.array([[1, np.nan], [3, np.nan]], dtype=np.float32)
+
+    first, second = describe_columns(array)
+    assert first == {
+        "name": "0",
+        "dtype": "float32",
+        "null_count": 0,
+        "count": 2,
+        "min": 1.0,
+        "max": 3.0,
+        "mean": 2.0,
+        "std": 1.0,
+        "histogram": None,
+    }
+    assert (second["null_count"], second["count"], second["mean"]) == (2, 0, None)
+    assert describe_columns(np.empty(0)) == []
+
+
+def test_column_stats_histogram():
+    values = np.array([0, 1, 2, 3, np.inf, np.nan])
+
+    stats = column_stats(values, bins=3)
+
+    assert stats["count"] == 5
+    assert stats["max"] is None and stats["mean"] is None
+    assert stats["histogram"] == {"edges": [0, 1, 2, 3], "counts": [1, 1, 2]}
+    assert column_stats(np.array([True, False, True]))["mean"] == 2 / 3
+
+
+@pytest.mark.parametrize(
+    "values,dtype",
+    [
+        ([0, 1, 2], np.int8),
+        ([-300, 2], np.int16),
+        ([2**40, 1], np.int64),
+        ([0.5, np.nan], np.float16),
+        ([0.1, 1], np.float32),
+        ([1e6 + 0.5], np.float32),
+    ],
+)
+def test_narrow_array(values, dtype):
+    array = np.array(values, dtype=np.float64)
+
+    narrowed = narrow_array(array)
+
+    assert narrowed.dtype == dtype
+    assert np.allclose(narrowed, array, equal_nan=True)
+
+
+def test_ingest_member_narrows_types():
+    array, columns = ingest_member(make_csv(3, columns=2), narrow=True)
+    assert array.dtype == np.int8
+    assert columns[0]["dtype"] == "int8"
+
+    df, columns = ingest_member(b"label,score\n1,0.5\n0,\n", True, narrow=True)
+    assert (df["label"].dtype, df["score"].dtype) == (np.int8, np.float32)
+    assert [column["dtype"] for column in columns] == ["int8", "float32"]
+
+
+def test_cast_dtypes_schema():
+    array = parse_member(make_csv(3, columns=2))
+    assert cast_dtypes(array, "int16").dtype == np.int16
+    with pytest.raises(ValueError):
+        cast_dtypes(array, "int4")
+    with pytest.raises(ValueError):
+        cast_dtypes(np.array([np.nan]), "bool")
+
+    df = read_table(b"label,score\n1,0.5\n0,1.5\n")
+    df = cast_dtypes(df, {"label": "bool"})
+    assert (df["label"].dtype, df["score"].dtype) == (np.bool_, np.float64)
+
+
+def test_dtype_schema():
+    assert dtype_schema('{"dtypes": "int8"}') == {"*": "int8"}
+    assert dtype_schema('{"dtypes": {"a.csv": "int8"}}') == {"a.csv": "int8"}
+    assert dtype_schema("Data of the 2020 census") == {}
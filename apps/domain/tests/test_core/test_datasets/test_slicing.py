@@ -0,0 +1,56 @@
+# third party
+import numpy as np
+import pandas as pd
+import pytest
+from src.main.core.datasets.slicing import parse_shape
+from src.main.core.datasets.slicing import row_range
+from src.main.core.datasets.slicing import select_columns
+from src.main.core.datasets.slicing import to_json_rows
+
+
+def test_select_columns_by_name_or_position():
+    names = ["id", "name", "score"]
+
+    assert select_columns(["score", 0], names, by_name=True) == ["score", "id"]
+    assert select_columns(["2", "id"], names, by_name=False) == [2, 0]
+
+
+def test_select_unknown_column():
+    with pytest.raises(ValueError):
+        select_columns(["age"], ["id", "name"], by_name=True)
+    with pytest.raises(ValueError):
+        select_columns([2], ["id", "name"], by_name=False)
+
+
+def test_select_columns_without_recorded_names():
+    assert select_columns([1, "3"], [], by_name=False) == [1, 3]
+
+
+def test_row_ranges_are_normalized(monkeypatch):
+    monkeypatch.setenv("DATASET_SLICE_MAX_ROWS", "100")
+
+    assert row_range(None, 1000) == (0, 100)
+    assert row_range([-10, None], 1000) == (990, 1000)
+    assert row_range([5, -5], 20) == (5, 15)
+    assert row_range([8, 3], 20) == (8, 8)
+    assert row_range([30, 40], 20) == (20, 20)
+
+
+def test_row_ranges_of_files_without_shape():
+    assert row_range([5, 10], None) == (5, 10)
+    with pytest.raises(ValueError):
+        row_range([-1, None], None)
+
+
+def test_parse_shape():
+    assert parse_shape("(100, 3)") == (100, 3)
+    assert parse_shape("(100,)") == (100,)
+    assert parse_shape(None) is None
+
+
+def test_json_rows_missing_values():
+    array = np.array([[1.5, np.nan]], dtype=np.float32)
+    df = pd.DataFrame({"name": ["a", None], "score": [1.0, np.nan]})
+
+    assert to_json_rows(array) == [[1.5, None]]
+    assert to_json_rows(df) == [["a", 1.0], [None, None]]
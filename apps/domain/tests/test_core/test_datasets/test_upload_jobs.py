@@ -0,0 +1,93 @@
+# stdlib
+import io
+
+# third party
+import pytest
+from src.main.core.database.dataset.datasetgroup import DatasetUploadJob
+from src.main.core.datasets.upload_jobs import COMPLETED
+from src.main.core.datasets.upload_jobs import FAILED
+from src.main.core.datasets.upload_jobs import PENDING
+from src.main.core.datasets.upload_jobs import ProgressReader
+from src.main.core.datasets.upload_jobs import RUNNING
+from src.main.core.datasets.upload_jobs import UploadJobs
+
+
+@pytest.fixture
+def cleanup(database):
+    yield
+    try:
+        database.session.query(DatasetUploadJob).delete()
+        database.session.commit()
+    except:
+        database.session.rollback()
+
+
+def test_job_progress():
+    jobs = UploadJobs()
+    job = jobs.create(user_id=1, bytes_total=10)
+    assert jobs.get(job.id) is job
+    assert job.to_dict()["status"] == PENDING
+
+    job.start()
+    reader = ProgressReader(io.BytesIO(b"0123456789"), job)
+    reader.read(4)
+    reader.read()
+    job.member_done()
+    job.member_done(failed=True)
+    job.complete({"id": "dataset"})
+
+    status = job.to_dict()
+    assert status["status"] == COMPLETED
+    assert status["bytes_processed"] == 10
+    assert status["members_done"] == 1 and status["members_failed"] == 1
+    assert status["dataset"] == {"id": "dataset"}
+    assert status["throughput"] is None or status["throughput"] > 0
+
+
+def test_failed_job_keeps_error():
+    job = UploadJobs().create(user_id=1, bytes_total=0)
+    job.start()
+    job.fail("invalid archive")
+
+    assert job.to_dict()["status"] == FAILED
+    assert job.to_dict()["error"] == "invalid archive"
+
+
+def test_finished_jobs_expire():
+    jobs = UploadJobs(ttl=-1)
+    finished = jobs.create(user_id=1, bytes_total=0)
+    finished.complete({})
+    running = jobs.create(user_id=1, bytes_total=0)
+    running.start()
+
+    jobs.create(user_id=2, bytes_total=0)
+
+    assert jobs.get(finished.id) is None
+    assert jobs.get(running.id) is running
+
+
+def test_jobs_are_readable_from_other_processes(database, cleanup):
+    job = UploadJobs(database).create(user_id=1, bytes_total=10)
+    job.start()
+
+    # Another process of the node only has the database
+    jobs = UploadJobs(database)
+    assert jobs.get(job.id).to_dict()["status"] == RUNNING
+
+    job.add_bytes(10)
+    job.complete({"id": "dataset"})
+    database.session.expire_all()
+    status = jobs.get(job.id).to_dict()
+    assert status["status"] == COMPLETED
+    assert status["bytes_processed"] == 10
+    assert status["dataset"] == {"id": "dataset"}
+
+
+def test_saved_jobs_expire(database, cleanup):
+    finished = UploadJobs(database).create(user_id=1, bytes_total=0)
+    finished.complete({})
+
+    jobs = UploadJobs(database, ttl=-1)
+    assert jobs.get(finished.id) is None
+    jobs.create(user_id=2, bytes_total=0)
+    assert database.session.query(DatasetUploadJob).get(finished.id) is None
@@ -78,7 +78,7 @@ def test_create_request(client, database, cleanup):
     }
 
     storage = DiskObjectStore(database)
-    dataset_json = create_dataset(dataset)
+    dataset_json = create_dataset(dataset, storage=storage)
 
     object_id = dataset_json["tensors"]["train"]["id"]
     reason = "sample reason"
@@ -112,7 +112,7 @@ def test_create_duplicate_fail(client, database, cleanup):
 
     database.session.commit()
     storage = DiskObjectStore(database)
-    dataset_json = create_dataset(dataset)
+    dataset_json = create_dataset(dataset, storage=storage)
 
     token = jwt.encode({"id": 1}, app.config["SECRET_KEY"])
     headers = {
@@ -163,7 +163,7 @@ def test_get_specific_request(client, database, cleanup):
 
     database.session.commit()
     storage = DiskObjectStore(database)
-    dataset_json = create_dataset(dataset)
+    dataset_json = create_dataset(dataset, storage=storage)
 
     token = jwt.encode({"id": 1}, app.config["SECRET_KEY"])
     headers = {
@@ -209,7 +209,7 @@ def test_get_all_requests(client, database, cleanup):
 
     database.session.commit()
     storage = DiskObjectStore(database)
-    dataset_json = create_dataset(dataset)
+    dataset_json = create_dataset(dataset, storage=storage)
 
     token = jwt.encode({"id": 1}, app.config["SECRET_KEY"])
     headers = {
@@ -249,7 +249,7 @@ def test_update_request(client, database, cleanup):
 
     database.session.commit()
     storage = DiskObjectStore(database)
-    dataset_json = create_dataset(dataset)
+    dataset_json = create_dataset(dataset, storage=storage)
 
     token = jwt.encode({"id": 1}, app.config["SECRET_KEY"])
     headers = {
@@ -300,7 +300,7 @@ def test_delete_request(client, database, cleanup):
 
     database.session.commit()
     storage = DiskObjectStore(database)
-    dataset_json = create_dataset(dataset)
+    dataset_json = create_dataset(dataset, storage=storage)
 
     token = jwt.encode({"id": 1}, app.config["SECRET_KEY"])
     headers = {